@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "agrikart.settings")
 
 application = get_asgi_application()
+
+# Serve admin and Swagger assets the way runserver did while DEBUG is on
+if settings.DEBUG:
+    application = ASGIStaticFilesHandler(application)
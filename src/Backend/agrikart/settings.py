@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+from corsheaders.defaults import default_headers
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -11,6 +12,23 @@ ALLOWED_HOSTS = ["*"]
 # Domain for absolute URLs
 DOMAIN = "http://localhost:8001"
 
+# WhatsApp bot base URL, used by the outbox dispatcher (python manage.py dispatch_outbox)
+WHATSAPP_BOT_URL = os.getenv("WHATSAPP_BOT_URL", "")
+
+# Address geocoding (api.geocoding): runs after commit on a background thread. Off unless
+# GEOCODING_ENABLED=1, so tests, benches and management commands never call the geocoder;
+# `manage.py backfill_coordinates` geocodes explicitly either way
+GEOCODING_ENABLED = os.getenv("GEOCODING_ENABLED", "0") == "1"
+GEOCODER_URL = os.getenv("GEOCODER_URL", "https://nominatim.openstreetmap.org/search")
+GEOCODER_USER_AGENT = "AgriKart/1.0 (support@AgriKart.com)"
+GEOCODER_MIN_INTERVAL = 1.0  # seconds between geocoder requests
+
+# Batch dispatch (logistics.dispatch): max active orders per courier
+COURIER_CAPACITY = int(os.getenv("COURIER_CAPACITY", "10"))
+
+# Checkout: threads assigning couriers to the per-farmer orders of a split cart
+CHECKOUT_ASSIGNMENT_WORKERS = int(os.getenv("CHECKOUT_ASSIGNMENT_WORKERS", "4"))
+
 # Application definition
 INSTALLED_APPS = [
     "django.contrib.admin",
@@ -70,6 +88,46 @@ DATABASES = {
 }
 }
 
+# Caches: rendered receipt PDFs are content-addressed (logistics.receipts), so they never expire;
+# LocMemCache evicts least-recently-used entries past MAX_ENTRIES. Point RECEIPT_CACHE_BACKEND at
+# django.core.cache.backends.filebased.FileBasedCache to share receipts between processes.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "receipts": {
+        "BACKEND": os.getenv("RECEIPT_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("RECEIPT_CACHE_LOCATION", "receipts"),
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("RECEIPT_CACHE_MAX_ENTRIES", "500"))},
+    },
+    # API responses keyed by a version that Produce/Farmer changes bump (api.response_cache).
+    # Versions live in the same cache, so with several worker processes use FileBasedCache
+    # (or another shared backend): with LocMemCache each worker only sees its own bumps.
+    "responses": {
+        "BACKEND": os.getenv("RESPONSE_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("RESPONSE_CACHE_LOCATION", "responses"),
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))},
+    },
+}
+# Lifetime of a cached response; versions themselves never expire
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", "3600"))
+
+# Adding to the cart holds stock for this long (buyer.holds); `manage.py release_expired_holds` frees it after
+CART_HOLD_MINUTES = int(os.getenv("CART_HOLD_MINUTES", "15"))
+
+# Idempotency-Key support (api.idempotency): how long outcomes are replayed, and how long a
+# duplicate waits for the first request to finish before getting 409
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+
+# Receipt PDFs are pre-rendered on this many processes when orders are created or change status (0 = off)
+RECEIPT_RENDER_WORKERS = int(os.getenv("RECEIPT_RENDER_WORKERS", "2"))
+
+# Courier GPS pings are kept in memory (logistics.tracking) and written to the database this often
+LOCATION_FLUSH_SECONDS = float(os.getenv("LOCATION_FLUSH_SECONDS", "5"))
+
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -112,6 +170,8 @@ CORS_ALLOWED_ORIGINS = [
     "https://agrikart-whatsapp-ws-2a-5000.ml.iit-ropar.truefoundry.cloud",  
 ]
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+CORS_EXPOSE_HEADERS = ["X-Next-Cursor", "Idempotent-Replayed"]
 
 CSRF_TRUSTED_ORIGINS = [
     "https://agrikart-fd-ws-2a-80.ml.iit-ropar.truefoundry.cloud",
@@ -3,11 +3,11 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from farmer.views import FarmerViewSet
 from buyer.views import CartViewSet
-from buyer.views import CreateOrderFromCart, ConfirmOrder
+from buyer.views import CreateOrderFromCart, ConfirmOrder, MarketPriceView, order_status_stream
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
-from farmer.views import ProduceViewSet
+from farmer.views import ProduceViewSet, SalesDashboardView
 
 
 schema_view = get_schema_view(
@@ -31,6 +31,8 @@ router.register(r'produce', ProduceViewSet, basename='produce')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Ahead of the router, whose farmer/<phone number>/ route would match it
+    path('api/v1/farmer/dashboard/', SalesDashboardView.as_view(), name='farmer-dashboard'),
     path('api/v1/', include(router.urls)),
     path('api/v1/auth/', include('api.urls')),
     path('api/v1/buyer/', include('buyer.urls')),
@@ -38,6 +40,8 @@ urlpatterns = [
     path('api/v1/logistics/', include('logistics.urls')),
     path('api/v1/orders/create-from-cart/', CreateOrderFromCart.as_view()),
     path('api/v1/orders/<int:pk>/confirm/', ConfirmOrder.as_view()),
+    path('api/v1/orders/status-stream/', order_status_stream, name='order-status-stream'),
+    path('api/v1/market-prices/', MarketPriceView.as_view(), name='market-prices'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
     path('swagger.json', schema_view.without_ui(cache_timeout=0), name='schema-json'),
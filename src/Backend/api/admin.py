@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+from .models import GeocodeCache, IdempotencyKey, User
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -29,3 +29,15 @@ class CustomUserAdmin(UserAdmin):
 
     search_fields = ('username', 'email', 'phone_number')
     ordering = ('username',)
+
+
+@admin.register(GeocodeCache)
+class GeocodeCacheAdmin(admin.ModelAdmin):
+    list_display = ('address', 'latitude', 'longitude', 'fetched_at', 'expires_at')
+    search_fields = ('address',)
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'user', 'status_code', 'created_at', 'expires_at')
+    search_fields = ('key', 'user__username')
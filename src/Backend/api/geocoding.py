@@ -0,0 +1,188 @@
+# api/geocoding.py
+
+import hashlib
+import queue
+import re
+import threading
+import time
+from datetime import timedelta
+
+import requests
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import GeocodeCache
+
+# Models whose `address` is geocoded into `latitude`/`longitude`
+GEOCODED_MODELS = ['farmer.Farmer', 'buyer.Buyer', 'logistics.LogisticsPartner']
+
+POSITIVE_TTL = timedelta(days=30)
+NEGATIVE_TTL = timedelta(days=1)
+REQUEST_TIMEOUT = (3, 10)
+
+
+def normalize_address(address):
+    address = re.sub(r"[^\w\s,]", " ", address.lower())
+    address = re.sub(r"\s*,\s*", ", ", address)
+    return re.sub(r"\s+", " ", address).strip(" ,")
+
+
+def address_key(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+class RateLimiter:
+    """Allow at most one call per `min_interval` seconds across threads (Nominatim asks for 1 req/s)."""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+_rate_limiter = RateLimiter(settings.GEOCODER_MIN_INTERVAL)
+_session = requests.Session()
+
+
+def fetch_coordinates(address):
+    """Query the geocoder. Returns (lat, lon), or None when the address is unknown."""
+    _rate_limiter.wait()
+    response = _session.get(
+        settings.GEOCODER_URL,
+        params={'q': address, 'format': 'json', 'limit': 1},
+        headers={'User-Agent': settings.GEOCODER_USER_AGENT},
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    results = response.json()
+    if not results:
+        return None
+    return float(results[0]['lat']), float(results[0]['lon'])
+
+
+def lookup(address, fetcher=fetch_coordinates):
+    """
+    Resolve an address through the cache, calling `fetcher` on a miss or expired entry.
+    Unknown addresses are cached negatively for NEGATIVE_TTL; transport errors are not cached.
+    """
+    normalized = normalize_address(address)
+    if not normalized:
+        return None
+    key = address_key(normalized)
+
+    entry = GeocodeCache.objects.filter(address_key=key, expires_at__gt=timezone.now()).first()
+    if entry:
+        return (entry.latitude, entry.longitude) if entry.latitude is not None else None
+
+    coords = fetcher(normalized)
+    now = timezone.now()
+    GeocodeCache.objects.update_or_create(
+        address_key=key,
+        defaults={
+            'address': normalized,
+            'latitude': coords[0] if coords else None,
+            'longitude': coords[1] if coords else None,
+            'fetched_at': now,
+            'expires_at': now + (POSITIVE_TTL if coords else NEGATIVE_TTL),
+        },
+    )
+    return coords
+
+
+def geocode_instance(model_label, pk, fetcher=fetch_coordinates):
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk, latitude__isnull=True).first()
+    if instance is None or not instance.address:
+        return None
+
+    coords = lookup(instance.address, fetcher)
+    if coords:
+        instance.latitude, instance.longitude = coords
+        # Coordinates are set now, so the post_save receivers will not enqueue it again
+        instance.save(update_fields=['latitude', 'longitude'])
+    return coords
+
+
+def backfill(model_label, chunk_size=200, fetcher=fetch_coordinates):
+    """Geocode every row of `model_label` with null coordinates, one lookup per distinct address."""
+    model = apps.get_model(model_label)
+    resolved = {}
+    updated = 0
+    last_pk = 0
+    while True:
+        chunk = list(
+            model.objects.filter(latitude__isnull=True, pk__gt=last_pk).order_by('pk')[:chunk_size]
+        )
+        if not chunk:
+            return updated
+        last_pk = chunk[-1].pk
+
+        changed = []
+        for instance in chunk:
+            normalized = normalize_address(instance.address or '')
+            if normalized not in resolved:
+                try:
+                    resolved[normalized] = lookup(normalized, fetcher) if normalized else None
+                except requests.RequestException as e:
+                    print(f" Geocoding failed for {normalized!r}: {e}")
+                    resolved[normalized] = None
+            if resolved[normalized]:
+                instance.latitude, instance.longitude = resolved[normalized]
+                changed.append(instance)
+
+        model.objects.bulk_update(changed, ['latitude', 'longitude'])
+        updated += len(changed)
+        if changed and model_label == 'logistics.LogisticsPartner':
+            # bulk_update bypasses post_save, so the courier index has to reload
+            from logistics.spatial import courier_index
+            courier_index.invalidate()
+
+
+class GeocodeWorker:
+    """Daemon thread that geocodes (model_label, pk) jobs off the request path."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, model_label, pk):
+        self._queue.put((model_label, pk))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="geocode-worker", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            model_label, pk = self._queue.get()
+            try:
+                close_old_connections()
+                geocode_instance(model_label, pk)
+            except Exception as e:
+                # Rows stay null and are picked up by `manage.py backfill_coordinates`
+                print(f" Geocoding {model_label} #{pk} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+geocode_worker = GeocodeWorker()
+
+
+def enqueue_geocoding(instance):
+    """post_save helper: geocode the instance after commit if it has an address but no coordinates."""
+    if instance.latitude is not None or not instance.address or not settings.GEOCODING_ENABLED:
+        return
+    label = instance._meta.label
+    pk = instance.pk
+    transaction.on_commit(lambda: geocode_worker.enqueue(label, pk))
@@ -0,0 +1,119 @@
+# api/idempotency.py
+
+import functools
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# A first request that has not finished after this long is assumed dead and may be retried
+LOCK_TIMEOUT = timedelta(minutes=2)
+POLL_INTERVAL = 0.05
+SWEEP_INTERVAL = 10 * 60  # seconds between purges of expired keys, per process
+
+_last_sweep = 0.0
+
+
+def request_hash(request):
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def purge_expired():
+    global _last_sweep
+    now = time.monotonic()
+    if now - _last_sweep < SWEEP_INTERVAL:
+        return 0
+    _last_sweep = now
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def claim(user, key, fingerprint):
+    """
+    Look the key up and, if it is new, insert it as "in progress". The unique (user, key)
+    constraint is the single-flight lock: only one concurrent request wins the insert.
+    Returns (record, claimed); record is None only if the key kept vanishing under us.
+    """
+    now = timezone.now()
+    purge_expired()
+    for _ in range(3):
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is not None:
+            stale = record.status_code is None and record.created_at < now - LOCK_TIMEOUT
+            if record.expires_at > now and not stale:
+                return record, False
+            IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=user,
+                    key=key,
+                    request_hash=fingerprint,
+                    created_at=now,
+                    expires_at=now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+                )
+            return record, True
+        except IntegrityError:
+            continue  # a concurrent duplicate inserted first; read its row
+    return None, False
+
+
+def wait_for(record):
+    """Poll until the request holding the key has stored its response, or IDEMPOTENCY_WAIT_SECONDS pass."""
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while record is not None and record.status_code is None and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+    return record
+
+
+def idempotent(method):
+    """
+    APIView method decorator. With an Idempotency-Key header, the first response (other than
+    5xx and 409, which are worth retrying) is stored for IDEMPOTENCY_TTL_HOURS and replayed for
+    repeats of the same request; a concurrent duplicate waits for the first one to finish.
+    """
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"}, status=400)
+
+        fingerprint = request_hash(request)
+        record, claimed = claim(request.user, key, fingerprint)
+        if not claimed:
+            if record is not None and record.request_hash != fingerprint:
+                return Response({"error": f"{HEADER} was already used for a different request"}, status=422)
+            record = wait_for(record)
+            if record is None or record.status_code is None:
+                return Response({"error": "A request with this Idempotency-Key is still in progress"}, status=409)
+            return Response(record.response, status=record.status_code, headers={"Idempotent-Replayed": "true"})
+
+        try:
+            response = method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500 or response.status_code == 409:
+            record.delete()
+        else:
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=['status_code', 'response'])
+        return response
+
+    return wrapper
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.geocoding import GEOCODED_MODELS, backfill
+
+
+class Command(BaseCommand):
+    help = "Geocode Farmer/Buyer/LogisticsPartner rows that have an address but no coordinates."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=GEOCODED_MODELS, action='append',
+                            help="Limit to one model label (repeatable); defaults to all")
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        for model_label in options['model'] or GEOCODED_MODELS:
+            updated = backfill(model_label, chunk_size=options['chunk_size'])
+            self.stdout.write(f"{model_label}: geocoded {updated} row(s)")
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_user_is_logistics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeocodeCache",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("address_key", models.CharField(max_length=40, unique=True)),
+                ("address", models.TextField()),
+                ("latitude", models.FloatField(blank=True, null=True)),
+                ("longitude", models.FloatField(blank=True, null=True)),
+                ("fetched_at", models.DateTimeField()),
+                ("expires_at", models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 class User(AbstractUser):
@@ -11,3 +12,33 @@ class User(AbstractUser):
     
     def __str__(self):
         return self.username
+
+
+class GeocodeCache(models.Model):
+    """Address -> coordinate cache shared by Farmer, Buyer and LogisticsPartner geocoding (see api.geocoding)."""
+    address_key = models.CharField(max_length=40, unique=True)  # sha1 of the normalized address
+    address = models.TextField()
+    latitude = models.FloatField(null=True, blank=True)  # null latitude/longitude = negative cache entry
+    longitude = models.FloatField(null=True, blank=True)
+    fetched_at = models.DateTimeField()
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.address} -> ({self.latitude}, {self.longitude})"
+
+
+class IdempotencyKey(models.Model):
+    """Stored outcome of a request sent with an Idempotency-Key header (see api.idempotency)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)  # sha256 of method, path and body
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # null = first request still running
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq')]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key} -> {self.status_code or 'in progress'}"
@@ -0,0 +1,84 @@
+# api/response_cache.py
+
+import functools
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.response import Response
+
+
+def response_cache():
+    return caches['responses']
+
+
+def version_key(namespace):
+    return f"version:{namespace}"
+
+
+def current_version(namespaces):
+    """
+    Combined version of `namespaces`. Versions are never reused: a namespace without a
+    stored version starts at the current time in nanoseconds, and every bump stores a new
+    unique value, so no older entry can be served under a version once it has changed.
+    """
+    cache = response_cache()
+    keys = [version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)  # another worker may have just started it
+            versions[key] = cache.get(key)
+    return "-".join(str(versions[key]) for key in keys)
+
+
+def bump(namespace):
+    # A fresh value rather than incr(): FileBasedCache increments with get-then-set, so two
+    # concurrent bumps could both land on the same next version
+    response_cache().set(version_key(namespace), f"{time.time_ns()}.{uuid.uuid4().hex[:8]}", timeout=None)
+
+
+def bump_on_commit(*namespaces):
+    """Invalidate cached responses of `namespaces` once the current transaction commits."""
+    # Bumping earlier would let a request that still reads the old rows cache them under the new version
+    transaction.on_commit(lambda: [bump(namespace) for namespace in namespaces])
+
+
+def cached_response(*namespaces):
+    """
+    APIView method decorator caching successful GET responses per full path, until any of
+    `namespaces` is bumped. Responses carry an ETag derived from the version, so a client
+    sending it back in If-None-Match gets 304 after one cache read, without the view running.
+    Only use on views whose output does not depend on the requesting user.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            path_hash = hashlib.sha1(request.get_full_path().encode()).hexdigest()[:16]
+            etag = quote_etag(f"{current_version(namespaces)}-{path_hash}")
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+            if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+            if etag in if_none_match or "*" in if_none_match:
+                return Response(status=304, headers=headers)
+
+            cache = response_cache()
+            key = f"response:{etag}"
+            data = cache.get(key)
+            if data is not None:
+                return Response(data, headers=headers)
+
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+                for header, value in headers.items():
+                    response[header] = value
+            return response
+
+        return wrapper
+
+    return decorator
@@ -1,3 +1,106 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.geocoding import backfill, geocode_instance, lookup, normalize_address
+from api.models import GeocodeCache, User
+from buyer.models import Buyer, CartItem, Order, OrderLine
+from farmer.models import Farmer, Produce
+
+
+class FakeGeocoder:
+    def __init__(self, known):
+        self.known = known
+        self.calls = []
+
+    def __call__(self, address):
+        self.calls.append(address)
+        return self.known.get(address)
+
+
+class GeocodingTests(TestCase):
+    def make_farmer(self, username, address):
+        user = User.objects.create_user(username=username, password='pass', phone_number=username, is_farmer=True)
+        return Farmer.objects.create(user=user, name=username, address=address)
+
+    def test_normalize_address(self):
+        self.assertEqual(normalize_address("  Village Rampur ,  Dist. MEERUT,UP "), "village rampur, dist meerut, up")
+
+    def test_lookup_caches_hits_and_misses(self):
+        geocoder = FakeGeocoder({'rampur, up': (28.8, 79.0)})
+
+        self.assertEqual(lookup('Rampur, UP', geocoder), (28.8, 79.0))
+        self.assertEqual(lookup('RAMPUR ,UP', geocoder), (28.8, 79.0))
+        self.assertIsNone(lookup('Nowhere', geocoder))
+        self.assertIsNone(lookup('nowhere', geocoder))
+        self.assertEqual(geocoder.calls, ['rampur, up', 'nowhere'])
+
+        # Expired entries are refreshed
+        GeocodeCache.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        lookup('Rampur, UP', geocoder)
+        self.assertEqual(len(geocoder.calls), 3)
+
+    def test_geocode_instance_sets_coordinates(self):
+        farmer = self.make_farmer('f1', 'Rampur, UP')
+        geocode_instance('farmer.Farmer', farmer.pk, FakeGeocoder({'rampur, up': (28.8, 79.0)}))
+
+        farmer.refresh_from_db()
+        self.assertEqual((farmer.latitude, farmer.longitude), (28.8, 79.0))
+
+    def test_backfill_resolves_each_address_once(self):
+        for i in range(5):
+            self.make_farmer(f'f{i}', 'Rampur, UP' if i % 2 else 'rampur,  up')
+        self.make_farmer('lost', 'Nowhere')
+        geocoder = FakeGeocoder({'rampur, up': (28.8, 79.0)})
+
+        self.assertEqual(backfill('farmer.Farmer', chunk_size=2, fetcher=geocoder), 5)
+        self.assertEqual(sorted(geocoder.calls), ['nowhere', 'rampur, up'])
+        self.assertEqual(Farmer.objects.filter(latitude__isnull=True).count(), 1)
+
+
+class MeViewTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='buyer', password='pass', phone_number='1000', is_buyer=True)
+        self.buyer = Buyer.objects.create(user=user, address='Delhi')
+        farmer_user = User.objects.create_user(username='farmer', password='pass', phone_number='2000', is_farmer=True)
+        self.produce = Produce.objects.create(
+            farmer=Farmer.objects.create(user=farmer_user, name='Ravi', address='Farm'), name='Tomato', price=20, quantity=50
+        )
+        CartItem.objects.create(buyer=self.buyer, produce=self.produce, quantity=1)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def place_orders(self, count):
+        start = timezone.now() - timedelta(days=count)
+        orders = Order.objects.bulk_create([
+            Order(buyer=self.buyer, total=20, created_at=start + timedelta(days=i)) for i in range(count)
+        ])
+        OrderLine.objects.bulk_create([
+            OrderLine(order=order, produce=self.produce, name='Tomato', unit_price=20, quantity=1, line_total=20)
+            for order in orders
+        ])
+        return orders
+
+    def test_query_count_does_not_grow_with_history(self):
+        self.place_orders(3)
+        with self.assertNumQueries(6):
+            self.client.get('/api/v1/auth/me/')
+
+        self.place_orders(40)
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/v1/auth/me/')
+        self.assertEqual(len(response.data['buyer']['orders']), 20)
+        self.assertEqual(response.data['buyer']['orders'][0]['items'][0]['name'], 'Tomato')
+
+    def test_history_pages_follow_from_me(self):
+        orders = self.place_orders(25)
+        response = self.client.get('/api/v1/auth/me/')
+        first_page = [order['id'] for order in response.data['buyer']['orders']]
+        self.assertEqual(first_page, [order.id for order in reversed(orders)][:20])
 
-# Create your tests here.
+        response = self.client.get(response.data['buyer']['orders_next'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([order['id'] for order in response.data['results']], [order.id for order in reversed(orders)][20:])
+        self.assertIsNone(response.data['next'])
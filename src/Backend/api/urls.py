@@ -2,7 +2,7 @@ from django.urls import path
 from .views import BuyerSignup, FarmerSignup
 from .views import CustomTokenObtainPairView
 from .views import MeView
-from buyer.views import OrderReceiptView
+from buyer.views import OrderHistoryView, OrderReceiptView
 
 
 urlpatterns = [
@@ -10,6 +10,7 @@ urlpatterns = [
     path('signup/farmer/', FarmerSignup.as_view()),
     path('token/', CustomTokenObtainPairView.as_view()), 
      path("me/", MeView.as_view(), name="me"),
+    path('orders/history/', OrderHistoryView.as_view(), name='order-history'),
     path('orders/<int:order_id>/receipt/', OrderReceiptView.as_view(), name='order-receipt'),
 ]
 
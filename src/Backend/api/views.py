@@ -18,10 +18,11 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from buyer.models import Buyer, Order
-from buyer.serializers import BuyerSerializer, OrderSerializer
+from buyer.serializers import BuyerProfileSerializer, OrderSerializer
+from buyer.views import OrderHistoryPagination
 from farmer.models import Farmer
 from farmer.serializers import FarmerSerializer
-from django.conf import settings
+from django.urls import reverse
 
 
 class BuyerSignup(APIView):
@@ -74,22 +75,15 @@ class MeView(APIView):
 
         if user.is_buyer:
             try:
-                buyer = Buyer.objects.get(user=user)
-                response_data["buyer"] = BuyerSerializer(buyer).data
-
-                #  Fetch orders placed by this buyer
-                orders = Order.objects.filter(buyer=buyer).order_by("-created_at")
-                print(f" Found {orders.count()} orders for buyer {buyer}")
-
-                order_list = []
-                for order in orders:
-                    order_data = OrderSerializer(order).data
-                    receipt_url = f"{settings.DOMAIN}/api/v1/auth/orders/{order.id}/receipt/"
-                    order_data["receipt_pdf_url"] = receipt_url
-                    order_list.append(order_data)
-                    print(f" Added order #{order.id} with receipt {receipt_url}")
-
-                response_data["buyer"]["orders"] = order_list
+                buyer = Buyer.objects.prefetch_related("cart__produce").get(user=user)
+                response_data["buyer"] = BuyerProfileSerializer(buyer).data
+
+                # Page one of the order history; later pages come from `orders/history/`
+                paginator = OrderHistoryPagination()
+                orders = paginator.paginate_queryset(Order.objects.filter(buyer=buyer).history(), request, view=self)
+                paginator.base_url = request.build_absolute_uri(reverse("order-history"))
+                response_data["buyer"]["orders"] = OrderSerializer(orders, many=True).data
+                response_data["buyer"]["orders_next"] = paginator.get_next_link()
 
             except Buyer.DoesNotExist:
                 print(" Buyer profile not found for user")
@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Buyer, CartItem, Order
+from django.utils import timezone
+from .models import (
+    Buyer, CartItem, DailyProduceSales, HourlyProduceSales, Order, OrderEvent, OrderLine, OrderStatusTiming,
+    OutboxMessage, PriceVolume,
+)
 
 @admin.register(Buyer)
 class BuyerAdmin(admin.ModelAdmin):
@@ -11,9 +15,64 @@ class CartItemAdmin(admin.ModelAdmin):
     list_display = ('buyer', 'produce', 'quantity')
     list_filter = ('produce',)
 
+class OrderLineInline(admin.TabularInline):
+    model = OrderLine
+    extra = 0
+    readonly_fields = ('produce', 'name', 'unit_price', 'quantity', 'line_total')
+    can_delete = False
+
+class OrderEventInline(admin.TabularInline):
+    model = OrderEvent
+    extra = 0
+    readonly_fields = ('from_status', 'to_status', 'actor', 'seconds_in_previous', 'created_at')
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('id', 'buyer', 'status', 'created_at')
+    list_display = ('id', 'buyer', 'status', 'total', 'created_at')
     list_filter = ('status', 'created_at')
     search_fields = ('buyer__user__username',)
     filter_horizontal = ('items',)
+    inlines = [OrderLineInline, OrderEventInline]
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'endpoint', 'order', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'endpoint')
+    actions = ['requeue']
+
+    @admin.action(description="Requeue selected messages")
+    def requeue(self, request, queryset):
+        queryset.update(status='PENDING', attempts=0, next_attempt_at=timezone.now())
+
+
+@admin.register(OrderStatusTiming)
+class OrderStatusTimingAdmin(admin.ModelAdmin):
+    list_display = ('day', 'status', 'exits', 'total_seconds', 'max_seconds')
+    list_filter = ('status',)
+    date_hierarchy = 'day'
+
+
+@admin.register(PriceVolume)
+class PriceVolumeAdmin(admin.ModelAdmin):
+    list_display = ('day', 'name', 'unit_price', 'units', 'lines')
+    search_fields = ('name',)
+    date_hierarchy = 'day'
+
+
+@admin.register(DailyProduceSales)
+class DailyProduceSalesAdmin(admin.ModelAdmin):
+    list_display = ('day', 'farmer', 'produce', 'units', 'revenue', 'lines')
+    raw_id_fields = ('farmer', 'produce')
+    date_hierarchy = 'day'
+
+
+@admin.register(HourlyProduceSales)
+class HourlyProduceSalesAdmin(admin.ModelAdmin):
+    list_display = ('hour', 'farmer', 'produce', 'units', 'revenue', 'lines')
+    raw_id_fields = ('farmer', 'produce')
+    date_hierarchy = 'hour'
@@ -0,0 +1,103 @@
+# buyer/holds.py
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from farmer.models import Produce
+
+from .models import StockHold
+
+SWEEP_BATCH_SIZE = 500
+
+
+def hold_expiry():
+    return timezone.now() + timedelta(minutes=settings.CART_HOLD_MINUTES)
+
+
+def set_hold(cart_item, quantity):
+    """
+    Make the cart item's hold cover `quantity`, taking or returning only the difference,
+    and restart its TTL. Raises farmer.models.InsufficientStock when stock cannot cover it.
+    """
+    with transaction.atomic():
+        hold = StockHold.objects.select_for_update().filter(cart_item=cart_item).first()
+        delta = quantity - (hold.quantity if hold else 0)
+        if delta > 0:
+            Produce.objects.reserve({cart_item.produce_id: delta})
+        elif delta < 0:
+            Produce.objects.release({cart_item.produce_id: -delta})
+
+        if quantity == 0:
+            if hold:
+                hold.delete()
+            return None
+        if hold is None:
+            return StockHold.objects.create(
+                cart_item=cart_item, produce_id=cart_item.produce_id, quantity=quantity, expires_at=hold_expiry()
+            )
+        hold.quantity = quantity
+        hold.expires_at = hold_expiry()
+        hold.save(update_fields=['quantity', 'expires_at'])
+        return hold
+
+
+def convert_holds(items):
+    """
+    Checkout side: turn the holds of these cart items into sales. Must run inside the
+    checkout transaction. Returns {produce_id: quantity} still to be reserved from stock.
+
+    Stock under a hold was already taken when the item was added, so a hold that covers
+    the item is simply deleted. Holds past their TTL count as long as the sweeper has
+    not returned them yet.
+    """
+    holds = {
+        hold.cart_item_id: hold
+        for hold in StockHold.objects.select_for_update().filter(cart_item__in=[item.id for item in items])
+    }
+    uncovered, surplus = defaultdict(int), defaultdict(int)
+    for item in items:
+        held = holds[item.id].quantity if item.id in holds else 0
+        if item.quantity > held:
+            uncovered[item.produce_id] += item.quantity - held
+        elif held > item.quantity:
+            surplus[item.produce_id] += held - item.quantity
+
+    StockHold.objects.filter(pk__in=[hold.pk for hold in holds.values()]).delete()
+    Produce.objects.release(dict(surplus))
+    return dict(uncovered)
+
+
+def release_cart_item(cart_item):
+    """Return a cart item's held stock (the cart item is being removed)."""
+    with transaction.atomic():
+        hold = StockHold.objects.select_for_update().filter(cart_item_id=cart_item.pk).first()
+        if hold:
+            Produce.objects.release({hold.produce_id: hold.quantity})
+            hold.delete()
+
+
+def release_expired(batch_size=SWEEP_BATCH_SIZE):
+    """
+    Return up to `batch_size` expired holds to stock: one UPDATE on Produce and one DELETE.
+    Returns the number of holds released.
+    """
+    with transaction.atomic():
+        # skip_locked leaves holds that a checkout is converting right now; SQLite ignores it
+        expired = list(
+            StockHold.objects.select_for_update(skip_locked=True)
+            .filter(expires_at__lte=timezone.now())
+            .values_list('id', 'produce_id', 'quantity')[:batch_size]
+        )
+        if not expired:
+            return 0
+
+        returned = defaultdict(int)
+        for _, produce_id, quantity in expired:
+            returned[produce_id] += quantity
+        Produce.objects.release(dict(returned))
+        StockHold.objects.filter(pk__in=[hold_id for hold_id, _, _ in expired]).delete()
+    return len(expired)
@@ -0,0 +1,109 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from api.models import User
+from buyer import sales
+from buyer.models import Buyer, Order, OrderLine
+from farmer.models import Farmer, Produce
+
+NAMES = ['Tomato', 'Onion', 'Potato', 'Okra', 'Cabbage', 'Apple', 'Banana', 'Mango', 'Rice', 'Wheat']
+
+
+class Command(BaseCommand):
+    help = (
+        "Farmer sales dashboard over a synthetic order history (200k order lines over 90 days by default): "
+        "aggregating order lines on demand versus reading the hourly/daily rollups. "
+        "Creates throwaway users, orders and rollups and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=200_000)
+        parser.add_argument('--farmers', type=int, default=200)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = random.Random(25)
+        tag = uuid.uuid4().hex[:8]
+        now = timezone.now()
+        start = time.perf_counter()
+        with transaction.atomic():
+            buyer_user = User.objects.create(username=f"bench-{tag}-buyer", phone_number=f"bench-{tag}-buyer", is_buyer=True)
+            buyer = Buyer.objects.create(user=buyer_user, address="Bench")
+            users = User.objects.bulk_create([
+                User(username=f"bench-{tag}-{i}", phone_number=f"bench-{tag}-{i}", is_farmer=True)
+                for i in range(options['farmers'])
+            ])
+            farmers = Farmer.objects.bulk_create([Farmer(user=user, name=user.username, address="Bench") for user in users])
+            produce = Produce.objects.bulk_create([
+                Produce(farmer=farmer, name=name, price=Decimal(rng.randint(1000, 9000)) / 100, quantity=rng.randint(0, 500))
+                for farmer in farmers for name in rng.sample(NAMES, 5)
+            ])
+            # Order.post_save assigns couriers, so orders are bulk created like checkout does
+            for offset in range(0, options['lines'], 20_000):
+                count = min(20_000, options['lines'] - offset)
+                orders = Order.objects.bulk_create([
+                    Order(buyer=buyer, status='DELIVERED', created_at=now - timedelta(seconds=rng.randint(0, 90 * 86400)))
+                    for _ in range(count)
+                ], batch_size=5000)
+                lines = []
+                for order in orders:
+                    item = rng.choice(produce)
+                    quantity = rng.randint(1, 10)
+                    lines.append(OrderLine(
+                        order=order, produce=item, name=item.name, unit_price=item.price,
+                        quantity=quantity, line_total=item.price * quantity,
+                    ))
+                OrderLine.objects.bulk_create(lines, batch_size=5000)
+        self.stdout.write(f"Seeded {options['lines']:,} order lines for {len(farmers)} farmers in {time.perf_counter() - start:.0f}s")
+
+        try:
+            begin = time.perf_counter()
+            hourly, daily = sales.rebuild()
+            self.stdout.write(
+                f"Rebuilt {hourly:,} hourly and {daily:,} daily rollup rows in {time.perf_counter() - begin:.1f}s"
+            )
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+            self.compare(farmers, options['runs'])
+        finally:
+            Order.objects.filter(buyer=buyer).delete()
+            User.objects.filter(id__in=[user.id for user in users] + [buyer_user.id]).delete()
+
+    def compare(self, farmers, runs):
+        farmer = farmers[0]
+        since = timezone.localdate() - timedelta(days=29)
+
+        def timed(label, query):
+            timings = []
+            for _ in range(runs):
+                begin = time.perf_counter()
+                query()
+                timings.append((time.perf_counter() - begin) * 1000)
+            self.stdout.write(f"  {label:<44} median {statistics.median(timings):8.2f} ms")
+
+        def on_demand():
+            lines = OrderLine.objects.filter(produce__farmer=farmer, order__created_at__date__gte=since).exclude(
+                order__status='CANCELLED'
+            )
+            per_produce = list(lines.values('produce_id').annotate(
+                units=Sum('quantity'), revenue=Sum('line_total'), orders=Count('id')
+            ))
+            per_day = list(lines.annotate(day=TruncDate('order__created_at')).values('day').annotate(
+                units=Sum('quantity'), revenue=Sum('line_total')
+            ))
+            stock = list(Produce.objects.filter(farmer=farmer).values_list('id', 'quantity'))
+            return per_produce, per_day, stock
+
+        self.stdout.write("One farmer, last 30 days:")
+        timed("aggregate order lines on demand", on_demand)
+        timed("dashboard from rollups", lambda: sales.dashboard(farmer, days=30, hours=24))
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from buyer.push import StatusHub
+
+
+class Command(BaseCommand):
+    help = (
+        "Opens idle subscriptions on one event loop, as an ASGI worker holding status streams would, "
+        "reports their memory cost, then publishes from another thread and reports delivery latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=10_000)
+        parser.add_argument('--events', type=int, default=1_000, help="Events published, one per random user")
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options['connections'], options['events']))
+
+    async def run(self, connections, events):
+        hub = StatusHub()
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        subscriptions = [hub.subscribe(user_id) for user_id in range(connections)]
+        waiters = [asyncio.ensure_future(subscription.queue.get()) for subscription in subscriptions]
+        await asyncio.sleep(0)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        used = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+        self.stdout.write(
+            f"{hub.connection_count()} idle connections: {used / 1024 / 1024:.1f} MiB, "
+            f"{used / connections:.0f} bytes per connection (subscription, queue and waiting reader)"
+        )
+        for waiter in waiters:
+            waiter.cancel()
+
+        latencies = []
+        done = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        async def reader(subscription):
+            while True:
+                sent = await subscription.queue.get()
+                latencies.append(time.perf_counter() - sent)
+                if len(latencies) == events:
+                    done.set()
+
+        readers = [asyncio.ensure_future(reader(subscription)) for subscription in subscriptions]
+        await asyncio.sleep(0)
+
+        def publisher():
+            step = max(connections // events, 1)
+            for i in range(events):
+                hub.publish([(i * step) % connections], time.perf_counter())
+                time.sleep(0.001)
+
+        start = time.perf_counter()
+        thread = threading.Thread(target=publisher)
+        thread.start()
+        await asyncio.wait_for(done.wait(), timeout=60)
+        elapsed = time.perf_counter() - start
+        await loop.run_in_executor(None, thread.join)
+        for task in readers:
+            task.cancel()
+
+        latencies.sort()
+        self.stdout.write(
+            f"{events} events from another thread in {elapsed:.2f}s: "
+            f"p50 {latencies[len(latencies) // 2] * 1000:.3f} ms, "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.3f} ms publish-to-read"
+        )
@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from buyer.outbox import BATCH_SIZE, build_session, dispatch_batch
+
+
+class Command(BaseCommand):
+    help = "Deliver queued WhatsApp bot notifications from the outbox table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain due messages once and exit")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=2, help="Seconds to sleep when the outbox is empty")
+
+    def handle(self, *args, **options):
+        session = build_session()
+        while True:
+            if not settings.WHATSAPP_BOT_URL:
+                self.stderr.write("WHATSAPP_BOT_URL is not set; leaving outbox messages queued")
+                processed = 0
+            else:
+                processed = dispatch_batch(session, batch_size=options['batch_size'])
+                if processed:
+                    self.stdout.write(f"Processed {processed} outbox message(s)")
+
+            if options['once'] and processed < options['batch_size']:
+                return
+            if processed < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from buyer.pricing import REBUILD_CHUNK_SIZE, rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the PriceVolume rollup behind the market price index from all order lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=REBUILD_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rows = rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(f"Wrote {rows} price rollup row(s) in {time.perf_counter() - start:.2f}s")
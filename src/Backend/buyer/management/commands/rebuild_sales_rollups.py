@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from buyer.sales import REBUILD_CHUNK_SIZE, rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the hourly and daily produce sales rollups behind the farmer dashboard from all order lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=REBUILD_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        hourly, daily = rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(
+            f"Wrote {hourly} hourly and {daily} daily sales rollup row(s) in {time.perf_counter() - start:.2f}s"
+        )
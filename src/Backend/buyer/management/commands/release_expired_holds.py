@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from buyer.holds import SWEEP_BATCH_SIZE, release_expired
+
+
+class Command(BaseCommand):
+    help = "Return stock held by abandoned carts once their hold expires (see buyer.holds)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Release everything currently expired and exit")
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=30, help="Seconds to sleep when nothing is expired")
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired(batch_size=options['batch_size'])
+            if released:
+                self.stdout.write(f"Released {released} expired hold(s)")
+
+            if released < options['batch_size']:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyer", "0008_remove_order_paypal_order_id"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "farmer_lat", "farmer_lon"],
+                name="order_status_farmer_geo_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("farmer", "0004_farmer_latitude_farmer_longitude"),
+        ("buyer", "0009_order_status_farmer_geo_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="total",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.CreateModel(
+            name="OrderLine",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("unit_price", models.DecimalField(decimal_places=2, max_digits=8)),
+                ("quantity", models.PositiveIntegerField()),
+                ("line_total", models.DecimalField(decimal_places=2, max_digits=12)),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lines",
+                        to="buyer.order",
+                    ),
+                ),
+                (
+                    "produce",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="farmer.produce",
+                    ),
+                ),
+            ],
+        ),
+    ]
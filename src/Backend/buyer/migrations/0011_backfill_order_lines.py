@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def backfill_order_lines(apps, schema_editor):
+    # Orders placed before snapshots existed only point at live cart items;
+    # snapshot them with the current produce prices, which is the best we have.
+    Order = apps.get_model("buyer", "Order")
+    OrderLine = apps.get_model("buyer", "OrderLine")
+
+    for order in Order.objects.filter(lines__isnull=True).prefetch_related("items__produce").iterator(chunk_size=500):
+        lines = [
+            OrderLine(
+                order=order,
+                produce_id=item.produce_id,
+                name=item.produce.name,
+                unit_price=item.produce.price,
+                quantity=item.quantity,
+                line_total=item.produce.price * item.quantity,
+            )
+            for item in order.items.all()
+        ]
+        OrderLine.objects.bulk_create(lines)
+        order.total = sum((line.line_total for line in lines), 0)
+        order.save(update_fields=["total"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyer", "0010_orderline_order_total"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_order_lines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyer", "0012_outboxmessage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="sub_orders",
+                to="buyer.order",
+            ),
+        ),
+    ]
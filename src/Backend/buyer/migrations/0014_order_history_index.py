@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyer", "0013_order_parent"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["buyer", "-created_at", "-id"], name="order_buyer_history_idx"
+            ),
+        ),
+    ]
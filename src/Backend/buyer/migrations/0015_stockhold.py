@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("farmer", "0004_farmer_latitude_farmer_longitude"),
+        ("buyer", "0014_order_history_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockHold",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("quantity", models.PositiveIntegerField()),
+                ("expires_at", models.DateTimeField(db_index=True)),
+                (
+                    "cart_item",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="hold",
+                        to="buyer.cartitem",
+                    ),
+                ),
+                (
+                    "produce",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="holds",
+                        to="farmer.produce",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyer", "0016_order_events"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PriceVolume",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("day", models.DateField()),
+                ("unit_price", models.DecimalField(decimal_places=2, max_digits=8)),
+                ("units", models.IntegerField(default=0)),
+                ("lines", models.IntegerField(default=0)),
+            ],
+            options={
+                "indexes": [models.Index(fields=["day"], name="price_volume_day_idx")],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="pricevolume",
+            constraint=models.UniqueConstraint(
+                fields=("name", "day", "unit_price"), name="price_volume_uniq"
+            ),
+        ),
+    ]
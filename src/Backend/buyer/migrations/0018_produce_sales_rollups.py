@@ -0,0 +1,112 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("farmer", "0005_catalog_indexes"),
+        ("buyer", "0017_pricevolume"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyProduceSales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("units", models.IntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("lines", models.IntegerField(default=0)),
+                ("day", models.DateField()),
+                (
+                    "farmer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="farmer.farmer",
+                    ),
+                ),
+                (
+                    "produce",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="farmer.produce",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="HourlyProduceSales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("units", models.IntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("lines", models.IntegerField(default=0)),
+                ("hour", models.DateTimeField()),
+                (
+                    "farmer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="farmer.farmer",
+                    ),
+                ),
+                (
+                    "produce",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="farmer.produce",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["farmer", "hour"], name="hourly_sales_farmer_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="hourlyproducesales",
+            constraint=models.UniqueConstraint(
+                fields=("produce", "hour"), name="hourly_sales_uniq"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dailyproducesales",
+            index=models.Index(fields=["farmer", "day"], name="daily_sales_farmer_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="dailyproducesales",
+            constraint=models.UniqueConstraint(
+                fields=("produce", "day"), name="daily_sales_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def backfill_price_volume(apps, schema_editor):
+    # Orders placed before PriceVolume existed were never recorded, and cancelling one
+    # would take its lines out of empty buckets; rebuild the rollup from the order history.
+    from buyer.pricing import rebuild
+
+    rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyer", "0018_produce_sales_rollups"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_price_volume, migrations.RunPython.noop),
+    ]
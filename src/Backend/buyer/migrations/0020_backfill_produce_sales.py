@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def backfill_produce_sales(apps, schema_editor):
+    # Same as 0019 for the farmer dashboard rollups: fill them from the existing order
+    # history so cancellations of older orders have buckets to come out of.
+    from buyer.sales import rebuild
+
+    rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyer", "0019_backfill_pricevolume"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_produce_sales, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from django.conf import settings
-from farmer.models import Produce
+from farmer.models import Farmer, Produce
 from django.utils import timezone
 
 class Buyer(models.Model):
@@ -23,6 +23,31 @@ class CartItem(models.Model):
     class Meta:
         unique_together = ('buyer', 'produce')
 
+
+class StockHold(models.Model):
+    """
+    Stock set aside for a cart item until `expires_at` (see buyer.holds). The held quantity
+    is already subtracted from Produce.quantity; checkout turns the hold into a sale and
+    `manage.py release_expired_holds` gives expired holds back.
+    """
+    cart_item = models.OneToOneField(CartItem, related_name='hold', on_delete=models.CASCADE)
+    produce = models.ForeignKey(Produce, related_name='holds', on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Hold {self.produce_id} x {self.quantity} until {self.expires_at:%H:%M}"
+
+class OrderQuerySet(models.QuerySet):
+    def history(self):
+        """Buyer-facing orders (split parents, not their per-farmer sub-orders) with their lines loaded."""
+        return self.filter(parent__isnull=True).prefetch_related('lines', 'sub_orders__lines')
+
+    def for_receipt(self):
+        """Everything generate_order_pdf prints, in three queries."""
+        return self.select_related('buyer__user').prefetch_related('lines', 'sub_orders__lines')
+
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
@@ -34,9 +59,13 @@ class Order(models.Model):
     ]
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     buyer = models.ForeignKey(Buyer, related_name='orders', on_delete=models.CASCADE)
+    # Multi-farmer checkouts create one sub-order per farmer under a parent order
+    parent = models.ForeignKey('self', related_name='sub_orders', null=True, blank=True, on_delete=models.CASCADE)
     items = models.ManyToManyField(CartItem)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
     created_at = models.DateTimeField(default=timezone.now)
+    status_changed_at = models.DateTimeField(null=True, blank=True)  # null = still in its initial status
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
     # 🆕 Add these fields:
     buyer_lat = models.FloatField(null=True, blank=True)
@@ -44,5 +73,183 @@ class Order(models.Model):
     farmer_lat = models.FloatField(null=True, blank=True)
     farmer_lon = models.FloatField(null=True, blank=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Bounding-box prefilter for logistics.views.NearbyOrdersView
+            models.Index(fields=['status', 'farmer_lat', 'farmer_lon'], name='order_status_farmer_geo_idx'),
+            # Keyset pagination of a buyer's order history (buyer.views.OrderHistoryView)
+            models.Index(fields=['buyer', '-created_at', '-id'], name='order_buyer_history_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.id} - {self.status}"
+
+    def all_lines(self):
+        """Snapshot lines of this order, or of its sub-orders for a split parent order."""
+        sub_orders = self.sub_orders.all()
+        if sub_orders:
+            return [line for sub_order in sub_orders for line in sub_order.lines.all()]
+        return list(self.lines.all())
+
+
+class OrderEvent(models.Model):
+    """Append-only log of order status transitions (written by buyer.transitions)."""
+    order = models.ForeignKey(Order, related_name='events', on_delete=models.CASCADE)
+    from_status = models.CharField(max_length=10, choices=Order.STATUS_CHOICES)
+    to_status = models.CharField(max_length=10, choices=Order.STATUS_CHOICES)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, related_name='+', on_delete=models.SET_NULL)
+    seconds_in_previous = models.FloatField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['order', 'created_at'], name='order_event_order_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Order events are append-only")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Order {self.order_id}: {self.from_status} -> {self.to_status}"
+
+
+class OrderStatusTiming(models.Model):
+    """
+    Daily rollup of how long orders stayed in each status, updated with every transition
+    out of that status, so dashboards never scan orders or events.
+    """
+    status = models.CharField(max_length=10, choices=Order.STATUS_CHOICES)
+    day = models.DateField()
+    exits = models.PositiveIntegerField(default=0)
+    total_seconds = models.FloatField(default=0)
+    max_seconds = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['status', 'day'], name='status_timing_status_day_uniq')]
+        indexes = [
+            models.Index(fields=['day', 'status'], name='status_timing_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.status} on {self.day}: {self.exits} exits"
+
+
+class OrderLine(models.Model):
+    """Immutable snapshot of a cart item taken at checkout."""
+    order = models.ForeignKey(Order, related_name='lines', on_delete=models.CASCADE)
+    produce = models.ForeignKey(Produce, null=True, blank=True, related_name='+', on_delete=models.SET_NULL)
+    name = models.CharField(max_length=100)
+    unit_price = models.DecimalField(max_digits=8, decimal_places=2)
+    quantity = models.PositiveIntegerField()
+    line_total = models.DecimalField(max_digits=12, decimal_places=2)
+
+    @classmethod
+    def from_cart_item(cls, order, item):
+        return cls(
+            order=order,
+            produce=item.produce,
+            name=item.produce.name,
+            unit_price=item.produce.price,
+            quantity=item.quantity,
+            line_total=item.produce.price * item.quantity,
+        )
+
+    def __str__(self):
+        return f"{self.name} x {self.quantity}"
+
+
+class PriceVolume(models.Model):
+    """
+    Daily price histogram of sold produce: units and order lines per (name, day, unit price).
+    Updated by every checkout and cancellation (buyer.pricing) and read by the market price index.
+    """
+    name = models.CharField(max_length=100)  # normalized with farmer.search.normalize
+    day = models.DateField()
+    unit_price = models.DecimalField(max_digits=8, decimal_places=2)
+    units = models.IntegerField(default=0)
+    lines = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['name', 'day', 'unit_price'], name='price_volume_uniq')]
+        indexes = [
+            models.Index(fields=['day'], name='price_volume_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} on {self.day} at {self.unit_price}: {self.units} units"
+
+
+class ProduceSales(models.Model):
+    """
+    Sales of one produce listing per time bucket, for the farmer dashboard (buyer.sales).
+    `farmer` is copied from the produce so a farmer's buckets are one index range.
+    """
+    farmer = models.ForeignKey(Farmer, related_name='+', on_delete=models.CASCADE)
+    produce = models.ForeignKey(Produce, related_name='+', on_delete=models.CASCADE)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    lines = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class HourlyProduceSales(ProduceSales):
+    hour = models.DateTimeField()  # start of the hour
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['produce', 'hour'], name='hourly_sales_uniq')]
+        indexes = [
+            models.Index(fields=['farmer', 'hour'], name='hourly_sales_farmer_idx'),
+        ]
+
+    def __str__(self):
+        return f"Produce {self.produce_id} at {self.hour}: {self.units} units"
+
+
+class DailyProduceSales(ProduceSales):
+    day = models.DateField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['produce', 'day'], name='daily_sales_uniq')]
+        indexes = [
+            models.Index(fields=['farmer', 'day'], name='daily_sales_farmer_idx'),
+        ]
+
+    def __str__(self):
+        return f"Produce {self.produce_id} on {self.day}: {self.units} units"
+
+
+class OutboxMessage(models.Model):
+    """
+    Transactional outbox for calls to the WhatsApp bot.
+
+    Rows are written in the same transaction as the order that produces them and
+    delivered later by `python manage.py dispatch_outbox` (see buyer.outbox).
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('DEAD', 'Dead'),
+    ]
+    order = models.ForeignKey(Order, related_name='outbox_messages', null=True, blank=True, on_delete=models.SET_NULL)
+    endpoint = models.CharField(max_length=100)  # path on settings.WHATSAPP_BOT_URL, e.g. "/notify-farmer"
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Outbox {self.id} {self.endpoint} - {self.status}"
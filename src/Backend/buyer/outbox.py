@@ -0,0 +1,121 @@
+# buyer/outbox.py
+
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from logistics.models import CourierAssignment
+
+from .models import OutboxMessage
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 60 * 60
+REQUEST_TIMEOUT = (3, 10)  # (connect, read) seconds
+
+
+def build_session(pool_size=10):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def enqueue_farmer_notifications(notifications):
+    """
+    Queue one /notify-farmer message per (order, farmer_phone, items); call inside the
+    checkout transaction. The courier is filled in at send time, once assignment has run.
+    """
+    return OutboxMessage.objects.bulk_create([
+        OutboxMessage(
+            order=order,
+            endpoint="/notify-farmer",
+            payload={
+                "phone_number": farmer_phone,
+                "items": items,
+                "order_id": order.id,
+                "buyer_address": order.buyer.address,
+                "courier": None,
+            },
+        )
+        for order, farmer_phone, items in notifications
+    ])
+
+
+def fill_couriers(batch):
+    """Resolve the courier name of messages queued before their order was assigned."""
+    waiting = [message for message in batch if message.payload.get("courier", "") is None]
+    if not waiting:
+        return
+    names = dict(
+        CourierAssignment.objects.filter(order_id__in={message.order_id for message in waiting})
+        .values_list('order_id', 'courier__name')
+    )
+    for message in waiting:
+        message.payload["courier"] = names.get(message.order_id, "Unknown")
+
+
+def claim_batch(batch_size, now):
+    """
+    Take up to `batch_size` due messages in a short transaction. Their next attempt is pushed
+    past the time sending them can take, so other dispatchers skip them meanwhile and a
+    dispatcher that dies mid-batch only delays them.
+    """
+    with transaction.atomic():
+        # skip_locked lets several dispatchers share the table on PostgreSQL; SQLite ignores it
+        batch = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if batch:
+            lease = timedelta(seconds=len(batch) * sum(REQUEST_TIMEOUT) + 60)
+            OutboxMessage.objects.filter(pk__in=[message.pk for message in batch]).update(next_attempt_at=now + lease)
+        fill_couriers(batch)
+    return batch
+
+
+def dispatch_batch(session, batch_size=BATCH_SIZE, base_url=None):
+    """
+    Deliver one batch of due messages. Failures are retried with exponential
+    backoff and marked DEAD after MAX_ATTEMPTS. Returns the number of messages processed.
+
+    No transaction is open while the bot is called, so a slow or offline bot never holds
+    the database lock that checkouts need.
+    """
+    base_url = (base_url if base_url is not None else settings.WHATSAPP_BOT_URL).rstrip("/")
+    now = timezone.now()
+    batch = claim_batch(batch_size, now)
+
+    for message in batch:
+        message.attempts += 1
+        try:
+            response = session.post(f"{base_url}{message.endpoint}", json=message.payload, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            message.last_error = str(e)[:1000]
+            if message.attempts >= MAX_ATTEMPTS:
+                message.status = 'DEAD'
+                print(f" Outbox message {message.id} dead-lettered after {message.attempts} attempts: {e}")
+            else:
+                message.next_attempt_at = timezone.now() + backoff(message.attempts)
+        else:
+            message.status = 'SENT'
+            message.sent_at = timezone.now()
+            message.last_error = ""
+
+    with transaction.atomic():
+        OutboxMessage.objects.bulk_update(
+            batch, ['payload', 'status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+    return len(batch)
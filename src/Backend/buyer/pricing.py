@@ -0,0 +1,176 @@
+# buyer/pricing.py
+
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from farmer.search import expand, normalize
+
+from .models import OrderLine, PriceVolume
+from .rollups import increment
+
+# Longest window the index keeps and serves
+MAX_DAYS = 90
+REBUILD_CHUNK_SIZE = 5000
+
+
+def quantile(entries, total, q):
+    """Unit-weighted nearest-rank quantile of sorted [(price, units), ...]."""
+    target = q * total
+    cumulative = 0
+    for price, units in entries:
+        cumulative += units
+        if cumulative >= target:
+            return price
+    return entries[-1][0]
+
+
+class PriceIndex:
+    """
+    Process-wide market price index: per produce name, the last MAX_DAYS of PriceVolume.
+
+    Statistics for a (name, window) are computed once and kept until a sale or
+    cancellation of that name reaches this process, so repeated lookups are dict reads.
+    Loaded lazily and reloaded after `refresh_seconds` to pick up sales recorded by
+    other worker processes.
+    """
+
+    def __init__(self, refresh_seconds=300):
+        self.refresh_seconds = refresh_seconds
+        self._sales = defaultdict(dict)  # name -> {(day, unit_price): [units, lines]}
+        self._stats = {}                 # (name, since) -> stats dict or None
+        self._lock = threading.Lock()
+        self._loaded_at = None
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def ensure_loaded(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        since = timezone.localdate() - timedelta(days=MAX_DAYS - 1)
+        rows = PriceVolume.objects.filter(day__gte=since).values_list('name', 'day', 'unit_price', 'units', 'lines')
+        with self._lock:
+            self._sales.clear()
+            self._stats.clear()
+            for name, day, unit_price, units, lines in rows:
+                self._sales[name][(day, unit_price)] = [units, lines]
+            self._loaded_at = time.monotonic()
+
+    def apply(self, day, totals):
+        """Add {(name, unit_price): (units, lines)} sold on `day`; negative counts remove sales."""
+        if self._loaded_at is None:
+            return  # the next lookup loads everything anyway
+        with self._lock:
+            for (name, unit_price), (units, lines) in totals.items():
+                entry = self._sales[name].setdefault((day, unit_price), [0, 0])
+                entry[0] += units
+                entry[1] += lines
+                for key in [key for key in self._stats if key[0] == name]:
+                    del self._stats[key]
+
+    def resolve(self, name):
+        """The indexed name for `name`, falling back to its synonyms ("tamatar" -> "tomato")."""
+        self.ensure_loaded()
+        key = normalize(name)
+        if key in self._sales:
+            return key
+        for alternative, _ in sorted(expand(key).items(), key=lambda item: -item[1]):
+            if alternative in self._sales:
+                return alternative
+        return None
+
+    def names(self):
+        self.ensure_loaded()
+        return sorted(self._sales)
+
+    def stats(self, name, days):
+        """min/median/p90/max unit price, units and order lines of `name` over the last `days` days, or None."""
+        self.ensure_loaded()
+        since = timezone.localdate() - timedelta(days=days - 1)
+        key = (name, since)
+        with self._lock:
+            if key in self._stats:
+                return self._stats[key]
+
+            entries = defaultdict(int)
+            lines = 0
+            for (day, unit_price), (units, count) in self._sales.get(name, {}).items():
+                if day >= since and units > 0:
+                    entries[unit_price] += units
+                    lines += count
+            result = None
+            if entries:
+                entries = sorted(entries.items())
+                total = sum(units for _, units in entries)
+                result = {
+                    "name": name,
+                    "days": days,
+                    "since": since.isoformat(),
+                    "min": str(entries[0][0]),
+                    "median": str(quantile(entries, total, 0.5)),
+                    "p90": str(quantile(entries, total, 0.9)),
+                    "max": str(entries[-1][0]),
+                    "units": total,
+                    "orders": lines,
+                }
+            self._stats[key] = result
+            return result
+
+
+price_index = PriceIndex()
+
+
+def record_sales(lines, day=None, sign=1):
+    """
+    Add order lines to the PriceVolume rollup (sign=-1 takes them back out, for cancellations).
+    Runs in the caller's transaction; the in-memory index follows on commit.
+    """
+    day = day or timezone.localdate()
+    totals = defaultdict(lambda: [0, 0])
+    for line in lines:
+        entry = totals[(normalize(line.name), line.unit_price)]
+        entry[0] += sign * line.quantity
+        entry[1] += sign
+    if not totals:
+        return
+
+    increment(PriceVolume, ('name', 'day', 'unit_price'), {
+        (name, day, unit_price): {'units': units, 'lines': count} for (name, unit_price), (units, count) in totals.items()
+    })
+    totals = dict(totals)
+    transaction.on_commit(lambda: price_index.apply(day, totals))
+
+
+def rebuild(chunk_size=REBUILD_CHUNK_SIZE):
+    """
+    Recompute PriceVolume from every non-cancelled order line, streaming the history in
+    chunks and holding only the per-(name, day, price) totals. Returns the number of rows written.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    lines = (
+        OrderLine.objects.exclude(order__status='CANCELLED')
+        .values_list('name', 'unit_price', 'quantity', 'order__created_at')
+        .iterator(chunk_size=chunk_size)
+    )
+    for name, unit_price, quantity, created_at in lines:
+        entry = totals[(normalize(name), timezone.localdate(created_at), unit_price)]
+        entry[0] += quantity
+        entry[1] += 1
+
+    with transaction.atomic():
+        PriceVolume.objects.all().delete()
+        PriceVolume.objects.bulk_create(
+            [
+                PriceVolume(name=name, day=day, unit_price=unit_price, units=units, lines=count)
+                for (name, day, unit_price), (units, count) in totals.items()
+            ],
+            batch_size=chunk_size,
+        )
+    price_index.invalidate()
+    return len(totals)
@@ -0,0 +1,75 @@
+# buyer/push.py
+
+import asyncio
+import itertools
+import threading
+from collections import defaultdict
+
+# Events buffered per connection before the oldest are dropped (a stalled client must not grow memory)
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    __slots__ = ('id', 'user_id', 'loop', 'queue', 'dropped')
+
+    def __init__(self, subscription_id, user_id, loop):
+        self.id = subscription_id
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.dropped = 0
+
+    def deliver(self, event):
+        # Runs on the subscriber's event loop
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class StatusHub:
+    """
+    In-process fan-out of order status deltas to open push connections, keyed by user.
+
+    Connections subscribe from the event loop serving them; publish() may be called from
+    any thread (status changes are committed by sync views) and hands each event to the
+    subscriber's loop with call_soon_threadsafe. An idle connection costs one small object
+    and an empty asyncio.Queue. Events are only delivered within one process.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(dict)  # user_id -> {subscription_id: Subscription}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, user_id):
+        subscription = Subscription(next(self._ids), user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[user_id][subscription.id] = subscription
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.pop(subscription.id, None)
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_ids, event):
+        """Send `event` to every connection of `user_ids`. Returns the number of connections reached."""
+        with self._lock:
+            targets = [s for user_id in set(user_ids) for s in self._subscribers.get(user_id, {}).values()]
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                self.unsubscribe(subscription)  # its loop has shut down
+        return len(targets)
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+
+status_hub = StatusHub()
@@ -0,0 +1,32 @@
+# buyer/rollups.py
+
+from django.db.models import Case, F, Value, When
+
+
+def increment(model, key_fields, totals):
+    """
+    Add {key: {field: delta}} to rollup rows of `model`, identified by `key_fields` (which a
+    unique constraint must cover), creating missing rows first. Three queries whatever the
+    number of keys: an INSERT that skips existing rows, one read of the ids, one UPDATE.
+    """
+    if not totals:
+        return
+    model.objects.bulk_create([model(**dict(zip(key_fields, key))) for key in totals], ignore_conflicts=True)
+
+    # Each key field is filtered on its own values; keys outside `totals` are dropped below
+    lookups = {f"{field}__in": {key[i] for key in totals} for i, field in enumerate(key_fields)}
+    ids = {}
+    for pk, *key in model.objects.filter(**lookups).values_list('pk', *key_fields):
+        if tuple(key) in totals:
+            ids[tuple(key)] = pk
+    if not ids:
+        return
+
+    fields = {field for deltas in totals.values() for field in deltas}
+    model.objects.filter(pk__in=ids.values()).update(**{
+        field: F(field) + Case(
+            *[When(pk=pk, then=Value(totals[key].get(field, 0))) for key, pk in ids.items()],
+            output_field=model._meta.get_field(field),
+        )
+        for field in fields
+    })
@@ -0,0 +1,155 @@
+# buyer/sales.py
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from farmer.models import Produce
+
+from .models import DailyProduceSales, HourlyProduceSales, OrderLine
+from .rollups import increment
+
+# Longest windows the dashboard serves
+MAX_DAYS = 90
+MAX_HOURS = 168
+REBUILD_CHUNK_SIZE = 5000
+
+
+def hour_of(moment):
+    return timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def record_produce_sales(lines, when=None, sign=1):
+    """
+    Add order lines to the hourly and daily produce sales rollups (sign=-1 takes them back out,
+    for cancellations), in the caller's transaction, bucketed at `when`: the order's created_at,
+    so a cancellation hits the buckets its checkout filled. Lines need `produce` loaded; lines
+    whose listing was deleted belong to no farmer and are skipped.
+    """
+    when = when or timezone.now()
+    totals = defaultdict(lambda: {'units': 0, 'revenue': Decimal("0.00"), 'lines': 0})
+    for line in lines:
+        if line.produce is None:
+            continue
+        entry = totals[(line.produce.farmer_id, line.produce_id)]
+        entry['units'] += sign * line.quantity
+        entry['revenue'] += sign * line.line_total
+        entry['lines'] += sign
+
+    hour, day = hour_of(when), timezone.localdate(when)
+    increment(HourlyProduceSales, ('farmer_id', 'produce_id', 'hour'), {
+        (farmer_id, produce_id, hour): entry for (farmer_id, produce_id), entry in totals.items()
+    })
+    increment(DailyProduceSales, ('farmer_id', 'produce_id', 'day'), {
+        (farmer_id, produce_id, day): entry for (farmer_id, produce_id), entry in totals.items()
+    })
+
+
+def rebuild(chunk_size=REBUILD_CHUNK_SIZE):
+    """
+    Recompute both rollups from every non-cancelled order line, streaming the history in
+    chunks and holding only the per-bucket totals. Returns (hourly rows, daily rows) written.
+    """
+    hourly = defaultdict(lambda: [0, Decimal("0.00"), 0])
+    daily = defaultdict(lambda: [0, Decimal("0.00"), 0])
+    lines = (
+        OrderLine.objects.exclude(order__status='CANCELLED').filter(produce__isnull=False)
+        .values_list('produce_id', 'produce__farmer_id', 'quantity', 'line_total', 'order__created_at')
+        .iterator(chunk_size=chunk_size)
+    )
+    for produce_id, farmer_id, quantity, line_total, created_at in lines:
+        for entry in (
+            hourly[(farmer_id, produce_id, hour_of(created_at))],
+            daily[(farmer_id, produce_id, timezone.localdate(created_at))],
+        ):
+            entry[0] += quantity
+            entry[1] += line_total
+            entry[2] += 1
+
+    with transaction.atomic():
+        for model, bucket, totals in ((HourlyProduceSales, 'hour', hourly), (DailyProduceSales, 'day', daily)):
+            model.objects.all().delete()
+            model.objects.bulk_create(
+                [
+                    model(farmer_id=farmer_id, produce_id=produce_id, units=units, revenue=revenue, lines=count, **{bucket: key})
+                    for (farmer_id, produce_id, key), (units, revenue, count) in totals.items()
+                ],
+                batch_size=chunk_size,
+            )
+    return len(hourly), len(daily)
+
+
+def sell_through(sold, remaining):
+    """Share of the stock offered over the window that sold: sold / (sold + still in stock)."""
+    if sold + remaining <= 0:
+        return None
+    return round(sold / (sold + remaining), 3)
+
+
+def dashboard(farmer, days=30, hours=24):
+    """
+    The farmer's sales over the last `days` days: totals, one entry per listing (best selling
+    first) and a daily series, plus an hourly series over the last `hours` hours. Reads only
+    the rollups and the farmer's own listings, three queries whatever the order history.
+    Remaining stock is what buyers can still add to their carts.
+    """
+    today = timezone.localdate()
+    since = today - timedelta(days=days - 1)
+    first_hour = hour_of(timezone.now()) - timedelta(hours=hours - 1)
+
+    listings = {
+        produce_id: {"id": produce_id, "name": name, "price": str(price), "is_active": is_active,
+                     "remaining_stock": quantity, "units_sold": 0, "revenue": Decimal("0.00"), "orders": 0}
+        for produce_id, name, price, quantity, is_active in Produce.objects.filter(farmer=farmer)
+        .values_list('id', 'name', 'price', 'quantity', 'is_active')
+    }
+    per_day = defaultdict(lambda: [0, Decimal("0.00")])
+    rows = DailyProduceSales.objects.filter(farmer=farmer, day__gte=since).values_list(
+        'produce_id', 'day', 'units', 'revenue', 'lines'
+    )
+    for produce_id, day, units, revenue, count in rows:
+        listing = listings.get(produce_id)
+        if listing is not None:
+            listing["units_sold"] += units
+            listing["revenue"] += revenue
+            listing["orders"] += count
+        per_day[day][0] += units
+        per_day[day][1] += revenue
+
+    per_hour = defaultdict(lambda: [0, Decimal("0.00")])
+    rows = HourlyProduceSales.objects.filter(farmer=farmer, hour__gte=first_hour).values_list('hour', 'units', 'revenue')
+    for hour, units, revenue in rows:
+        entry = per_hour[hour_of(hour)]
+        entry[0] += units
+        entry[1] += revenue
+
+    produce = sorted(listings.values(), key=lambda listing: (-listing["revenue"], listing["id"]))
+    for listing in produce:
+        listing["sell_through"] = sell_through(listing["units_sold"], listing["remaining_stock"])
+        listing["revenue"] = str(listing["revenue"])
+
+    units_sold = sum(units for units, _ in per_day.values())
+    remaining = sum(listing["remaining_stock"] for listing in produce)
+    return {
+        "days": days,
+        "since": since.isoformat(),
+        "totals": {
+            "revenue": str(sum((revenue for _, revenue in per_day.values()), Decimal("0.00"))),
+            "units_sold": units_sold,
+            "orders": sum(listing["orders"] for listing in produce),
+            "remaining_stock": remaining,
+            "sell_through": sell_through(units_sold, remaining),
+        },
+        "produce": produce,
+        "daily": [
+            {"day": day.isoformat(), "units_sold": per_day[day][0], "revenue": str(per_day[day][1])}
+            for day in (since + timedelta(days=offset) for offset in range(days))
+        ],
+        "hourly": [
+            {"hour": hour.isoformat(), "units_sold": per_hour[hour][0], "revenue": str(per_hour[hour][1])}
+            for hour in (first_hour + timedelta(hours=offset) for offset in range(hours))
+        ],
+    }
@@ -1,7 +1,9 @@
 from rest_framework import serializers
-from .models import Buyer, CartItem, Order
+from .models import Buyer, CartItem, Order, OrderLine
 from farmer.serializers import ProduceSerializer
-from farmer.models import Produce
+from farmer.models import InsufficientStock, Produce
+from django.db import transaction
+from .holds import set_hold
 from django.conf import settings
 
 
@@ -21,18 +23,36 @@ class CartItemSerializer(serializers.ModelSerializer):
         produce = validated_data['produce']
         quantity = validated_data['quantity']
 
-        cart_item, created = CartItem.objects.get_or_create(
-            buyer=buyer,
-            produce=produce,
-            defaults={'quantity': quantity}
-        )
+        with transaction.atomic():
+            cart_item, created = CartItem.objects.get_or_create(
+                buyer=buyer,
+                produce=produce,
+                defaults={'quantity': quantity}
+            )
 
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.save()
+            if not created:
+                cart_item.quantity += quantity
+                cart_item.save()
 
+            self.hold(cart_item)
         return cart_item
 
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            cart_item = super().update(instance, validated_data)
+            self.hold(cart_item)
+        return cart_item
+
+    def hold(self, cart_item):
+        # Set the cart's stock aside for CART_HOLD_MINUTES (buyer.holds)
+        try:
+            set_hold(cart_item, cart_item.quantity)
+        except InsufficientStock as e:
+            shortage = e.shortages[0] if e.shortages else None
+            raise serializers.ValidationError({
+                "quantity": f"Only {shortage['available']} more available" if shortage else "Stock changed, please retry"
+            })
+
 
 
 class BuyerSerializer(serializers.ModelSerializer):
@@ -43,18 +63,40 @@ class BuyerSerializer(serializers.ModelSerializer):
         model = Buyer
         fields = ['id', 'address', 'cart', 'orders']
 
+class BuyerProfileSerializer(BuyerSerializer):
+    """BuyerSerializer without the full order list, which is paginated separately."""
+
+    class Meta(BuyerSerializer.Meta):
+        fields = ['id', 'address', 'cart']
+
+
+class OrderLineSerializer(serializers.ModelSerializer):
+    produce_info = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrderLine
+        fields = ['id', 'produce', 'name', 'unit_price', 'quantity', 'line_total', 'produce_info']
+
+    def get_produce_info(self, obj):
+        # Same shape as CartItemSerializer.produce_info, built from the snapshot
+        return {'id': obj.produce_id, 'name': obj.name, 'price': str(obj.unit_price)}
+
+
+class SubOrderSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Order
+        fields = ['id', 'status', 'total']
+
+
 class OrderSerializer(serializers.ModelSerializer):
-    items = CartItemSerializer(many=True)
-    total = serializers.SerializerMethodField()
+    items = OrderLineSerializer(source='all_lines', many=True, read_only=True)
+    sub_orders = SubOrderSerializer(many=True, read_only=True)
     receipt_pdf_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Order
-        fields = ['id', 'status', 'created_at', 'items', 'total', 'receipt_pdf_url']
-
-    def get_total(self, obj):
-        return sum(item.produce.price * item.quantity for item in obj.items.all())
+        fields = ['id', 'status', 'created_at', 'items', 'sub_orders', 'total', 'receipt_pdf_url']
+        read_only_fields = ['total']
 
     def get_receipt_pdf_url(self, obj):
-        return f"{settings.DOMAIN}/api/v1/orders/{obj.id}/receipt/"
-
+        return f"{settings.DOMAIN}/api/v1/auth/orders/{obj.id}/receipt/"
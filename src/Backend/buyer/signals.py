@@ -1,9 +1,41 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
-from buyer.models import Order
+from api.geocoding import enqueue_geocoding
+from buyer.holds import release_cart_item
+from buyer.models import Buyer, CartItem, Order
+from buyer.push import status_hub
+from buyer.transitions import order_status_changed
 from logistics.utils import assign_order_to_courier
 
 @receiver(post_save, sender=Order)
 def assign_courier_on_order(sender, instance, created, **kwargs):
     if created:
         assign_order_to_courier(instance)
+
+@receiver(post_save, sender=Buyer)
+def geocode_buyer_address(sender, instance, **kwargs):
+    enqueue_geocoding(instance)
+
+@receiver(pre_delete, sender=CartItem)
+def release_cart_hold(sender, instance, **kwargs):
+    release_cart_item(instance)
+
+
+@receiver(order_status_changed)
+def push_status_change(sender, order_id, from_status, to_status, changed_at, **kwargs):
+    if not status_hub.connection_count():
+        return
+    recipients = Order.objects.filter(pk=order_id).values_list(
+        'parent_id', 'buyer__user_id', 'courierassignment__courier__user_id'
+    ).first()
+    if recipients is None:
+        return
+    parent_id, *user_ids = recipients
+    status_hub.publish([user_id for user_id in user_ids if user_id], {
+        "order_id": order_id,
+        "parent_id": parent_id,
+        "status": to_status,
+        "previous_status": from_status,
+        "changed_at": changed_at.isoformat(),
+    })
+
@@ -1,3 +1,556 @@
-from django.test import TestCase
+import asyncio
+import copy
+import hashlib
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import requests
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import caches
+from django.db import connection
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import IdempotencyKey, User
+from buyer.holds import release_expired
+from buyer.models import (
+    Buyer, CartItem, DailyProduceSales, HourlyProduceSales, Order, OrderEvent, OutboxMessage, PriceVolume, StockHold,
+)
+from buyer.outbox import MAX_ATTEMPTS, dispatch_batch
+from buyer.pricing import price_index, rebuild
+from buyer.push import status_hub
+from buyer import sales
+from buyer.serializers import OrderSerializer
+from buyer.transitions import InvalidTransition, transition
+from buyer.views import order_status_stream
+from farmer.models import Farmer, Produce
+from logistics.models import CourierAssignment, LogisticsPartner
+from logistics.receipts import receipt_key, receipt_renderer
+from logistics.spatial import courier_index
+from logistics.utils import ReceiptTemplate, generate_order_pdf
+
+
+class CheckoutTestCase(TestCase):
+    def setUp(self):
+        courier_index.invalidate()
+        buyer_user = User.objects.create_user(username='buyer', password='pass', phone_number='1000', is_buyer=True)
+        self.buyer = Buyer.objects.create(user=buyer_user, address='Delhi', latitude=28.61, longitude=77.20)
+        farmer_user = User.objects.create_user(username='farmer', password='pass', phone_number='2000', is_farmer=True)
+        self.farmer = Farmer.objects.create(user=farmer_user, name='Ravi', address='Farm', latitude=28.62, longitude=77.21)
+        self.client = APIClient()
+        self.client.force_authenticate(buyer_user)
+
+    def add_to_cart(self, name, price, stock, quantity):
+        produce = Produce.objects.create(farmer=self.farmer, name=name, price=price, quantity=stock)
+        return CartItem.objects.create(buyer=self.buyer, produce=produce, quantity=quantity)
+
+    def checkout(self):
+        return self.client.post('/api/v1/orders/create-from-cart/')
+
+
+class OrderSnapshotTests(CheckoutTestCase):
+    def test_checkout_snapshots_lines_and_total(self):
+        tomato = self.add_to_cart('Tomato', '20.50', 10, 2)
+        self.add_to_cart('Onion', '30.00', 10, 3)
+
+        response = self.checkout()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.data['total']), Decimal('131.00'))
+
+        order = Order.objects.get(pk=response.data['id'])
+        self.assertEqual(order.total, Decimal('131.00'))
+        self.assertEqual(
+            sorted((line.name, line.quantity, line.line_total) for line in order.lines.all()),
+            [('Onion', 3, Decimal('90.00')), ('Tomato', 2, Decimal('41.00'))],
+        )
+
+        # Later edits to the cart or the listing do not rewrite the order
+        tomato.quantity = 9
+        tomato.save()
+        Produce.objects.filter(pk=tomato.produce_id).update(price=99)
+        order.refresh_from_db()
+        self.assertEqual(order.total, Decimal('131.00'))
+        self.assertEqual(order.lines.get(name='Tomato').quantity, 2)
+
+    def test_serializing_orders_does_not_touch_produce(self):
+        self.add_to_cart('Tomato', '20.00', 10, 1)
+        self.checkout()
+
+        orders = Order.objects.prefetch_related('lines', 'sub_orders__lines')
+        with self.assertNumQueries(3):
+            data = OrderSerializer(orders, many=True).data
+        self.assertEqual(data[0]['items'][0]['produce_info']['name'], 'Tomato')
+
+    def test_receipt_renders_from_snapshot(self):
+        self.add_to_cart('Tomato', '20.00', 10, 1)
+        order_id = self.checkout().data['id']
+
+        response = self.client.get(f'/api/v1/auth/orders/{order_id}/receipt/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+
+# Pool threads use their own connections and cannot see the test transaction; see
+# logistics.tests.AssignOrdersConcurrentlyTests for the threaded path
+@override_settings(CHECKOUT_ASSIGNMENT_WORKERS=1)
+class SplitCheckoutTests(CheckoutTestCase):
+    def setUp(self):
+        super().setUp()
+        farmer_user = User.objects.create_user(username='farmer2', password='pass', phone_number='2001', is_farmer=True)
+        self.other_farmer = Farmer.objects.create(user=farmer_user, name='Sita', address='Farm 2', latitude=28.70, longitude=77.10)
+        courier_user = User.objects.create_user(username='courier', password='pass', phone_number='3000', is_logistics=True)
+        LogisticsPartner.objects.create(user=courier_user, name='Raju', address='Depot', latitude=28.65, longitude=77.15)
+
+    def test_cart_is_split_per_farmer_under_a_parent(self):
+        self.add_to_cart('Tomato', '20.00', 10, 2)
+        produce = Produce.objects.create(farmer=self.other_farmer, name='Onion', price='30.00', quantity=10)
+        CartItem.objects.create(buyer=self.buyer, produce=produce, quantity=1)
+
+        response = self.checkout()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.data['total']), Decimal('70.00'))
+        self.assertEqual(sorted(item['name'] for item in response.data['items']), ['Onion', 'Tomato'])
+
+        parent = Order.objects.get(pk=response.data['id'])
+        self.assertIsNone(parent.farmer_lat)
+        sub_orders = {order.farmer_lat: order for order in parent.sub_orders.all()}
+        self.assertEqual(sorted(sub_orders), [28.62, 28.70])
+        self.assertEqual(sub_orders[28.62].total, Decimal('40.00'))
+        self.assertEqual([line.name for line in sub_orders[28.70].lines.all()], ['Onion'])
+
+        # Each farmer pickup gets a courier; the parent is never dispatched itself
+        self.assertEqual(CourierAssignment.objects.filter(order__parent=parent).count(), 2)
+        self.assertFalse(CourierAssignment.objects.filter(order=parent).exists())
+
+        messages = OutboxMessage.objects.order_by('payload__phone_number')
+        self.assertEqual([m.order_id for m in messages], [sub_orders[28.62].id, sub_orders[28.70].id])
+
+    def test_confirming_parent_confirms_sub_orders(self):
+        self.add_to_cart('Tomato', '20.00', 10, 2)
+        produce = Produce.objects.create(farmer=self.other_farmer, name='Onion', price='30.00', quantity=10)
+        CartItem.objects.create(buyer=self.buyer, produce=produce, quantity=1)
+        order_id = self.checkout().data['id']
+
+        self.client.post(f'/api/v1/orders/{order_id}/confirm/')
+        self.assertEqual(set(Order.objects.values_list('status', flat=True)), {'CONFIRMED'})
+
+    def test_cancelling_parent_cancels_sub_orders_or_nothing(self):
+        self.add_to_cart('Tomato', '20.00', 10, 2)
+        produce = Produce.objects.create(farmer=self.other_farmer, name='Onion', price='30.00', quantity=10)
+        CartItem.objects.create(buyer=self.buyer, produce=produce, quantity=1)
+        parent = Order.objects.get(pk=self.checkout().data['id'])
+        first, second = parent.sub_orders.order_by('id')
+
+        transition(first, 'CONFIRMED')
+        transition(first, 'PICKED_UP')
+        with self.assertRaises(InvalidTransition):
+            transition(Order.objects.get(pk=parent.pk), 'CANCELLED')
+        self.assertEqual(
+            dict(Order.objects.values_list('id', 'status')),
+            {parent.id: 'PENDING', first.id: 'PICKED_UP', second.id: 'PENDING'},
+        )
+
+        Order.objects.filter(pk=first.pk).update(status='PENDING')
+        transition(parent, 'CANCELLED')
+        self.assertEqual(set(Order.objects.values_list('status', flat=True)), {'CANCELLED'})
+        self.assertEqual(OrderEvent.objects.filter(order__parent=parent, to_status='CANCELLED').count(), 2)
+
+
+class ReceiptCacheTests(CheckoutTestCase):
+    def setUp(self):
+        super().setUp()
+        caches['receipts'].clear()
+        self.add_to_cart('Tomato', '20.00', 10, 1)
+        self.order_id = self.checkout().data['id']
+        self.url = f'/api/v1/auth/orders/{self.order_id}/receipt/'
+
+    def test_repeat_downloads_are_not_re_rendered(self):
+        with mock.patch('logistics.receipts.generate_order_pdf', wraps=generate_order_pdf) as render:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(b''.join(second.streaming_content), b''.join(first.streaming_content))
+        self.assertTrue(first['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_receipts_do_not_share_layout_state_with_the_template(self):
+        template = ReceiptTemplate()
+        original = template.guidelines[0]
+        frags = copy.deepcopy(original.frags)
+        clone = template.static(original)
+        self.assertIsNot(clone.frags, original.frags)
+        self.assertIsNot(clone.frags[0], original.frags[0])
+
+        generate_order_pdf(Order.objects.get(pk=self.order_id), template=template)
+        self.assertFalse(hasattr(original, 'blPara'))
+        self.assertEqual([vars(frag) for frag in original.frags], [vars(frag) for frag in frags])
+
+    @override_settings(RECEIPT_RENDER_WORKERS=1)
+    def test_status_change_prerenders_off_the_request(self):
+        order = Order.objects.get(pk=self.order_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            transition(order, 'CONFIRMED')
+
+        future = receipt_renderer.pending(receipt_key(Order.objects.for_receipt().get(pk=self.order_id)))
+        if future is not None:
+            future.result(timeout=60)  # the first render also pays for starting the worker process
+
+        # Served from the background render, not rendered here
+        with mock.patch('logistics.receipts.generate_order_pdf') as render:
+            response = self.client.get(self.url)
+        render.assert_not_called()
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    @override_settings(RECEIPT_RENDER_WORKERS=1)
+    def test_plain_saves_do_not_prerender(self):
+        order = Order.objects.get(pk=self.order_id)
+        with mock.patch('logistics.signals.schedule_receipts') as schedule:
+            order.save()
+        schedule.assert_not_called()
+
+    def test_status_change_invalidates(self):
+        etag = self.client.get(self.url)['ETag']
+        Order.objects.filter(pk=self.order_id).update(status='CONFIRMED')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class IdempotentCheckoutTests(CheckoutTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_to_cart('Tomato', '20.00', 10, 2)
+
+    def checkout(self, key, **extra):
+        return self.client.post('/api/v1/orders/create-from-cart/', HTTP_IDEMPOTENCY_KEY=key, **extra)
+
+    def test_retry_replays_the_first_response(self):
+        first = self.checkout('abc')
+        with self.assertNumQueries(1):  # key lookup only; stock, orders and outbox are untouched
+            retry = self.checkout('abc')
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Produce.objects.get().quantity, 8)
+
+        self.assertNotEqual(self.checkout('def').data['id'], first.data['id'])
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0.1)
+    def test_duplicate_while_first_is_running(self):
+        now = timezone.now()
+        IdempotencyKey.objects.create(
+            user=self.buyer.user, key='abc', request_hash=hashlib.sha256(b'POST /api/v1/orders/create-from-cart/\n').hexdigest(),
+            created_at=now, expires_at=now + timedelta(hours=1),
+        )
+        self.assertEqual(self.checkout('abc').status_code, 409)
+        self.assertFalse(Order.objects.exists())
+
+    def test_key_reused_for_another_request(self):
+        self.checkout('abc')
+        response = self.checkout('abc', data={'note': 'different'}, format='json')
+        self.assertEqual(response.status_code, 422)
+
+
+class StatusStreamTests(CheckoutTestCase):
+    def test_stream_pushes_only_the_subscribers_status_deltas(self):
+        self.add_to_cart('Tomato', '20.00', 10, 1)
+        order_id = self.checkout().data['id']
+        token = str(RefreshToken.for_user(self.buyer.user).access_token)
+
+        def confirm():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'/api/v1/orders/{order_id}/confirm/')
+
+        async def scenario():
+            request = AsyncRequestFactory().get('/api/v1/orders/status-stream/', {'token': token})
+            response = await order_status_stream(request)
+            stream = response.streaming_content.__aiter__()
+            first = await stream.__anext__()
+            await sync_to_async(confirm)()
+            event = await asyncio.wait_for(stream.__anext__(), 5)
+            await stream.aclose()
+            return first, event
+
+        first, event = async_to_sync(scenario)()
+        self.assertTrue(first.startswith(b'retry:'))
+        name, data = event.decode().strip().split('\n')
+        self.assertEqual(name, 'event: status')
+        self.assertEqual(
+            {k: v for k, v in json.loads(data[len('data: '):]).items() if k != 'changed_at'},
+            {'order_id': order_id, 'parent_id': None, 'status': 'CONFIRMED', 'previous_status': 'PENDING'},
+        )
+        self.assertEqual(status_hub.connection_count(), 0)
+
+    def test_stream_to_a_departed_client_ends_and_unsubscribes(self):
+        token = str(RefreshToken.for_user(self.buyer.user).access_token)
+
+        async def scenario():
+            request = AsyncRequestFactory().get('/api/v1/orders/status-stream/', {'token': token})
+            response = await order_status_stream(request)
+            subscribed = status_hub.connection_count()
+            # Django 4.2 keeps pulling from the stream after the client has gone, never closing it
+            chunks = [chunk async for chunk in response.streaming_content]
+            return subscribed, chunks
+
+        with mock.patch('buyer.views.STREAM_MAX_SECONDS', 0.2), mock.patch('buyer.views.STREAM_KEEPALIVE_SECONDS', 0.05):
+            subscribed, chunks = async_to_sync(scenario)()
+        self.assertEqual(subscribed, 1)
+        self.assertIn(b': keepalive\n\n', chunks)
+        self.assertEqual(status_hub.connection_count(), 0)
+
+    def test_stream_requires_a_valid_token(self):
+        request = AsyncRequestFactory().get('/api/v1/orders/status-stream/', {'token': 'nope'})
+        response = async_to_sync(order_status_stream)(request)
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_is_refused_under_wsgi(self):
+        token = str(RefreshToken.for_user(self.buyer.user).access_token)
+        request = RequestFactory().get('/api/v1/orders/status-stream/', {'token': token})
+        response = async_to_sync(order_status_stream)(request)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(status_hub.connection_count(), 0)
+
+
+class MarketPriceTests(CheckoutTestCase):
+    def setUp(self):
+        super().setUp()
+        price_index.invalidate()
+
+    def buy(self, price, quantity):
+        item = self.add_to_cart('Tomato', price, 20, quantity)
+        with self.captureOnCommitCallbacks(execute=True):
+            order_id = self.checkout().data['id']
+        item.delete()  # checkout leaves the cart as it is
+        return order_id
+
+    def prices(self, name='tomato'):
+        return self.client.get('/api/v1/market-prices/', {'name': name, 'days': 7})
+
+    def test_index_follows_checkouts_and_cancellations(self):
+        self.buy('20.00', 8)
+        self.assertEqual(self.prices().data['units'], 8)  # index loaded; later sales arrive incrementally
+        self.buy('30.00', 1)
+        cancelled = self.buy('40.00', 1)
+
+        expected = {'min': '20.00', 'median': '20.00', 'p90': '30.00', 'max': '40.00', 'units': 10, 'orders': 3}
+        with self.assertNumQueries(0):
+            entry = self.prices('Tamatar').data
+        self.assertEqual({key: entry[key] for key in expected}, expected)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transition(Order.objects.get(pk=cancelled), 'CANCELLED')
+        after_cancel = {**expected, 'max': '30.00', 'units': 9, 'orders': 2}
+        entry = self.prices().data
+        self.assertEqual({key: entry[key] for key in after_cancel}, after_cancel)
+
+        rebuild()
+        entry = self.prices().data
+        self.assertEqual({key: entry[key] for key in after_cancel}, after_cancel)
+        self.assertEqual(self.prices('mango').status_code, 404)
+
+    @override_settings(CHECKOUT_ASSIGNMENT_WORKERS=1)
+    def test_cancelling_a_split_order_withdraws_every_farmers_sales(self):
+        farmer_user = User.objects.create_user(username='farmer2', password='pass', phone_number='2001', is_farmer=True)
+        other = Farmer.objects.create(user=farmer_user, name='Sita', address='Farm 2', latitude=28.70, longitude=77.10)
+        self.add_to_cart('Tomato', '20.00', 10, 2)
+        produce = Produce.objects.create(farmer=other, name='Tomato', price='30.00', quantity=10)
+        CartItem.objects.create(buyer=self.buyer, produce=produce, quantity=2)
+        parent = Order.objects.get(pk=self.checkout().data['id'])
+        self.assertEqual(list(PriceVolume.objects.values_list('units', 'lines')), [(2, 1), (2, 1)])
+
+        # Withdrawn in the cancelling transaction, not after commit
+        transition(parent, 'CANCELLED')
+        self.assertEqual(list(PriceVolume.objects.values_list('units', 'lines')), [(0, 0), (0, 0)])
+
+
+class SalesDashboardTests(CheckoutTestCase):
+    def setUp(self):
+        super().setUp()
+        self.farmer_client = APIClient()
+        self.farmer_client.force_authenticate(self.farmer.user)
+
+    def dashboard(self, **params):
+        return self.farmer_client.get('/api/v1/farmer/dashboard/', params)
+
+    def test_rollups_follow_checkouts_and_cancellations(self):
+        tomato = self.add_to_cart('Tomato', '20.00', 20, 8)
+        onion = self.add_to_cart('Onion', '30.00', 10, 2)
+        self.assertEqual(self.checkout().status_code, 200)
+        CartItem.objects.all().delete()
+        CartItem.objects.create(buyer=self.buyer, produce=tomato.produce, quantity=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            cancelled = self.checkout().data['id']
+        CartItem.objects.all().delete()
+
+        self.assertEqual(self.dashboard().data['totals']['units_sold'], 12)
+        with self.captureOnCommitCallbacks(execute=True):
+            transition(Order.objects.get(pk=cancelled), 'CANCELLED')
+
+        stock = dict(Produce.objects.values_list('name', 'quantity'))
+        for rebuilt in (False, True):
+            if rebuilt:
+                sales.rebuild()
+            with self.assertNumQueries(4):
+                data = self.dashboard(days=7, hours=6).data
+            self.assertEqual(
+                [(p['name'], p['units_sold'], p['revenue'], p['orders'], p['remaining_stock']) for p in data['produce']],
+                [('Tomato', 8, '160.00', 1, stock['Tomato']), ('Onion', 2, '60.00', 1, stock['Onion'])],
+            )
+            self.assertEqual(data['produce'][1]['sell_through'], round(2 / (2 + stock['Onion']), 3))
+            self.assertEqual(data['totals']['revenue'], '220.00')
+            self.assertEqual((len(data['daily']), len(data['hourly'])), (7, 6))
+            self.assertEqual(data['daily'][-1], {'day': timezone.localdate().isoformat(), 'units_sold': 10, 'revenue': '220.00'})
+            self.assertEqual(data['hourly'][-1]['units_sold'], 10)
+            self.assertEqual(sum(day['units_sold'] for day in data['daily'][:-1]), 0)
+
+    @override_settings(CHECKOUT_ASSIGNMENT_WORKERS=1)
+    def test_cancelling_a_split_order_empties_its_buckets(self):
+        farmer_user = User.objects.create_user(username='farmer2', password='pass', phone_number='2001', is_farmer=True)
+        other = Farmer.objects.create(user=farmer_user, name='Sita', address='Farm 2', latitude=28.70, longitude=77.10)
+        self.add_to_cart('Tomato', '20.00', 10, 2)
+        produce = Produce.objects.create(farmer=other, name='Onion', price='30.00', quantity=10)
+        CartItem.objects.create(buyer=self.buyer, produce=produce, quantity=1)
+        parent = Order.objects.get(pk=self.checkout().data['id'])
+
+        # Cancelled in a later hour: the withdrawal still lands in the checkout's buckets
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(hours=3)):
+            transition(parent, 'CANCELLED')
+        for model in (HourlyProduceSales, DailyProduceSales):
+            self.assertEqual(list(model.objects.values_list('units', 'revenue', 'lines')), [(0, 0, 0), (0, 0, 0)])
+
+    def test_only_farmers_get_a_dashboard(self):
+        self.assertEqual(self.client.get('/api/v1/farmer/dashboard/').status_code, 403)
+        self.assertEqual(self.dashboard(days=0).status_code, 400)
+        self.assertEqual(self.dashboard(hours='x').status_code, 400)
+
+
+class CheckoutStockTests(CheckoutTestCase):
+    def test_short_items_are_all_reported_and_nothing_is_sold(self):
+        tomato = self.add_to_cart('Tomato', '20.00', 1, 2)
+        onion = self.add_to_cart('Onion', '30.00', 0, 1)
+        self.add_to_cart('Potato', '10.00', 5, 1)
+
+        response = self.checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(s['produce'] for s in response.data['shortages']), sorted([tomato.produce_id, onion.produce_id]))
+        self.assertEqual(Produce.objects.get(name='Potato').quantity, 5)
+        self.assertFalse(Order.objects.exists())
+
+    def test_checkout_decrements_stock(self):
+        item = self.add_to_cart('Tomato', '20.00', 2, 2)
+        self.assertEqual(self.checkout().status_code, 200)
+
+        produce = Produce.objects.get(pk=item.produce_id)
+        self.assertEqual(produce.quantity, 0)
+        self.assertFalse(produce.is_active)
+
+
+class CartHoldTests(CheckoutTestCase):
+    def setUp(self):
+        super().setUp()
+        self.produce = Produce.objects.create(farmer=self.farmer, name='Tomato', price='20.00', quantity=5)
+
+    def add(self, quantity):
+        return self.client.post('/api/v1/cart/', {'produce': self.produce.id, 'quantity': quantity}, format='json')
+
+    def stock(self):
+        return Produce.objects.get(pk=self.produce.pk).quantity
+
+    def test_adding_to_cart_holds_stock(self):
+        self.assertEqual(self.add(2).status_code, 201)
+        self.assertEqual(self.add(1).status_code, 201)
+        self.assertEqual(self.stock(), 2)
+        self.assertEqual(StockHold.objects.get().quantity, 3)
+
+        response = self.add(3)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(CartItem.objects.get().quantity, 3)
+        self.assertEqual(self.stock(), 2)
+
+    def test_checkout_converts_the_hold(self):
+        self.add(2)
+        self.assertEqual(self.checkout().status_code, 200)
+        self.assertEqual(self.stock(), 3)
+        self.assertFalse(StockHold.objects.exists())
+
+    def test_expired_holds_are_released(self):
+        self.add(2)
+        StockHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(release_expired(), 1)
+        self.assertEqual(self.stock(), 5)
+
+        # The cart item is still there; checkout now takes the stock directly
+        self.assertEqual(self.checkout().status_code, 200)
+        self.assertEqual(self.stock(), 3)
+
+    def test_removing_from_cart_returns_stock(self):
+        item_id = self.add(2).data['id']
+        self.client.delete(f'/api/v1/cart/{item_id}/')
+        self.assertEqual(self.stock(), 5)
+        self.assertFalse(StockHold.objects.exists())
+
+
+class FakeSession:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+        self.atomic_depths = []
+
+    def post(self, url, json, timeout):
+        self.calls.append((url, json))
+        self.atomic_depths.append(len(connection.atomic_blocks))
+        if self.fail:
+            raise requests.ConnectionError("bot offline")
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+
+class OutboxTests(CheckoutTestCase):
+    def test_checkout_queues_one_notification_per_farmer(self):
+        self.add_to_cart('Tomato', '20.00', 10, 2)
+        self.add_to_cart('Onion', '30.00', 10, 1)
+        order_id = self.checkout().data['id']
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.order_id, order_id)
+        self.assertEqual(message.status, 'PENDING')
+        self.assertEqual(message.payload['phone_number'], '2000')
+        self.assertEqual(sorted(i['produce'] for i in message.payload['items']), ['Onion', 'Tomato'])
+
+    def test_dispatch_marks_sent(self):
+        self.add_to_cart('Tomato', '20.00', 10, 2)
+        self.checkout()
+
+        session = FakeSession()
+        depth = len(connection.atomic_blocks)  # the test's own transactions
+        self.assertEqual(dispatch_batch(session, base_url='http://bot'), 1)
+        self.assertEqual(session.atomic_depths, [depth])  # the bot is called outside the claim transaction
+        self.assertEqual(session.calls[0][0], 'http://bot/notify-farmer')
+        self.assertEqual(session.calls[0][1]['courier'], 'Unknown')
+        self.assertEqual(OutboxMessage.objects.get().status, 'SENT')
+        self.assertEqual(dispatch_batch(session, base_url='http://bot'), 0)
+
+    def test_failures_back_off_then_dead_letter(self):
+        self.add_to_cart('Tomato', '20.00', 10, 2)
+        self.checkout()
+        session = FakeSession(fail=True)
+
+        dispatch_batch(session, base_url='http://bot')
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('PENDING', 1))
+        self.assertEqual(dispatch_batch(session, base_url='http://bot'), 0)  # not due yet
+
+        OutboxMessage.objects.update(attempts=MAX_ATTEMPTS - 1, next_attempt_at=message.created_at)
+        dispatch_batch(session, base_url='http://bot')
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'DEAD')
+        self.assertIn('bot offline', message.last_error)
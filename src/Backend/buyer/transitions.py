@@ -0,0 +1,94 @@
+# buyer/transitions.py
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Order, OrderEvent, OrderLine, OrderStatusTiming
+from .pricing import record_sales
+from .sales import record_produce_sales
+
+# Allowed next statuses; DELIVERED and CANCELLED are final
+TRANSITIONS = {
+    'PENDING': {'CONFIRMED', 'CANCELLED'},
+    'CONFIRMED': {'PICKED_UP', 'CANCELLED'},
+    'PICKED_UP': {'IN_TRANSIT', 'DELIVERED'},
+    'IN_TRANSIT': {'DELIVERED'},
+    'DELIVERED': set(),
+    'CANCELLED': set(),
+}
+
+# Sent after commit with order_id, from_status, to_status, changed_at; see buyer.signals and logistics.signals
+order_status_changed = Signal()
+
+
+class InvalidTransition(Exception):
+    def __init__(self, order, to_status, reason=None):
+        self.order_id = order.id
+        self.from_status = order.status
+        self.to_status = to_status
+        allowed = sorted(TRANSITIONS.get(order.status, ()))
+        super().__init__(
+            reason or f"Order {order.id} cannot go from {order.status} to {to_status} (allowed: {allowed or 'none'})"
+        )
+
+
+def record_timing(status, seconds, when):
+    timing, _ = OrderStatusTiming.objects.get_or_create(status=status, day=when.date())
+    OrderStatusTiming.objects.filter(pk=timing.pk).update(
+        exits=F('exits') + 1,
+        total_seconds=F('total_seconds') + seconds,
+        max_seconds=Greatest('max_seconds', Value(seconds)),
+    )
+
+
+def withdraw_sales(order):
+    """Take a cancelled order's own lines back out of the sales rollups, in the buckets checkout added them to."""
+    lines = list(OrderLine.objects.filter(order=order).select_related('produce'))
+    record_sales(lines, day=timezone.localdate(order.created_at), sign=-1)
+    record_produce_sales(lines, when=order.created_at, sign=-1)
+
+
+def transition(order, to_status, actor=None):
+    """
+    Move `order` to `to_status` if TRANSITIONS allows it. The conditional status UPDATE,
+    the OrderEvent and the timing rollup are written in one transaction; a concurrent change
+    to the same order makes the UPDATE miss and raises InvalidTransition.
+    A split parent order takes its sub-orders along in the same transaction (sub-orders
+    already in `to_status` are left alone, any other that cannot follow rolls everything
+    back); only the sub-orders are counted in the timing rollup. Cancelling also withdraws
+    the order's sales in that transaction, sub-orders through their own transitions.
+    Returns the event, or None when the order already has that status.
+    """
+    if to_status == order.status:
+        return None
+    if to_status not in TRANSITIONS.get(order.status, ()):
+        raise InvalidTransition(order, to_status)
+
+    now = timezone.now()
+    seconds = max((now - (order.status_changed_at or order.created_at)).total_seconds(), 0.0)
+    with transaction.atomic():
+        updated = Order.objects.filter(pk=order.pk, status=order.status).update(status=to_status, status_changed_at=now)
+        if not updated:
+            raise InvalidTransition(order, to_status, f"Order {order.id} changed status concurrently, reload and retry")
+        event = OrderEvent.objects.create(
+            order=order, from_status=order.status, to_status=to_status, actor=actor,
+            seconds_in_previous=seconds, created_at=now,
+        )
+        sub_orders = list(Order.objects.filter(parent=order)) if order.parent_id is None else []
+        if not sub_orders:
+            record_timing(order.status, seconds, now)
+        if to_status == 'CANCELLED':
+            withdraw_sales(order)
+        for sub_order in sub_orders:
+            transition(sub_order, to_status, actor=actor)
+
+        order_id, from_status = order.id, order.status
+        transaction.on_commit(lambda: order_status_changed.send(
+            sender=Order, order_id=order_id, from_status=from_status, to_status=to_status, changed_at=now,
+        ))
+
+    order.status, order.status_changed_at = to_status, now
+    return event
@@ -1,24 +1,37 @@
 from rest_framework import viewsets
-from .models import CartItem, Order, Buyer
+from .models import CartItem, Order, OrderLine, Buyer
 from .serializers import CartItemSerializer, OrderSerializer, BuyerSerializer
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from rest_framework import generics
-import requests
+from rest_framework.pagination import CursorPagination
 from decimal import Decimal
 from collections import defaultdict
 from django.db import transaction
-from .utils import generate_random_lat_lon
-from logistics.models import CourierAssignment
-from logistics.utils import generate_order_pdf
-from django.http import FileResponse, Http404
+from django.utils import timezone
+from .holds import convert_holds
+from .pricing import MAX_DAYS, price_index, record_sales
+from .sales import record_produce_sales
+from .outbox import enqueue_farmer_notifications
+from .transitions import InvalidTransition, transition
+from api.idempotency import idempotent
+from logistics.receipts import receipt_response, schedule_receipts
+from logistics.utils import assign_orders_to_couriers
+from farmer.models import InsufficientStock, Produce
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from .push import status_hub
 
 
 
-NGROK_URL=""    # Set your ngrok url here
-
 class CartViewSet(viewsets.ModelViewSet):
     serializer_class = CartItemSerializer
     permission_classes = [IsAuthenticated]
@@ -34,93 +47,132 @@ class CartViewSet(viewsets.ModelViewSet):
 class CreateOrderFromCart(APIView):
     permission_classes = [IsAuthenticated]
 
+    # Clients retry on timeouts; the same Idempotency-Key gets the first checkout's response back
+    @idempotent
     def post(self, request):
         buyer = Buyer.objects.get(user=request.user)
         print(f" Buyer: {buyer}")
-        items = CartItem.objects.select_related('produce').filter(buyer=buyer)
+        items = CartItem.objects.select_related('produce__farmer__user').filter(buyer=buyer)
         print(f" Cart Items: {[str(i) for i in items]}")
 
         if not items:
             print(" Cart is empty")
             return Response({"error": "Cart empty"}, status=400)
 
-        with transaction.atomic():
-            notify_data = {}
-
-            for item in items:
-                produce = item.produce
-                print(f" Checking produce: {produce.name}, stock={produce.quantity}, requested={item.quantity}")
-                if produce.quantity < item.quantity:
-                    print(" Insufficient stock")
-                    return Response({
-                        "error": f"Insufficient stock for {produce.name} (Available: {produce.quantity}, Requested: {item.quantity})"
-                    }, status=400)
-
-                produce.quantity -= item.quantity
-                if produce.quantity <= 0:
-                    produce.is_active = False
-                produce.save()
-
-                farmer_phone = produce.farmer.user.phone_number
-                if farmer_phone not in notify_data:
-                    notify_data[farmer_phone] = []
-                notify_data[farmer_phone].append({
-                    "produce": produce.name,
-                    "quantity_bought": float(item.quantity),
-                    "remaining_stock": float(produce.quantity)
-                })
-
-            print(" Creating order...")
-            order = Order.objects.create(
-                buyer=buyer,
-                buyer_lat=buyer.latitude,
-                buyer_lon=buyer.longitude
-            )
-            order.items.set(items)
+        items_by_farmer = defaultdict(list)
+        for item in items:
+            items_by_farmer[item.produce.farmer].append(item)
 
-            farmer = items[0].produce.farmer
-            print(f" Farmer: {farmer.name}, lat={farmer.latitude}, lon={farmer.longitude}")
+        try:
+            with transaction.atomic():
+                # Held items were taken from stock when added to the cart; only the rest is reserved now
+                uncovered = convert_holds(items)
+                remaining = {item.produce_id: item.produce.quantity for item in items}
+                if uncovered:
+                    remaining.update(Produce.objects.reserve(uncovered))
+
+                print(f" Creating order for {len(items_by_farmer)} farmer(s)...")
+                order, farmer_orders = self.create_orders(buyer, items_by_farmer)
+
+                # Delivered by `manage.py dispatch_outbox`, so checkout never waits on the bot
+                enqueue_farmer_notifications([
+                    (farmer_order, farmer.user.phone_number, [
+                        {
+                            "produce": item.produce.name,
+                            "quantity_bought": float(item.quantity),
+                            "remaining_stock": float(remaining[item.produce_id])
+                        }
+                        for item in farmer_items
+                    ])
+                    for farmer_order, (farmer, farmer_items) in zip(farmer_orders, items_by_farmer.items())
+                ])
+                schedule_receipts(farmer_order.id for farmer_order in farmer_orders)
+        except InsufficientStock as e:
+            print(f" Insufficient stock: {e.shortages}")
+            if not e.shortages:
+                return Response({"error": "Stock changed during checkout, please retry"}, status=409)
+            return Response({
+                "error": "; ".join(
+                    f"Insufficient stock for {s['name']} (Available: {s['available']}, Requested: {s['requested']})"
+                    for s in e.shortages
+                ),
+                "shortages": e.shortages,
+            }, status=400)
+
+        # Outside the write transaction, one concurrent assignment per farmer pickup
+        assign_orders_to_couriers(farmer_orders)
+
+        print(" Order created successfully")
+        return Response(OrderSerializer(order).data)
 
-            if not farmer.latitude or not farmer.longitude:
+    def create_orders(self, buyer, items_by_farmer):
+        """
+        One order per farmer, each with that farmer's pickup coordinates and snapshot lines.
+        Carts spanning several farmers get a parent order holding the buyer-facing total.
+        Returns (order shown to the buyer, [order per farmer]).
+        """
+        # One timestamp for the whole checkout: cancellations withdraw sales from its buckets
+        now = timezone.now()
+        parent = None
+        if len(items_by_farmer) > 1:
+            parent = Order.objects.create(buyer=buyer, buyer_lat=buyer.latitude, buyer_lon=buyer.longitude, created_at=now)
+
+        farmer_orders = []
+        for farmer, farmer_items in items_by_farmer.items():
+            print(f" Farmer: {farmer.name}, lat={farmer.latitude}, lon={farmer.longitude}")
+            has_coordinates = bool(farmer.latitude and farmer.longitude)
+            if not has_coordinates:
                 print(" Order missing farmer coordinates")
-            else:
-                order.farmer_lat = farmer.latitude
-                order.farmer_lon = farmer.longitude
+            farmer_orders.append(Order(
+                buyer=buyer,
+                parent=parent,
+                created_at=now,
+                buyer_lat=buyer.latitude,
+                buyer_lon=buyer.longitude,
+                farmer_lat=farmer.latitude if has_coordinates else None,
+                farmer_lon=farmer.longitude if has_coordinates else None,
+                total=sum((item.produce.price * item.quantity for item in farmer_items), Decimal("0.00")),
+            ))
+        # bulk_create skips post_save, so couriers are assigned after commit rather than here
+        farmer_orders = Order.objects.bulk_create(farmer_orders)
 
-            order.save()
+        lines = OrderLine.objects.bulk_create([
+            OrderLine.from_cart_item(farmer_order, item)
+            for farmer_order, farmer_items in zip(farmer_orders, items_by_farmer.values())
+            for item in farmer_items
+        ])
+        record_sales(lines, day=timezone.localdate(now))
+        record_produce_sales(lines, when=now)
 
-            from logistics.utils import assign_order_to_courier
-            assign_order_to_courier(order)
+        Order.items.through.objects.bulk_create([
+            Order.items.through(order_id=farmer_order.id, cartitem_id=item.id)
+            for farmer_order, farmer_items in zip(farmer_orders, items_by_farmer.values())
+            for item in farmer_items
+        ])
 
-        for farmer_phone, produce_list in notify_data.items():
-            self.notify_farmer_on_order(farmer_phone, produce_list)
+        if parent is None:
+            return farmer_orders[0], farmer_orders
 
-        print(" Order created successfully")
-        return Response(OrderSerializer(order).data)
+        parent.items.set([item for farmer_items in items_by_farmer.values() for item in farmer_items])
+        parent.total = sum((farmer_order.total for farmer_order in farmer_orders), Decimal("0.00"))
+        parent.save(update_fields=['total'])
+        return parent, farmer_orders
 
 
-    def notify_farmer_on_order(self, farmer_phone, items):
-        buyer = self.request.user.buyer
-        order = Order.objects.filter(buyer=buyer).latest('id')
 
-        #  Get courier name for this order
-        courier_assignment = CourierAssignment.objects.filter(order=order).first()
-        courier_name = courier_assignment.courier.name if courier_assignment else "Unknown"
+class OrderHistoryPagination(CursorPagination):
+    page_size = 20
+    ordering = ('-created_at', '-id')
 
-        payload = {
-            "phone_number": farmer_phone,
-            "items": items,
-            "order_id": order.id,
-            "buyer_address": buyer.address,
-            "courier": courier_name
-        }
 
-        try:
-            print(f" Notifying farmer {farmer_phone} with items: {items}")
-            requests.post("f{NGROK_URL}/notify-farmer", json=payload)
-        except Exception as e:
-            print(f" Failed to notify farmer {farmer_phone}: {e}")
+class OrderHistoryView(generics.ListAPIView):
+    """The signed-in buyer's orders, newest first, paginated by (created_at, id) cursor."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = OrderSerializer
+    pagination_class = OrderHistoryPagination
 
+    def get_queryset(self):
+        return Order.objects.filter(buyer__user=self.request.user).history()
 
 
 class ConfirmOrder(APIView):
@@ -129,12 +181,15 @@ class ConfirmOrder(APIView):
     def post(self, request, pk):
         try:
             order = Order.objects.get(pk=pk, buyer__user=request.user)
-            order.status = 'CONFIRMED'
-            order.save()
-            return Response(OrderSerializer(order).data)
         except Order.DoesNotExist:
             return Response({"error": "Not found"}, status=404)
 
+        try:
+            transition(order, 'CONFIRMED', actor=request.user)  # sub-orders follow
+        except InvalidTransition as e:
+            return Response({"error": str(e)}, status=409)
+        return Response(OrderSerializer(order).data)
+
 
 class BuyerDetailUpdateDelete(APIView):
     permission_classes = [IsAuthenticated]
@@ -165,10 +220,6 @@ class BuyerListCreateView(generics.ListCreateAPIView):
     serializer_class = BuyerSerializer
     permission_classes = [IsAuthenticated]
 
-    def perform_create(self, serializer):
-        lat, lon = generate_random_lat_lon()
-        serializer.save(latitude=lat, longitude=lon)
-
 
 class ConfirmOrder(APIView):
     permission_classes = [IsAuthenticated]
@@ -176,12 +227,15 @@ class ConfirmOrder(APIView):
     def post(self, request, pk):
         try:
             order = Order.objects.get(pk=pk, buyer__user=request.user)
-            order.status = 'CONFIRMED'
-            order.save()
-            return Response(OrderSerializer(order).data)
         except Order.DoesNotExist:
             return Response({"error": "Not found"}, status=404)
 
+        try:
+            transition(order, 'CONFIRMED', actor=request.user)  # sub-orders follow
+        except InvalidTransition as e:
+            return Response({"error": str(e)}, status=409)
+        return Response(OrderSerializer(order).data)
+
 
 class BuyerDetailUpdateDelete(APIView):
     permission_classes = [IsAuthenticated]
@@ -215,14 +269,13 @@ class OrderReceiptDownload(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
-        order = get_object_or_404(Order, pk=pk)
+        order = get_object_or_404(Order.objects.for_receipt(), pk=pk)
 
         # Permission check (optional for security)
         if request.user != order.buyer.user:
             return Response({"detail": "Not allowed"}, status=403)
 
-        buffer = generate_order_pdf(order)
-        return FileResponse(buffer, as_attachment=True, filename=f"order_{pk}_receipt.pdf")
+        return receipt_response(request, order, as_attachment=True, filename=f"order_{pk}_receipt.pdf")
 
 # orders/views.py or buyer/views.py
 
@@ -231,12 +284,95 @@ class OrderReceiptView(APIView):
 
     def get(self, request, order_id):
         try:
-            order = Order.objects.get(id=order_id)
+            order = Order.objects.for_receipt().get(id=order_id)
         except Order.DoesNotExist:
             raise Http404("Order not found")
 
         if request.user != order.buyer.user and not request.user.is_staff:
             return Response({"detail": "Not authorized to view this receipt."}, status=403)
 
-        pdf_buffer = generate_order_pdf(order)
-        return FileResponse(pdf_buffer, content_type='application/pdf')
+        return receipt_response(request, order)
+
+
+class MarketPriceView(APIView):
+    """
+    Price guidance from our own sales: unit-weighted min/median/p90/max price and volume
+    per produce name over the last `days` days (default 30, max MAX_DAYS). With `name`
+    (Hindi names resolve through synonyms) one entry, otherwise every name sold.
+    """
+    DEFAULT_DAYS = 30
+
+    def get(self, request):
+        try:
+            days = int(request.query_params.get('days', self.DEFAULT_DAYS))
+        except ValueError:
+            return Response({"error": "days must be numeric"}, status=400)
+        if not 1 <= days <= MAX_DAYS:
+            return Response({"error": f"days must be between 1 and {MAX_DAYS}"}, status=400)
+
+        name = request.query_params.get('name')
+        if not name:
+            entries = (price_index.stats(indexed, days) for indexed in price_index.names())
+            return Response([entry for entry in entries if entry])
+
+        indexed = price_index.resolve(name)
+        entry = price_index.stats(indexed, days) if indexed else None
+        if entry is None:
+            return Response({"error": f"No sales of {name} in the last {days} days"}, status=404)
+        return Response(entry)
+
+
+STREAM_KEEPALIVE_SECONDS = 20
+# Django 4.2 does not notice a client going away mid-stream, so a stream to a closed connection
+# would live (and stay subscribed) forever; streams end after this long and EventSource reconnects
+STREAM_MAX_SECONDS = 300
+
+
+def stream_user(request):
+    """JWT from the Authorization header or, for EventSource which cannot set headers, ?token=."""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else request.GET.get('token', '').encode()
+    if not raw_token:
+        return None
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def order_status_stream(request):
+    """
+    Server-Sent Events stream of status changes for the user's orders, as a buyer or as the
+    assigned courier: one `status` event per transition, nothing else. Serve through
+    agrikart.asgi (e.g. `uvicorn agrikart.asgi:application`) so idle connections cost no thread;
+    under WSGI the stream would never flush and would hold a worker thread, so it is refused.
+    Each stream ends after STREAM_MAX_SECONDS; the browser's EventSource then reconnects.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "The status stream is only served over ASGI."}, status=503)
+    user = await sync_to_async(stream_user)(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided or are invalid."}, status=401)
+
+    subscription = status_hub.subscribe(user.id)
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + STREAM_MAX_SECONDS
+        try:
+            yield "retry: 5000\n\n"
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), min(STREAM_KEEPALIVE_SECONDS, remaining))
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: status\ndata: {json.dumps(event)}\n\n"
+        finally:
+            status_hub.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -5,5 +5,5 @@ class FarmerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "farmer"
 
-def ready(self):
-    import farmer.signals
\ No newline at end of file
+    def ready(self):
+        import farmer.signals
@@ -0,0 +1,118 @@
+# farmer/catalog.py
+
+from bisect import bisect_left
+
+import numpy as np
+from django.db.models import Q
+
+from logistics.spatial import bounding_box, haversine, haversine_np
+
+from .models import Farmer, Produce
+
+CATALOG_FIELDS = (
+    'id', 'name', 'price', 'quantity', 'category',
+    'farmer_id', 'farmer__name', 'farmer__latitude', 'farmer__longitude',
+)
+# Distance pages pull produce for this many farmers first, doubling until the page is full
+FIRST_FARMER_CHUNK = 8
+
+
+def catalog_queryset(category=None, min_price=None, max_price=None):
+    """In-stock produce matching the filters; is_active/category/price are served by produce_catalog_idx."""
+    queryset = Produce.objects.filter(is_active=True, quantity__gt=0)
+    if category:
+        queryset = queryset.filter(category=category)
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+    return queryset
+
+
+def farmers_within(lat, lon, radius_km):
+    """
+    [(distance_km, farmer_id), ...] for farmers within radius_km, nearest first.
+    The bounding box is filtered in SQL on farmer_location_idx, the exact circle with numpy.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    rows = list(
+        Farmer.objects.filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+        .values_list('id', 'latitude', 'longitude')
+    )
+    if not rows:
+        return []
+
+    ids, lats, lons = (np.array(column) for column in zip(*rows))
+    distances = haversine_np(lon, lat, lons, lats)
+    keep = distances <= radius_km
+    ids, distances = ids[keep], distances[keep]
+    return [(float(distances[i]), int(ids[i])) for i in np.lexsort((ids, distances))]
+
+
+def price_page(queryset, limit, descending=False, cursor=None):
+    """
+    One page ordered by (price, id), or both descending. `cursor` is the (price, id) of the
+    previous page's last row. Returns (rows, next_cursor).
+    """
+    if cursor:
+        price, last_id = cursor
+        if descending:
+            queryset = queryset.filter(Q(price__lt=price) | Q(id__lt=last_id), price__lte=price)
+        else:
+            queryset = queryset.filter(Q(price__gt=price) | Q(id__gt=last_id), price__gte=price)
+    ordering = ('-price', '-id') if descending else ('price', 'id')
+    rows = list(queryset.order_by(*ordering).values(*CATALOG_FIELDS)[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1]['price'], rows[-1]['id'])
+    return rows, next_cursor
+
+
+def distance_page(queryset, farmers, limit, cursor=None):
+    """
+    One page ordered by (distance, farmer id, produce id) over `farmers` from farmers_within().
+    Farmers are walked nearest first, so only produce of the nearest farmers is read.
+    `cursor` is the (distance, farmer_id, produce_id) of the previous page's last row.
+    Returns (rows, next_cursor); rows carry `distance_km`.
+    """
+    start = bisect_left(farmers, cursor[:2]) if cursor else 0
+    rows, size = [], FIRST_FARMER_CHUNK
+    while start < len(farmers) and len(rows) <= limit:
+        chunk = farmers[start:start + size]
+        start += size
+        size *= 2
+
+        distance_of = {farmer_id: distance for distance, farmer_id in chunk}
+        found = []
+        for row in queryset.filter(farmer_id__in=distance_of).values(*CATALOG_FIELDS):
+            key = (distance_of[row['farmer_id']], row['farmer_id'], row['id'])
+            if cursor is None or key > cursor:
+                row['distance_km'] = key[0]
+                found.append((key, row))
+        found.sort(key=lambda item: item[0])
+        rows.extend(row for _, row in found)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = (last['distance_km'], last['farmer_id'], last['id'])
+    return rows, next_cursor
+
+
+def present(row, origin=None):
+    """API shape of a catalog row; distance is filled in from `origin` when the page did not compute it."""
+    distance = row.get('distance_km')
+    if distance is None and origin and row['farmer__latitude'] is not None and row['farmer__longitude'] is not None:
+        distance = haversine(origin[1], origin[0], row['farmer__longitude'], row['farmer__latitude'])
+    return {
+        "id": row['id'],
+        "name": row['name'],
+        "price": str(row['price']),
+        "quantity": row['quantity'],
+        "category": row['category'],
+        "farmer": {"id": row['farmer_id'], "name": row['farmer__name']},
+        "distance_km": round(distance, 2) if distance is not None else None,
+    }
@@ -0,0 +1,132 @@
+import random
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.models import User
+from farmer.catalog import catalog_queryset, distance_page, farmers_within, price_page
+from farmer.models import Farmer, Produce
+from logistics.spatial import haversine_np
+
+import numpy as np
+
+# Farms are scattered around these (lat, lon) centres
+CENTRES = [
+    (28.61, 77.21), (19.08, 72.88), (12.97, 77.59), (22.57, 88.36), (13.08, 80.27), (17.39, 78.49),
+    (23.02, 72.57), (18.52, 73.86), (26.91, 75.79), (26.85, 80.95), (30.73, 76.78), (21.15, 79.09),
+]
+NAMES = ['Tomato', 'Onion', 'Potato', 'Okra', 'Cabbage', 'Apple', 'Banana', 'Mango', 'Rice', 'Wheat', 'Milk', 'Paneer']
+CATEGORIES = [key for key, _ in Produce.CATEGORY_CHOICES]
+
+
+class Command(BaseCommand):
+    help = (
+        "Buyer catalog queries against a large synthetic produce table (1M rows by default): "
+        "keyset pages on the catalog indexes versus loading every active row and filtering in Python. "
+        "Creates throwaway farmers and produce and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--produce', type=int, default=1_000_000)
+        parser.add_argument('--farmers', type=int, default=10_000)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = random.Random(21)
+        tag = uuid.uuid4().hex[:8]
+        start = time.perf_counter()
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username=f"bench-{tag}-{i}", phone_number=f"bench-{tag}-{i}", is_farmer=True)
+                for i in range(options['farmers'])
+            ], batch_size=2000)
+            farmers = []
+            for user in users:
+                lat, lon = rng.choice(CENTRES)
+                farmers.append(Farmer(
+                    user=user, name=user.username, address="Bench",
+                    latitude=lat + rng.gauss(0, 0.4), longitude=lon + rng.gauss(0, 0.4),
+                ))
+            farmers = Farmer.objects.bulk_create(farmers, batch_size=2000)
+            for offset in range(0, options['produce'], 50_000):
+                Produce.objects.bulk_create([
+                    Produce(
+                        farmer=rng.choice(farmers), name=rng.choice(NAMES),
+                        price=Decimal(rng.randint(500, 20_000)) / 100, quantity=rng.randint(0, 200),
+                        category=rng.choice(CATEGORIES), is_active=rng.random() > 0.1,
+                    )
+                    for _ in range(min(50_000, options['produce'] - offset))
+                ], batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.stdout.write(
+            f"Seeded {options['produce']:,} produce rows for {len(farmers):,} farmers in {time.perf_counter() - start:.0f}s"
+        )
+
+        try:
+            self.compare(options['runs'])
+        finally:
+            farmer_ids = [farmer.id for farmer in farmers]
+            with connection.cursor() as cursor:
+                for offset in range(0, len(farmer_ids), 500):
+                    chunk = farmer_ids[offset:offset + 500]
+                    cursor.execute(
+                        f"DELETE FROM farmer_produce WHERE farmer_id IN ({', '.join(['%s'] * len(chunk))})", chunk
+                    )
+            User.objects.filter(id__in=[user.id for user in users]).delete()
+
+    def compare(self, runs):
+        origin = (28.6139, 77.2090)
+
+        def timed(label, query, runs=runs):
+            timings = []
+            for _ in range(runs):
+                begin = time.perf_counter()
+                query()
+                timings.append((time.perf_counter() - begin) * 1000)
+            self.stdout.write(f"  {label:<48} median {statistics.median(timings):8.2f} ms")
+
+        def python_filter():
+            rows = list(
+                Produce.objects.filter(is_active=True, quantity__gt=0, category='Vegetables')
+                .values_list('id', 'price', 'farmer__latitude', 'farmer__longitude')
+            )
+            ids, prices, lats, lons = (np.array(column, dtype=float) for column in zip(*rows))
+            distances = haversine_np(origin[1], origin[0], lons, lats)
+            keep = distances <= 25
+            return ids[keep][np.lexsort((ids[keep], distances[keep]))][:20]
+
+        def deep_price_page():
+            cursor = None
+            for _ in range(10):
+                _, cursor = price_page(catalog_queryset('Vegetables'), 20, cursor=cursor)
+
+        def deep_distance_page():
+            farmers, cursor = farmers_within(*origin, 25), None
+            for _ in range(10):
+                _, cursor = distance_page(catalog_queryset('Vegetables'), farmers, 20, cursor)
+
+        def price_in_radius():
+            farmer_ids = [farmer_id for _, farmer_id in farmers_within(*origin, 25)]
+            price_page(catalog_queryset('Vegetables').filter(farmer_id__in=farmer_ids), 20)
+
+        self.stdout.write("Vegetables, 20 per page; radius and distance queries around Delhi:")
+        timed("load all active rows, filter in Python", python_filter, runs=3)
+        timed("sort=price, page 1", lambda: price_page(catalog_queryset('Vegetables'), 20))
+        timed("sort=price, pages 1-10 via cursor", deep_price_page)
+        timed("sort=price, 40-120 rupees, page 1",
+              lambda: price_page(catalog_queryset('Vegetables', Decimal(40), Decimal(120)), 20))
+        timed("sort=price within 25 km, page 1", price_in_radius)
+        timed("sort=distance within 25 km, page 1",
+              lambda: distance_page(catalog_queryset('Vegetables'), farmers_within(*origin, 25), 20))
+        timed("sort=distance within 25 km, pages 1-10", deep_distance_page)
+
+        query = catalog_queryset('Vegetables').order_by('price', 'id').values('id')[:21].query
+        sql, params = query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            self.stdout.write("Plan for sort=price: " + "; ".join(row[-1] for row in cursor.fetchall()))
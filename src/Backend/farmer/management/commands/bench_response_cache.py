@@ -0,0 +1,54 @@
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from api.models import User
+from api.response_cache import bump, response_cache
+from farmer.models import Farmer, Produce
+
+
+class Command(BaseCommand):
+    help = (
+        "Latency of GET /api/v1/farmer/produce/prices/ when the response is rebuilt, served from the "
+        "response cache, and answered 304 from its ETag. Creates throwaway produce and deletes it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--produce', type=int, default=5000)
+        parser.add_argument('--runs', type=int, default=50)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f"bench-{tag}", password=tag, phone_number=f"bench-{tag}", is_farmer=True)
+        farmer = Farmer.objects.create(user=user, name="Bench Farmer", address="Bench", latitude=28.6, longitude=77.2)
+        Produce.objects.bulk_create([
+            Produce(farmer=farmer, name=f"Produce {i}", price=10 + i % 90, quantity=5) for i in range(options['produce'])
+        ])
+        client = Client()
+        url = '/api/v1/farmer/produce/prices/'
+        try:
+            with override_settings(ALLOWED_HOSTS=['*']):
+                def timed(label, before=None, **headers):
+                    timings = []
+                    for _ in range(options['runs']):
+                        if before:
+                            before()
+                        start = time.perf_counter()
+                        response = client.get(url, **headers)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    self.stdout.write(
+                        f"  {label:<22} median {statistics.median(timings):7.2f} ms ({response.status_code}, "
+                        f"{len(response.content):,} bytes)"
+                    )
+                    return response
+
+                self.stdout.write(f"{Produce.objects.filter(is_active=True).count():,} active produce rows")
+                timed("rebuilt every time", before=lambda: bump('produce'))
+                response = timed("served from cache")
+                timed("If-None-Match -> 304", HTTP_IF_NONE_MATCH=response['ETag'])
+        finally:
+            user.delete()
+            response_cache().clear()
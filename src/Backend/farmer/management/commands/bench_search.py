@@ -0,0 +1,47 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from farmer.search import ProduceSearchIndex
+
+BASES = [
+    'Tomato', 'Potato', 'Onion', 'Okra', 'Cauliflower', 'Brinjal', 'Spinach', 'Green Chilli', 'Garlic', 'Ginger',
+    'Coriander', 'Peas', 'Carrot', 'Radish', 'Cucumber', 'Lemon', 'Apple', 'Banana', 'Mango', 'Wheat', 'Basmati Rice',
+    'Moong Dal', 'Sweet Corn', 'Milk', 'Aloo', 'Pyaz', 'Bhindi', 'Tamatar', 'Bottle Gourd', 'Bitter Gourd', 'Papaya',
+]
+PREFIXES = ['', '', 'Desi', 'Organic', 'Fresh', 'Hybrid', 'Farm', 'Local', 'Premium', 'Baby', 'Red', 'Pahadi']
+
+
+class Command(BaseCommand):
+    help = "Query latency of the in-process produce search index over synthetic listings (100k by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=100_000)
+        parser.add_argument('--runs', type=int, default=200)
+
+    def handle(self, *args, **options):
+        rng = random.Random(22)
+
+        def name():
+            # Some sellers add a village or grade, so the vocabulary keeps growing with listings
+            extra = f" {rng.choice(['Grade', 'Lot', 'Village'])} {rng.randint(1, 500)}" if rng.random() < 0.3 else ""
+            return f"{rng.choice(PREFIXES)} {rng.choice(BASES)}{extra}".strip()
+
+        index = ProduceSearchIndex()
+        start = time.perf_counter()
+        index.load((i, name(), rng.randint(1, 500)) for i in range(1, options['listings'] + 1))
+        self.stdout.write(f"Indexed {len(index):,} listings in {time.perf_counter() - start:.2f}s")
+
+        for query in ['tomato', 'tomatoes', 'tamater', 'टमाटर', 'aloo', 'desi tomato', 'bhindi', 'basmati', 'xyzzy']:
+            timings = []
+            for _ in range(options['runs']):
+                begin = time.perf_counter()
+                results = index.search(query, limit=20)
+                timings.append((time.perf_counter() - begin) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f"  {query!r:<14} median {statistics.median(timings):6.2f} ms, "
+                f"p99 {timings[int(len(timings) * 0.99)]:6.2f} ms, {len(results)} results"
+            )
@@ -0,0 +1,88 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+
+from api.models import User
+from farmer.models import Farmer, InsufficientStock, Produce
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer one hot produce row from many threads and compare the legacy "
+        "read-modify-write decrement with Produce.objects.reserve(). "
+        "Creates a throwaway farmer/produce and deletes it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--attempts', type=int, default=50, help="Checkout attempts per thread")
+        parser.add_argument('--stock', type=int, default=500)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f"bench-{tag}", password=tag, phone_number=f"bench-{tag}", is_farmer=True)
+        farmer = Farmer.objects.create(user=user, name="Bench Farmer", address="Bench")
+        try:
+            for label, checkout in (("legacy save()", self.legacy_checkout), ("reserve()", self.reserve_checkout)):
+                produce = Produce.objects.create(farmer=farmer, name="Hot Tomato", price=10, quantity=options['stock'])
+                self.run(label, produce, checkout, options)
+        finally:
+            user.delete()
+
+    def run(self, label, produce, checkout, options):
+        counts = {"sold": 0, "rejected": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                for _ in range(options['attempts']):
+                    try:
+                        outcome = "sold" if checkout(produce.pk) else "rejected"
+                    except OperationalError:  # e.g. SQLite "database is locked"
+                        outcome = "errors"
+                    with lock:
+                        counts[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        produce.refresh_from_db()
+        expected = max(options['stock'] - counts["sold"], 0)
+        lost = produce.quantity - (options['stock'] - counts["sold"])
+        total = options['threads'] * options['attempts']
+        self.stdout.write(
+            f"{label:>14}: {total / elapsed:8.1f} checkouts/s  sold={counts['sold']} rejected={counts['rejected']} "
+            f"errors={counts['errors']} final_stock={produce.quantity} expected={expected} lost_updates={lost}"
+        )
+
+    @staticmethod
+    def legacy_checkout(produce_id):
+        # The pre-reserve() CreateOrderFromCart logic: read, decrement in Python, save.
+        with transaction.atomic():
+            produce = Produce.objects.get(pk=produce_id)
+            if produce.quantity < 1:
+                return False
+            produce.quantity -= 1
+            if produce.quantity <= 0:
+                produce.is_active = False
+            produce.save()
+            return True
+
+    @staticmethod
+    def reserve_checkout(produce_id):
+        try:
+            with transaction.atomic():
+                Produce.objects.reserve({produce_id: 1})
+            return True
+        except InsufficientStock:
+            return False
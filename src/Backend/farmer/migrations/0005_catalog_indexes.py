@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("farmer", "0004_farmer_latitude_farmer_longitude"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="farmer",
+            index=models.Index(
+                fields=["latitude", "longitude"], name="farmer_location_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="produce",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["category", "price", "id"],
+                name="produce_catalog_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="produce",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["price", "id"],
+                name="produce_price_idx",
+            ),
+        ),
+    ]
@@ -1,9 +1,12 @@
 from django.db import models
 
 # Create your models here.
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, IntegerField, Value, When
 from django.conf import settings
 
+from api.response_cache import bump_on_commit
+
 class Farmer(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
@@ -11,9 +14,74 @@ class Farmer(models.Model):
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Bounding-box prefilter of the buyer catalog (farmer.catalog.farmers_within)
+            models.Index(fields=['latitude', 'longitude'], name='farmer_location_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
+class InsufficientStock(Exception):
+    def __init__(self, shortages):
+        super().__init__(shortages)
+        self.shortages = shortages  # [{"produce": id, "name": ..., "available": n, "requested": n}, ...]
+
+
+class ProduceQuerySet(models.QuerySet):
+    def reserve(self, requested):
+        """
+        Decrement stock for {produce_id: quantity} with one conditional UPDATE.
+
+        Rows are only touched while `quantity >= requested`, so concurrent checkouts
+        cannot oversell. Items that run out are deactivated in the same statement.
+        Either every item is reserved or none is; in the latter case
+        InsufficientStock lists every short item. Returns {produce_id: remaining}.
+        """
+        requested_qty = Case(
+            *[When(pk=pk, then=Value(qty)) for pk, qty in requested.items()],
+            output_field=IntegerField(),
+        )
+        try:
+            with transaction.atomic():
+                updated = self.filter(pk__in=requested, quantity__gte=requested_qty).update(
+                    quantity=F('quantity') - requested_qty,
+                    is_active=Case(When(quantity__lte=requested_qty, then=Value(False)), default=F('is_active')),
+                )
+                if updated != len(requested):
+                    raise InsufficientStock([])
+                bump_on_commit('produce')
+                return dict(self.filter(pk__in=requested).values_list('id', 'quantity'))
+        except InsufficientStock:
+            pass
+
+        # The savepoint was rolled back; read current stock once to report every shortfall
+        available = {row['id']: row for row in self.filter(pk__in=requested).values('id', 'name', 'quantity')}
+        shortages = []
+        for pk, qty in requested.items():
+            row = available.get(pk, {'name': None, 'quantity': 0})
+            if row['quantity'] < qty:
+                shortages.append({"produce": pk, "name": row['name'], "available": row['quantity'], "requested": qty})
+        raise InsufficientStock(shortages)
+
+    def release(self, returned):
+        """Give {produce_id: quantity} back to stock in one UPDATE, reactivating sold-out rows."""
+        if not returned:
+            return 0
+        returned_qty = Case(
+            *[When(pk=pk, then=Value(qty)) for pk, qty in returned.items()],
+            output_field=IntegerField(),
+        )
+        bump_on_commit('produce')
+        # Both SET expressions read the row as it was, so only rows that sold out come back;
+        # listings a farmer or admin deactivated with stock left stay hidden
+        return self.filter(pk__in=returned).update(
+            quantity=F('quantity') + returned_qty,
+            is_active=Case(When(quantity=0, then=Value(True)), default=F('is_active')),
+        )
+
+
 class Produce(models.Model):
     CATEGORY_CHOICES = [
         ('Fruits', 'Fruits'),
@@ -31,5 +99,16 @@ class Produce(models.Model):
 
     is_active = models.BooleanField(default=True)  
 
+    objects = ProduceQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Buyer catalog keyset pages (farmer.catalog.price_page); id makes the order total.
+            # Partial on is_active: Django renders the filter as a bare boolean column, which
+            # SQLite will not treat as an equality on a leading index column
+            models.Index(fields=['category', 'price', 'id'], condition=models.Q(is_active=True), name='produce_catalog_idx'),
+            models.Index(fields=['price', 'id'], condition=models.Q(is_active=True), name='produce_price_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.quantity}) - ₹{self.price}"
\ No newline at end of file
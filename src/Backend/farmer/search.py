@@ -0,0 +1,244 @@
+# farmer/search.py
+
+import heapq
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+# Words that mean the same produce; English, Hindi in Latin script and Devanagari
+SYNONYMS = [
+    ['tomato', 'tamatar', 'टमाटर'],
+    ['potato', 'aloo', 'alu', 'आलू'],
+    ['onion', 'pyaz', 'pyaaz', 'kanda', 'प्याज'],
+    ['okra', 'bhindi', 'ladyfinger', 'भिंडी'],
+    ['cauliflower', 'gobi', 'gobhi', 'फूलगोभी'],
+    ['brinjal', 'eggplant', 'baingan', 'बैंगन'],
+    ['spinach', 'palak', 'पालक'],
+    ['chilli', 'chili', 'mirch', 'मिर्च'],
+    ['garlic', 'lahsun', 'lehsun', 'लहसुन'],
+    ['ginger', 'adrak', 'अदरक'],
+    ['coriander', 'dhania', 'dhaniya', 'धनिया'],
+    ['peas', 'matar', 'मटर'],
+    ['carrot', 'gajar', 'गाजर'],
+    ['radish', 'mooli', 'मूली'],
+    ['cucumber', 'kheera', 'khira', 'खीरा'],
+    ['lemon', 'nimbu', 'नींबू'],
+    ['apple', 'seb', 'सेब'],
+    ['banana', 'kela', 'केला'],
+    ['mango', 'aam', 'आम'],
+    ['wheat', 'gehun', 'gehu', 'गेहूं'],
+    ['rice', 'chawal', 'चावल'],
+    ['lentil', 'dal', 'daal', 'दाल'],
+    ['corn', 'maize', 'makka', 'bhutta', 'मक्का'],
+    ['milk', 'doodh', 'दूध'],
+]
+
+# Minimum trigram similarity for a word to match a query word, and for a query word to pick a synonym group
+MIN_SIMILARITY = 0.3
+SYNONYM_SIMILARITY = 0.4
+
+
+def normalize(text):
+    # Punctuation and symbols become spaces; \W would also strip Devanagari vowel signs
+    return " ".join("".join(" " if unicodedata.category(ch)[0] in "PS" else ch for ch in text.lower()).split())
+
+
+def trigrams(word):
+    """pg_trgm-style trigrams: the word padded with two leading blanks and one trailing."""
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(a, b):
+    return len(a & b) / len(a | b)
+
+
+class TrigramVocabulary:
+    """Distinct words with an inverted trigram index, for fuzzy lookups of one word."""
+
+    def __init__(self):
+        self.grams = {}                  # word -> trigram set
+        self.postings = defaultdict(set)  # trigram -> words
+
+    def add(self, word):
+        if word not in self.grams:
+            self.grams[word] = trigrams(word)
+            for gram in self.grams[word]:
+                self.postings[gram].add(word)
+
+    def discard(self, word):
+        for gram in self.grams.pop(word, ()):
+            self.postings[gram].discard(word)
+            if not self.postings[gram]:
+                del self.postings[gram]
+
+    def match(self, word, min_similarity=MIN_SIMILARITY):
+        """{vocabulary word: similarity} for words sharing enough trigrams with `word`."""
+        query = trigrams(word)
+        candidates = set()
+        for gram in query:
+            candidates |= self.postings.get(gram, set())
+        matches = {}
+        for candidate in candidates:
+            score = similarity(query, self.grams[candidate])
+            if score >= min_similarity:
+                matches[candidate] = score
+        return matches
+
+
+_synonym_vocabulary = TrigramVocabulary()
+_synonym_groups = {}
+for _group in SYNONYMS:
+    for _word in _group:
+        _synonym_vocabulary.add(_word)
+        _synonym_groups[_word] = _group
+
+
+def expand(word):
+    """{alternative word: weight}: the word itself, plus the synonym group of the synonym it resembles most."""
+    alternatives = {word: 1.0}
+    matches = _synonym_vocabulary.match(word, min_similarity=SYNONYM_SIMILARITY)
+    if matches:
+        best = max(matches, key=lambda candidate: (matches[candidate], candidate))
+        for synonym in _synonym_groups[best]:
+            alternatives[synonym] = max(alternatives.get(synonym, 0), matches[best])
+    return alternatives
+
+
+class ProduceSearchIndex:
+    """
+    Process-wide fuzzy index over the names of active, in-stock Produce.
+
+    Names are split into words; each distinct word is indexed once by trigram, so a
+    query touches the (small) vocabulary rather than every listing. A listing scores
+    the average, over query words, of its best-matching word's similarity (synonyms
+    count at the similarity of the synonym match), and ties go to the larger stock.
+
+    Loaded lazily, kept current by the Produce post_save/post_delete signals in
+    farmer.signals, and reloaded after `refresh_seconds` to pick up bulk stock updates
+    (reserve/release) and saves made by other worker processes.
+    """
+
+    def __init__(self, refresh_seconds=300):
+        self.refresh_seconds = refresh_seconds
+        self._vocabulary = TrigramVocabulary()
+        self._word_names = defaultdict(set)   # word -> names containing it
+        self._listings = defaultdict(dict)    # name -> {produce_id: quantity}
+        self._names = {}                      # produce_id -> name
+        self._ranked = {}                     # name -> [(quantity, -produce_id), ...] best first, built on demand
+        self._lock = threading.RLock()
+        self._loaded_at = None
+
+    def __len__(self):
+        return len(self._names)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def ensure_loaded(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        from farmer.models import Produce
+
+        rows = Produce.objects.filter(is_active=True, quantity__gt=0).values_list('id', 'name', 'quantity')
+        self.load(rows.iterator(chunk_size=5000))
+
+    def load(self, rows):
+        """Replace the contents with (produce_id, name, quantity) rows."""
+        with self._lock:
+            self._vocabulary = TrigramVocabulary()
+            self._word_names.clear()
+            self._listings.clear()
+            self._names.clear()
+            self._ranked.clear()
+            for produce_id, name, quantity in rows:
+                self._add(produce_id, name, quantity)
+            self._loaded_at = time.monotonic()
+
+    def _add(self, produce_id, name, quantity):
+        name = normalize(name)
+        if not name:
+            return
+        if name not in self._listings:
+            for word in name.split():
+                self._vocabulary.add(word)
+                self._word_names[word].add(name)
+        self._listings[name][produce_id] = quantity
+        self._names[produce_id] = name
+        self._ranked.pop(name, None)
+
+    def _remove(self, produce_id):
+        name = self._names.pop(produce_id, None)
+        if name is None:
+            return
+        listings = self._listings[name]
+        listings.pop(produce_id, None)
+        self._ranked.pop(name, None)
+        if listings:
+            return
+        del self._listings[name]
+        for word in name.split():
+            self._word_names[word].discard(name)
+            if not self._word_names[word]:
+                del self._word_names[word]
+                self._vocabulary.discard(word)
+
+    def update(self, produce):
+        """Reflect one saved Produce row; sold-out or inactive rows leave the index."""
+        if self._loaded_at is None:
+            return  # the next query loads everything anyway
+        with self._lock:
+            self._remove(produce.id)
+            if produce.is_active and produce.quantity > 0:
+                self._add(produce.id, produce.name, produce.quantity)
+
+    def remove(self, produce_id):
+        with self._lock:
+            self._remove(produce_id)
+
+    def search(self, query, limit=20):
+        """[(produce_id, score), ...] best first, at most `limit`."""
+        self.ensure_loaded()
+        words = normalize(query).split()
+        if not words:
+            return []
+
+        with self._lock:
+            name_scores = None
+            for word in words:
+                word_scores = {}
+                for alternative, weight in expand(word).items():
+                    for match, score in self._vocabulary.match(alternative).items():
+                        word_scores[match] = max(word_scores.get(match, 0), score * weight)
+                # Ascending, so a name containing several matched words keeps the best score
+                best_in_name = {}
+                for match, score in sorted(word_scores.items(), key=lambda item: item[1]):
+                    best_in_name.update(dict.fromkeys(self._word_names.get(match, ()), score))
+                if name_scores is None:
+                    name_scores = best_in_name
+                else:
+                    for name, score in best_in_name.items():
+                        name_scores[name] = name_scores.get(name, 0) + score
+
+            # A listing in the overall top `limit` can only come from a name whose own best
+            # listing is in it, so only the top `limit` names need their listings merged
+            names = heapq.nlargest(
+                limit, name_scores.items(), key=lambda item: (item[1], self._ranking(item[0])[0])
+            )
+            ranked = heapq.nlargest(
+                limit,
+                ((score, quantity, negative_id) for name, score in names for quantity, negative_id in self._ranking(name)[:limit]),
+            )
+        return [(-negative_id, round(score / len(words), 3)) for score, _, negative_id in ranked]
+
+    def _ranking(self, name):
+        ranking = self._ranked.get(name)
+        if ranking is None:
+            ranking = sorted(((quantity, -produce_id) for produce_id, quantity in self._listings[name].items()), reverse=True)
+            self._ranked[name] = ranking
+        return ranking
+
+
+produce_search_index = ProduceSearchIndex()
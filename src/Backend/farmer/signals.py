@@ -1,21 +1,32 @@
-import requests
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Farmer
+from api.geocoding import enqueue_geocoding
+from api.response_cache import bump_on_commit
+from .models import Farmer, Produce
+from .search import produce_search_index
 
 @receiver(post_save, sender=Farmer)
-def geocode_farmer_address(sender, instance, created, **kwargs):
-    if (created or instance.latitude is None) and instance.address:
-        try:
-            url = "https://nominatim.openstreetmap.org/search"
-            params = {
-                'q': instance.address,
-                'format': 'json'
-            }
-            response = requests.get(url, params=params).json()
-            if response:
-                instance.latitude = float(response[0]['lat'])
-                instance.longitude = float(response[0]['lon'])
-                instance.save()
-        except Exception as e:
-            print(f"Geocoding failed: {e}")
+def geocode_farmer_address(sender, instance, **kwargs):
+    enqueue_geocoding(instance)
+
+
+@receiver(post_save, sender=Produce)
+def index_produce_name(sender, instance, **kwargs):
+    produce_search_index.update(instance)
+
+
+@receiver(post_delete, sender=Produce)
+def unindex_produce(sender, instance, **kwargs):
+    produce_search_index.remove(instance.id)
+
+
+@receiver(post_save, sender=Produce)
+@receiver(post_delete, sender=Produce)
+def invalidate_produce_responses(sender, instance, **kwargs):
+    bump_on_commit('produce')
+
+
+@receiver(post_save, sender=Farmer)
+@receiver(post_delete, sender=Farmer)
+def invalidate_farmer_responses(sender, instance, **kwargs):
+    bump_on_commit('farmers')
@@ -1,3 +1,200 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.models import User
+from api.response_cache import bump, current_version
+from buyer.models import Buyer
+from farmer.search import produce_search_index
+from farmer.models import Farmer, InsufficientStock, Produce
+
+
+class ProduceReserveTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='farmer', password='pass', phone_number='2000', is_farmer=True)
+        self.farmer = Farmer.objects.create(user=user, name='Ravi', address='Farm')
+        self.tomato = Produce.objects.create(farmer=self.farmer, name='Tomato', price=20, quantity=5)
+        self.onion = Produce.objects.create(farmer=self.farmer, name='Onion', price=30, quantity=2)
+
+    def test_reserve_decrements_and_deactivates_sold_out(self):
+        with self.assertNumQueries(4):  # savepoint, UPDATE, SELECT remaining, release
+            remaining = Produce.objects.reserve({self.tomato.pk: 3, self.onion.pk: 2})
+
+        self.assertEqual(remaining, {self.tomato.pk: 2, self.onion.pk: 0})
+        self.tomato.refresh_from_db()
+        self.onion.refresh_from_db()
+        self.assertTrue(self.tomato.is_active)
+        self.assertFalse(self.onion.is_active)
+
+    def test_release_reactivates_only_sold_out_listings(self):
+        Produce.objects.reserve({self.onion.pk: 2})
+        Produce.objects.filter(pk=self.tomato.pk).update(is_active=False)  # hidden by the farmer
+
+        Produce.objects.release({self.tomato.pk: 1, self.onion.pk: 1})
+        self.assertEqual(
+            dict(Produce.objects.values_list('name', 'is_active')),
+            {'Tomato': False, 'Onion': True},
+        )
+        self.assertEqual(Produce.objects.get(pk=self.tomato.pk).quantity, 6)
+
+    def test_reserve_is_all_or_nothing_and_reports_every_shortage(self):
+        cabbage = Produce.objects.create(farmer=self.farmer, name='Cabbage', price=10, quantity=1)
+        with self.assertRaises(InsufficientStock) as ctx:
+            Produce.objects.reserve({self.tomato.pk: 1, self.onion.pk: 3, cabbage.pk: 2})
+
+        self.assertEqual(
+            sorted((s['name'], s['available'], s['requested']) for s in ctx.exception.shortages),
+            [('Cabbage', 1, 2), ('Onion', 2, 3)],
+        )
+        self.tomato.refresh_from_db()
+        self.assertEqual(self.tomato.quantity, 5)
+
+
+class ProduceCatalogTests(TestCase):
+    def setUp(self):
+        def farmer(name, lat, lon):
+            user = User.objects.create_user(username=name, password='pass', phone_number=name, is_farmer=True)
+            return Farmer.objects.create(user=user, name=name, address='Farm', latitude=lat, longitude=lon)
+
+        near, mid, far = farmer('near', 28.62, 77.21), farmer('mid', 28.70, 77.20), farmer('far', 29.50, 77.20)
+        self.tomato = Produce.objects.create(farmer=near, name='Tomato', price=20, quantity=5, category='Vegetables')
+        self.apple = Produce.objects.create(farmer=near, name='Apple', price=90, quantity=5, category='Fruits')
+        self.onion = Produce.objects.create(farmer=mid, name='Onion', price=30, quantity=5, category='Vegetables')
+        self.potato = Produce.objects.create(farmer=mid, name='Potato', price=20, quantity=5, category='Vegetables')
+        self.okra = Produce.objects.create(farmer=far, name='Okra', price=25, quantity=5, category='Vegetables')
+        Produce.objects.create(farmer=near, name='Sold out', price=10, quantity=0, category='Vegetables', is_active=False)
+
+        user = User.objects.create_user(username='buyer', password='pass', phone_number='1000', is_buyer=True)
+        Buyer.objects.create(user=user, address='Delhi', latitude=28.6139, longitude=77.2090)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def pages(self, query):
+        ids, cursor = [], None
+        while True:
+            params = dict(query, limit=2, **({'cursor': cursor} if cursor else {}))
+            response = self.client.get('/api/v1/farmer/produce/catalog/', params)
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data]
+            cursor = response.get('X-Next-Cursor')
+            if not cursor:
+                return ids
+
+    def test_distance_sort_uses_the_buyer_location_and_radius(self):
+        self.assertEqual(
+            self.pages({'category': 'vegetables', 'radius_km': 20}),
+            [self.tomato.id, self.onion.id, self.potato.id],
+        )
+        first = self.client.get('/api/v1/farmer/produce/catalog/', {'radius_km': 20}).data[0]
+        self.assertEqual(first['farmer']['name'], 'near')
+        self.assertLess(first['distance_km'], 2)
+
+    def test_price_sort_filters_and_keyset_pages(self):
+        self.assertEqual(
+            self.pages({'sort': 'price', 'category': 'Vegetables', 'min_price': 20, 'max_price': 30}),
+            [self.tomato.id, self.potato.id, self.okra.id, self.onion.id],
+        )
+        self.assertEqual(
+            self.pages({'sort': '-price', 'radius_km': 20}),
+            [self.apple.id, self.onion.id, self.potato.id, self.tomato.id],
+        )
+
+    def test_distance_needs_a_location(self):
+        Buyer.objects.update(latitude=None, longitude=None)
+        response = self.client.get('/api/v1/farmer/produce/catalog/', {'sort': 'distance'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.client.get('/api/v1/farmer/produce/catalog/').data), 5)
+
+
+class ProduceSearchTests(TestCase):
+    def setUp(self):
+        produce_search_index.invalidate()
+        user = User.objects.create_user(username='farmer', password='pass', phone_number='2000', is_farmer=True)
+        self.farmer = Farmer.objects.create(user=user, name='Ravi', address='Farm')
+        self.tomato = Produce.objects.create(farmer=self.farmer, name='Tomato', price=20, quantity=5)
+        self.big_tomato = Produce.objects.create(farmer=self.farmer, name='Desi Tomato', price=25, quantity=50)
+        self.potato = Produce.objects.create(farmer=self.farmer, name='Potato', price=15, quantity=9)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def search(self, q):
+        response = self.client.get('/api/v1/farmer/produce/search/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data]
+
+    def test_misspellings_plurals_and_hindi_names(self):
+        expected = [self.big_tomato.id, self.tomato.id]  # equal match, more stock first
+        for q in ('tomato', 'Tomatoes', 'tamatar', 'tamater', 'टमाटर'):
+            self.assertEqual(self.search(q)[:2], expected, q)
+        self.assertEqual(self.search('aloo'), [self.potato.id])
+        self.assertEqual(self.search('desi tomato')[0], self.big_tomato.id)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.assertEqual(self.search('bhindi'), [])
+        okra = Produce.objects.create(farmer=self.farmer, name='Okra', price=40, quantity=3)
+        self.assertEqual(self.search('bhindi'), [okra.id])
+
+        okra.quantity = 0
+        okra.save()
+        self.assertEqual(self.search('okra'), [])
+        self.potato.delete()
+        self.assertEqual(self.search('potato'), [])
+        self.assertEqual(len(produce_search_index), 2)
+
+
+@override_settings(GEOCODING_ENABLED=False)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        caches['responses'].clear()
+        user = User.objects.create_user(username='farmer', password='pass', phone_number='2000', is_farmer=True)
+        self.farmer = Farmer.objects.create(user=user, name='Ravi', address='Farm')
+        self.tomato = Produce.objects.create(farmer=self.farmer, name='Tomato', price=20, quantity=5)
+        self.client = APIClient()
+
+    def test_pricing_list_is_cached_until_produce_changes(self):
+        first = self.client.get('/api/v1/farmer/produce/prices/')
+        self.assertEqual(first.data, [{'name': 'Tomato', 'price': '20.00'}])
+        etag = first['ETag']
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/v1/farmer/produce/prices/').data, first.data)
+            self.assertEqual(self.client.get('/api/v1/farmer/produce/prices/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tomato.price = 25
+            self.tomato.save()
+        changed = self.client.get('/api/v1/farmer/produce/prices/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.data, [{'name': 'Tomato', 'price': '25.00'}])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Produce.objects.reserve({self.tomato.pk: 5})  # sold out
+        self.assertEqual(self.client.get('/api/v1/farmer/produce/prices/', HTTP_IF_NONE_MATCH=changed['ETag']).data, [])
+
+    def test_farmer_list_and_detail_follow_produce_and_farmer_changes(self):
+        self.client.force_authenticate(self.farmer.user)
+        detail = self.client.get('/api/v1/farmer/2000/')
+        self.assertEqual([p['name'] for p in detail.data['produce']], ['Tomato'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/v1/farmer/2000/', HTTP_IF_NONE_MATCH=detail['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Produce.objects.create(farmer=self.farmer, name='Onion', price=30, quantity=2)
+        self.assertEqual(len(self.client.get('/api/v1/farmer/2000/').data['produce']), 2)
+
+        self.client.get('/api/v1/farmer/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.farmer.name = 'Ravi Kumar'
+            self.farmer.save()
+        self.assertEqual(self.client.get('/api/v1/farmer/').data[0]['name'], 'Ravi Kumar')
+
+    def test_bumps_never_reuse_a_version(self):
+        before = current_version(['produce'])
+        # Two bumps within the same clock tick, as concurrent commits in two workers can be
+        with mock.patch('api.response_cache.time.time_ns', return_value=1):
+            bump('produce')
+            first = current_version(['produce'])
+            bump('produce')
+        self.assertEqual(len({before, first, current_version(['produce'])}), 3)
@@ -4,7 +4,7 @@ from rest_framework.routers import DefaultRouter
 from farmer.views import FarmerViewSet
 from .views import check_farmer_exists
 from buyer.views import CartViewSet, CreateOrderFromCart, ConfirmOrder
-from .views import ProducePricingListView
+from .views import ProducePricingListView, ProduceCatalogView, ProduceSearchView
 
 router = DefaultRouter()
 router.register(r'farmer', FarmerViewSet, basename='farmer')
@@ -17,4 +17,6 @@ urlpatterns = [
     path('api/v1/orders/<int:pk>/confirm/', ConfirmOrder.as_view()),
     path('check/<str:phone_number>/', check_farmer_exists, name='check_farmer_exists'),
     path('produce/prices/', ProducePricingListView.as_view(), name='produce-prices'),
+    path('produce/catalog/', ProduceCatalogView.as_view(), name='produce-catalog'),
+    path('produce/search/', ProduceSearchView.as_view(), name='produce-search'),
 ]
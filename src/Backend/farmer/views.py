@@ -10,6 +10,12 @@ from rest_framework.response import Response
 from .models import Farmer
 from rest_framework.views import APIView
 from .serializers import ProduceNamePriceSerializer
+from .catalog import CATALOG_FIELDS, catalog_queryset, distance_page, farmers_within, present, price_page
+from .search import produce_search_index
+from api.response_cache import cached_response
+from buyer.models import Buyer
+from buyer import sales
+from decimal import Decimal, InvalidOperation
 
 
 
@@ -18,6 +24,16 @@ class FarmerViewSet(viewsets.ModelViewSet):
     serializer_class = FarmerSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'user__phone_number'
+
+    # Farmers are listed with their produce, so both kinds of change invalidate
+    @cached_response('farmers', 'produce')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response('farmers', 'produce')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 def get_object(self):
     phone = self.kwargs['user__phone_number']
     return Farmer.objects.get(user__phone_number=phone)
@@ -50,7 +66,147 @@ def check_farmer_exists(request, phone_number):
 
 
 class ProducePricingListView(APIView):
+    @cached_response('produce')
     def get(self, request):
         queryset = Produce.objects.filter(quantity__gt=0, is_active=True)
         serializer = ProduceNamePriceSerializer(queryset, many=True)
         return Response(serializer.data)
+
+
+class ProduceCatalogView(APIView):
+    """
+    Buyer catalog of in-stock produce.
+
+    Query params: `category`, `min_price`, `max_price`, `radius_km`, `sort` (`distance`,
+    `price` or `-price`), `limit` (default 20, max 100) and `cursor` (value of the previous
+    page's `X-Next-Cursor` header). Distances are measured from `lat`/`lon` if given, else
+    from the buyer's saved location; sorting by distance needs a location and searches
+    within `radius_km` (default 50).
+    """
+    permission_classes = [IsAuthenticated]
+
+    DEFAULT_RADIUS_KM = 50
+    MAX_RADIUS_KM = 500
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
+    SORTS = ('distance', 'price', '-price')
+
+    def get(self, request):
+        params = request.query_params
+        categories = {key.lower(): key for key, _ in Produce.CATEGORY_CHOICES}
+        category = params.get('category')
+        if category and category.lower() not in categories:
+            return Response({"error": f"Unknown category. Allowed: {list(categories.values())}"}, status=400)
+
+        try:
+            min_price = Decimal(params['min_price']) if params.get('min_price') else None
+            max_price = Decimal(params['max_price']) if params.get('max_price') else None
+            radius_km = float(params['radius_km']) if params.get('radius_km') else None
+            limit = min(int(params.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+            origin = self.origin(request)
+        except (InvalidOperation, ValueError, KeyError):
+            return Response({"error": "min_price, max_price, radius_km, limit, lat and lon must be numeric"}, status=400)
+        if limit <= 0 or (radius_km is not None and not 0 < radius_km <= self.MAX_RADIUS_KM):
+            return Response({"error": f"limit must be positive and radius_km between 0 and {self.MAX_RADIUS_KM}"}, status=400)
+
+        sort = params.get('sort') or ('distance' if origin else 'price')
+        if sort not in self.SORTS:
+            return Response({"error": f"sort must be one of {list(self.SORTS)}"}, status=400)
+        if origin is None and (sort == 'distance' or radius_km is not None):
+            return Response({"error": "Distance filters need lat/lon or a saved buyer location"}, status=400)
+
+        queryset = catalog_queryset(categories.get(category.lower()) if category else None, min_price, max_price)
+        try:
+            if sort == 'distance':
+                farmers = farmers_within(*origin, radius_km or self.DEFAULT_RADIUS_KM)
+                cursor = self.parse_cursor(params.get('cursor'), (float, int, int))
+                rows, next_cursor = distance_page(queryset, farmers, limit, cursor)
+            else:
+                if radius_km is not None:
+                    queryset = queryset.filter(farmer_id__in=[farmer_id for _, farmer_id in farmers_within(*origin, radius_km)])
+                cursor = self.parse_cursor(params.get('cursor'), (Decimal, int))
+                rows, next_cursor = price_page(queryset, limit, descending=sort == '-price', cursor=cursor)
+        except (InvalidOperation, ValueError):
+            return Response({"error": "Invalid cursor"}, status=400)
+
+        response = Response([present(row, origin) for row in rows])
+        if next_cursor:
+            response['X-Next-Cursor'] = ':'.join(repr(value) if isinstance(value, float) else str(value) for value in next_cursor)
+        return response
+
+    @staticmethod
+    def origin(request):
+        if request.query_params.get('lat') or request.query_params.get('lon'):
+            return float(request.query_params['lat']), float(request.query_params['lon'])
+        buyer = Buyer.objects.filter(user=request.user).values_list('latitude', 'longitude').first()
+        if buyer and buyer[0] is not None and buyer[1] is not None:
+            return buyer
+        return None
+
+    @staticmethod
+    def parse_cursor(raw, types):
+        if not raw:
+            return None
+        parts = raw.split(':')
+        if len(parts) != len(types):
+            raise ValueError(raw)
+        return tuple(cast(part) for cast, part in zip(types, parts))
+
+
+class ProduceSearchView(APIView):
+    """
+    Fuzzy search over active produce names: `q` may be misspelt, plural or a Hindi name
+    ("tamatar", "टमाटर"). Results are ranked by similarity, then by stock. `limit` default 20, max 50.
+    """
+    permission_classes = [IsAuthenticated]
+
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 50
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q is required"}, status=400)
+        try:
+            limit = min(int(request.query_params.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "limit must be numeric"}, status=400)
+        if limit <= 0:
+            return Response({"error": "limit must be positive"}, status=400)
+
+        # Over-fetch: the index learns about stock sold through bulk updates only on refresh
+        matches = produce_search_index.search(query, limit=limit * 2)
+        rows = {
+            row['id']: row
+            for row in catalog_queryset().filter(id__in=[produce_id for produce_id, _ in matches])
+            .values(*CATALOG_FIELDS)
+        }
+        results = []
+        for produce_id, score in matches:
+            if produce_id in rows:
+                results.append({**present(rows[produce_id]), "score": score})
+        return Response(results[:limit])
+
+
+class SalesDashboardView(APIView):
+    """
+    The signed-in farmer's sales: revenue, units sold, sell-through and remaining stock per
+    listing, with a daily series over `days` (default 30, max 90) and an hourly series over
+    `hours` (default 24, max 168). Served from the buyer.sales rollups.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        farmer = Farmer.objects.filter(user=request.user).first()
+        if farmer is None:
+            return Response({"error": "Only farmers have a sales dashboard"}, status=403)
+
+        windows = {}
+        for param, default, maximum in (('days', 30, sales.MAX_DAYS), ('hours', 24, sales.MAX_HOURS)):
+            try:
+                windows[param] = int(request.query_params.get(param, default))
+            except ValueError:
+                return Response({"error": f"{param} must be numeric"}, status=400)
+            if not 1 <= windows[param] <= maximum:
+                return Response({"error": f"{param} must be between 1 and {maximum}"}, status=400)
+        return Response(sales.dashboard(farmer, **windows))
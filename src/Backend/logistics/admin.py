@@ -1,5 +1,6 @@
 # logistics/admin.py
 from django.contrib import admin
-from .models import LogisticsPartner
+from .models import LogisticsPartner, PickupBatch
 
 admin.site.register(LogisticsPartner)
+admin.site.register(PickupBatch)
@@ -0,0 +1,92 @@
+# logistics/batching.py
+
+from collections import defaultdict
+
+from buyer.models import Order
+from logistics.models import CourierAssignment, PickupBatch
+from logistics.spatial import KM_PER_DEGREE, grid_cell
+
+PICKUP_CELL_KM = 1
+AWAITING_PICKUP = ['PENDING', 'CONFIRMED']
+
+
+def cell_key(lat, lon):
+    row, col = grid_cell(lat, lon, PICKUP_CELL_KM)
+    return f"{row}:{col}"
+
+
+def cell_bounds(cell):
+    """(min_lat, max_lat, min_lon, max_lon) of a cell key, for range filters."""
+    row, col = (int(part) for part in cell.split(':'))
+    cell_deg = PICKUP_CELL_KM / KM_PER_DEGREE
+    return row * cell_deg, (row + 1) * cell_deg, col * cell_deg, (col + 1) * cell_deg
+
+
+def cluster_orders(rows):
+    """
+    Group (order_id, farmer_lat, farmer_lon) rows into pickup batches by grid cell.
+    Returns [{"cell", "latitude", "longitude", "order_ids"}], located at each group's centroid.
+    """
+    groups = defaultdict(list)
+    for order_id, lat, lon in rows:
+        groups[cell_key(lat, lon)].append((order_id, lat, lon))
+
+    return [
+        {
+            "cell": cell,
+            "latitude": sum(lat for _, lat, _ in members) / len(members),
+            "longitude": sum(lon for _, _, lon in members) / len(members),
+            "order_ids": [order_id for order_id, _, _ in members],
+        }
+        for cell, members in groups.items()
+    ]
+
+
+def unassigned_orders():
+    return Order.objects.filter(
+        status__in=AWAITING_PICKUP,
+        courierassignment__isnull=True,
+        farmer_lat__isnull=False,
+        farmer_lon__isnull=False,
+    )
+
+
+def unassigned_batches():
+    return cluster_orders(unassigned_orders().values_list('id', 'farmer_lat', 'farmer_lon'))
+
+
+def open_batches(cells):
+    """{cell: PickupBatch} for batches in `cells` that still have orders awaiting pickup."""
+    batches = PickupBatch.objects.filter(cell__in=cells, assignments__order__status__in=AWAITING_PICKUP).distinct()
+    return {batch.cell: batch for batch in batches}
+
+
+def join_batch(batch, order_ids, distance_km):
+    """Hand more orders to an open batch's courier (same pickup stop)."""
+    return CourierAssignment.objects.bulk_create(
+        [
+            CourierAssignment(courier_id=batch.courier_id, order_id=order_id, batch=batch, distance_km=distance_km)
+            for order_id in order_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def create_batches(assignments):
+    """
+    Persist [(courier_id, cluster, distance_km), ...] as one PickupBatch per cluster and one
+    CourierAssignment per order, in two bulk inserts. Orders assigned meanwhile are left alone.
+    """
+    batches = PickupBatch.objects.bulk_create([
+        PickupBatch(courier_id=courier_id, cell=cluster["cell"], latitude=cluster["latitude"], longitude=cluster["longitude"])
+        for courier_id, cluster, _ in assignments
+    ])
+    CourierAssignment.objects.bulk_create(
+        [
+            CourierAssignment(courier_id=courier_id, order_id=order_id, batch=batch, distance_km=distance_km)
+            for batch, (courier_id, cluster, distance_km) in zip(batches, assignments)
+            for order_id in cluster["order_ids"]
+        ],
+        ignore_conflicts=True,
+    )
+    return batches
@@ -0,0 +1,176 @@
+# logistics/dispatch.py
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Q
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+from logistics.batching import create_batches, join_batch, open_batches, unassigned_batches
+from logistics.models import LogisticsPartner
+from logistics.spatial import haversine_np
+from logistics.tracking import location_store
+from logistics.utils import COURIER_RADIUS_KM
+
+ACTIVE_STATUSES = ['PENDING', 'CONFIRMED', 'PICKED_UP', 'IN_TRANSIT']
+CANDIDATES_PER_ORDER = 10
+CHUNK_ROWS = 1000
+
+
+def nearest_candidates(order_lats, order_lons, courier_lats, courier_lons, radius_km, k=CANDIDATES_PER_ORDER):
+    """
+    For every order, the k nearest couriers within radius_km.
+
+    The distance matrix is computed with vectorized haversine CHUNK_ROWS orders at a
+    time to bound memory. Returns parallel arrays (order_idx, courier_idx, distance_km).
+    """
+    n_couriers = len(courier_lats)
+    k = min(k, n_couriers)
+    rows, cols, dists = [], [], []
+    if k == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+
+    for start in range(0, len(order_lats), CHUNK_ROWS):
+        stop = start + CHUNK_ROWS
+        matrix = haversine_np(
+            order_lons[start:stop, None], order_lats[start:stop, None],
+            courier_lons[None, :], courier_lats[None, :],
+        )
+        if k < n_couriers:
+            nearest = np.argpartition(matrix, k - 1, axis=1)[:, :k]
+        else:
+            nearest = np.broadcast_to(np.arange(n_couriers), matrix.shape)
+        nearest_dist = np.take_along_axis(matrix, nearest, axis=1)
+
+        within = nearest_dist <= radius_km
+        rows.append(np.nonzero(within)[0] + start)
+        cols.append(nearest[within])
+        dists.append(nearest_dist[within])
+
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(dists)
+
+
+def solve_assignment(n_orders, capacities, rows, cols, dists):
+    """
+    Min-cost assignment of orders to couriers with per-courier capacity.
+
+    Each courier is expanded into `capacity` slots and every order gets a private
+    "unassigned" slot whose cost exceeds any combination of real edges, so the
+    matching first maximises the number of assigned orders and then minimises
+    total distance. Returns parallel arrays (order_idx, courier_idx, distance_km).
+    """
+    capacities = np.asarray(capacities, dtype=np.int64)
+    slot_offsets = np.concatenate([[0], np.cumsum(capacities)])
+    n_slots = int(slot_offsets[-1])
+
+    edge_caps = capacities[cols]
+    keep = edge_caps > 0
+    rows, cols, dists, edge_caps = rows[keep], cols[keep], dists[keep], edge_caps[keep]
+    if n_orders == 0 or len(rows) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+
+    # One edge per (order, courier slot); slot j of courier c is column slot_offsets[c] + j
+    slot_rows = np.repeat(rows, edge_caps)
+    slot_dists = np.repeat(dists, edge_caps)
+    first_edge = np.repeat(np.cumsum(edge_caps) - edge_caps, edge_caps)
+    slot_cols = np.repeat(slot_offsets[cols], edge_caps) + (np.arange(len(slot_rows)) - first_edge)
+
+    # Weights are shifted by +1 because the sparse solver treats zero entries as missing edges
+    penalty = (dists.max() + 1) * (n_orders + 1)
+    matrix = coo_matrix(
+        (
+            np.concatenate([slot_dists + 1, np.full(n_orders, penalty)]),
+            (np.concatenate([slot_rows, np.arange(n_orders)]), np.concatenate([slot_cols, n_slots + np.arange(n_orders)])),
+        ),
+        shape=(n_orders, n_slots + n_orders),
+    ).tocsr()
+
+    matched_rows, matched_slots = min_weight_full_bipartite_matching(matrix)
+    real = matched_slots < n_slots
+    assigned, slots = matched_rows[real], matched_slots[real]
+    couriers = np.searchsorted(slot_offsets, slots, side='right') - 1
+    return assigned, couriers, np.asarray(matrix[assigned, slots]).ravel() - 1
+
+
+def dispatch_pending_orders(radius_km=COURIER_RADIUS_KM, capacity=None):
+    """
+    Assign every unassigned PENDING/CONFIRMED order in one batch run.
+
+    Orders are first grouped into pickup batches (logistics.batching). Batches whose
+    cell already has an open batch join it while its courier has capacity left; the rest
+    are matched to couriers as units. Capacity is counted in pickup stops, a join
+    counting as one. Returns a summary dict.
+    """
+    capacity = capacity if capacity is not None else settings.COURIER_CAPACITY
+
+    clusters = unassigned_batches()
+    couriers = list(
+        LogisticsPartner.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        .annotate(
+            batch_stops=Count(
+                'pickup_batches',
+                filter=Q(pickup_batches__assignments__order__status__in=ACTIVE_STATUSES),
+                distinct=True,
+            ),
+            single_stops=Count(
+                'courierassignment',
+                filter=Q(courierassignment__order__status__in=ACTIVE_STATUSES, courierassignment__batch__isnull=True),
+                distinct=True,
+            ),
+        )
+        .values_list('id', 'latitude', 'longitude', 'batch_stops', 'single_stops')
+    )
+    # Live GPS positions not flushed to the database yet
+    live = {courier_id: (lat, lon) for courier_id, lat, lon in location_store.unflushed()}
+    couriers = [
+        (courier_id, *live.get(courier_id, (lat, lon)), batch_stops, single_stops)
+        for courier_id, lat, lon, batch_stops, single_stops in couriers
+    ]
+
+    summary = {
+        "orders": sum(len(cluster["order_ids"]) for cluster in clusters),
+        "batches": len(clusters),
+        "couriers": len(couriers),
+        "assigned": 0,
+        "total_distance_km": 0.0,
+    }
+    if not clusters:
+        return summary
+
+    columns = list(zip(*couriers)) or [()] * 5
+    courier_ids, courier_lats, courier_lons, batch_stops, single_stops = (np.array(column) for column in columns)
+    capacities = np.maximum(capacity - batch_stops - single_stops, 0).astype(np.int64)
+    position = {int(courier_id): i for i, courier_id in enumerate(courier_ids)}
+
+    # A batch for a cell a courier is already collecting from rides along with it while that
+    # courier has room for one more stop; once full, the batch goes through matching like any other
+    existing = open_batches([cluster["cell"] for cluster in clusters])
+    leftover, joined_km = [], 0.0
+    for cluster in clusters:
+        batch = existing.get(cluster["cell"])
+        c = position.get(batch.courier_id) if batch else None
+        if c is None or capacities[c] <= 0:
+            leftover.append(cluster)
+            continue
+        distance = float(haversine_np(courier_lons[c], courier_lats[c], cluster["longitude"], cluster["latitude"]))
+        join_batch(batch, cluster["order_ids"], distance)
+        capacities[c] -= 1
+        joined_km += distance
+        summary["assigned"] += len(cluster["order_ids"])
+    clusters = leftover
+    summary["total_distance_km"] = round(joined_km, 2)
+    if not clusters or not couriers:
+        return summary
+
+    batch_lats = np.array([cluster["latitude"] for cluster in clusters])
+    batch_lons = np.array([cluster["longitude"] for cluster in clusters])
+    rows, cols, dists = nearest_candidates(batch_lats, batch_lons, courier_lats, courier_lons, radius_km)
+    batch_idx, courier_idx, distances = solve_assignment(len(clusters), capacities, rows, cols, dists)
+
+    create_batches([
+        (int(courier_ids[c]), clusters[b], float(d))
+        for b, c, d in zip(batch_idx, courier_idx, distances)
+    ])
+    summary["assigned"] += sum(len(clusters[b]["order_ids"]) for b in batch_idx)
+    summary["total_distance_km"] = round(joined_km + float(distances.sum()), 2)
+    return summary
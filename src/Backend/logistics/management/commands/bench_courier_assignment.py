@@ -0,0 +1,50 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from geopy.distance import geodesic
+
+from logistics.spatial import GridIndex
+from logistics.utils import COURIER_RADIUS_KM
+
+
+class Command(BaseCommand):
+    help = "Benchmark courier lookup: linear geodesic scan vs. the grid spatial index (in memory, no DB writes)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--counts', nargs='+', type=int, default=[100, 1000, 10000, 50000])
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--spread-km', type=float, default=300)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        base_lat, base_lon = 28.6139, 77.2090  # Delhi
+        spread = options['spread_km'] / 111
+
+        def random_point():
+            return (base_lat + rng.uniform(-spread, spread), base_lon + rng.uniform(-spread, spread))
+
+        self.stdout.write(f"{'couriers':>10} {'linear ms/query':>16} {'index ms/query':>15} {'speedup':>9}")
+        for count in options['counts']:
+            couriers = [(i, *random_point()) for i in range(count)]
+            queries = [random_point() for _ in range(options['queries'])]
+
+            index = GridIndex()
+            for courier_id, lat, lon in couriers:
+                index.insert(courier_id, lat, lon)
+
+            start = time.perf_counter()
+            for lat, lon in queries:
+                # Previous behaviour: geodesic against every courier, first one under the radius wins.
+                for courier_id, c_lat, c_lon in couriers:
+                    if geodesic((lat, lon), (c_lat, c_lon)).km <= COURIER_RADIUS_KM:
+                        break
+            linear = (time.perf_counter() - start) / len(queries) * 1000
+
+            start = time.perf_counter()
+            for lat, lon in queries:
+                index.nearest(lat, lon, COURIER_RADIUS_KM)
+            indexed = (time.perf_counter() - start) / len(queries) * 1000
+
+            self.stdout.write(f"{count:>10} {linear:>16.3f} {indexed:>15.3f} {linear / indexed:>8.1f}x")
@@ -0,0 +1,62 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from logistics.dispatch import nearest_candidates, solve_assignment
+from logistics.utils import COURIER_RADIUS_KM
+
+
+class Command(BaseCommand):
+    help = "Benchmark batch dispatch on synthetic data (in memory, no DB writes) against greedy nearest-courier."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--couriers', type=int, default=1000)
+        parser.add_argument('--capacity', type=int, default=10)
+        parser.add_argument('--spread-deg', type=float, default=2.0, help="Half-width of the square around Delhi")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        spread = options['spread_deg']
+
+        def points(n):
+            return 28.6139 + rng.uniform(-spread, spread, n), 77.2090 + rng.uniform(-spread, spread, n)
+
+        order_lats, order_lons = points(options['orders'])
+        courier_lats, courier_lons = points(options['couriers'])
+        capacities = np.full(options['couriers'], options['capacity'])
+
+        start = time.perf_counter()
+        rows, cols, dists = nearest_candidates(order_lats, order_lons, courier_lats, courier_lons, COURIER_RADIUS_KM)
+        matrix_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        order_idx, courier_idx, distances = solve_assignment(options['orders'], capacities, rows, cols, dists)
+        solve_s = time.perf_counter() - start
+
+        # Baseline: orders in arrival order each take their nearest courier with spare capacity
+        start = time.perf_counter()
+        remaining = capacities.copy()
+        greedy_assigned, greedy_km = 0, 0.0
+        order_of_edges = np.lexsort((dists, rows))
+        taken = np.zeros(options['orders'], dtype=bool)
+        for edge in order_of_edges:
+            o, c = rows[edge], cols[edge]
+            if not taken[o] and remaining[c] > 0:
+                taken[o] = True
+                remaining[c] -= 1
+                greedy_assigned += 1
+                greedy_km += dists[edge]
+        greedy_s = time.perf_counter() - start
+
+        self.stdout.write(f"{options['orders']} orders x {options['couriers']} couriers, capacity {options['capacity']}")
+        self.stdout.write(f"  distance matrix + candidates: {matrix_s:.3f}s ({len(rows)} candidate pairs)")
+        self.stdout.write(
+            f"  min-cost assignment:          {solve_s:.3f}s  assigned={len(order_idx)} "
+            f"total={distances.sum():.1f} km  max_load={np.bincount(courier_idx).max() if len(courier_idx) else 0}"
+        )
+        self.stdout.write(
+            f"  greedy nearest (baseline):    {greedy_s:.3f}s  assigned={greedy_assigned} total={greedy_km:.1f} km"
+        )
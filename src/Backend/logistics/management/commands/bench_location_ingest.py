@@ -0,0 +1,65 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import User
+from logistics.models import LogisticsPartner
+from logistics.tracking import LocationStore
+
+
+class Command(BaseCommand):
+    help = (
+        "Courier GPS pings written one model save at a time versus ingested into the in-memory "
+        "location store and flushed with bulk_update. Creates throwaway couriers and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--couriers', type=int, default=200)
+        parser.add_argument('--pings', type=int, default=20, help="Pings per courier")
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        tag = uuid.uuid4().hex[:8]
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username=f"bench-{tag}-{i}", phone_number=f"bench-{tag}-{i}", is_logistics=True)
+                for i in range(options['couriers'])
+            ])
+            couriers = LogisticsPartner.objects.bulk_create([
+                LogisticsPartner(user=user, name=user.username, address="", latitude=28.6, longitude=77.2)
+                for user in users
+            ])
+        pings = [
+            (courier.id, 28.6 + rng.uniform(-0.1, 0.1), 77.2 + rng.uniform(-0.1, 0.1), time.time() + step)
+            for step in range(options['pings'])
+            for courier in couriers
+        ]
+        try:
+            start = time.perf_counter()
+            by_id = {courier.id: courier for courier in couriers}
+            for courier_id, lat, lon, _ in pings:
+                courier = by_id[courier_id]
+                courier.latitude, courier.longitude = lat, lon
+                courier.save(update_fields=['latitude', 'longitude'])
+            per_ping = time.perf_counter() - start
+
+            store = LocationStore()
+            start = time.perf_counter()
+            for offset in range(0, len(pings), 500):  # requests of 500 pings
+                store.ingest(pings[offset:offset + 500])
+            ingest = time.perf_counter() - start
+            start = time.perf_counter()
+            flushed = store.flush()
+            flush = time.perf_counter() - start
+
+            self.stdout.write(f"{len(pings)} pings from {len(couriers)} couriers")
+            self.stdout.write(f"  one save per ping: {per_ping:.2f}s ({len(pings) / per_ping:,.0f} pings/s)")
+            self.stdout.write(
+                f"  location store:    ingest {ingest * 1000:.1f} ms ({len(pings) / ingest:,.0f} pings/s), "
+                f"flush of {flushed} couriers {flush * 1000:.1f} ms"
+            )
+        finally:
+            User.objects.filter(id__in=[user.id for user in users]).delete()
@@ -0,0 +1,46 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from api.models import User
+from buyer.models import Buyer, Order, OrderLine
+from logistics.utils import ReceiptTemplate, generate_order_pdf, receipt_template
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-receipt render time of generate_order_pdf with a template rebuilt on every call "
+        "(the old behaviour) versus the process-wide one. Creates a throwaway order and deletes it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=200)
+        parser.add_argument('--lines', type=int, default=6, help="Lines on the order")
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f"bench-{tag}", password=tag, phone_number=f"bench-{tag}", is_buyer=True)
+        buyer = Buyer.objects.create(user=user, address="12 Bench Road, Delhi")
+        try:
+            order = Order.objects.create(buyer=buyer, total=60 * options['lines'])
+            OrderLine.objects.bulk_create([
+                OrderLine(order=order, name=f"Produce {i}", unit_price=20, quantity=3, line_total=60)
+                for i in range(options['lines'])
+            ])
+            order = Order.objects.for_receipt().get(pk=order.pk)
+            receipt_template()  # built once per process, outside the timed loop
+
+            for label, template in (("rebuilt per call", ReceiptTemplate), ("shared template", receipt_template)):
+                timings = []
+                for _ in range(options['runs']):
+                    start = time.perf_counter()
+                    generate_order_pdf(order, template())
+                    timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+                self.stdout.write(
+                    f"{label:>16}: median {timings[len(timings) // 2]:.2f} ms, "
+                    f"p90 {timings[int(len(timings) * 0.9)]:.2f} ms per receipt"
+                )
+        finally:
+            user.delete()
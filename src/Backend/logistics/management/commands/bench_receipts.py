@@ -0,0 +1,57 @@
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+from api.models import User
+from buyer.models import Buyer, Order, OrderLine
+from logistics.receipts import render_receipt
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare receipts/sec rendered on the calling process with a process pool "
+        "(as used by logistics.receipts.ReceiptRenderer). Creates throwaway orders and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--lines', type=int, default=6, help="Lines per order")
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f"bench-{tag}", password=tag, phone_number=f"bench-{tag}", is_buyer=True)
+        buyer = Buyer.objects.create(user=user, address="12 Bench Road, Delhi")
+        try:
+            orders = Order.objects.bulk_create([Order(buyer=buyer, total=60 * options['lines']) for _ in range(options['orders'])])
+            OrderLine.objects.bulk_create([
+                OrderLine(order=order, name=f"Produce {i}", unit_price=20, quantity=3, line_total=60)
+                for order in orders
+                for i in range(options['lines'])
+            ])
+            orders = list(Order.objects.for_receipt().filter(buyer=buyer))
+
+            start = time.perf_counter()
+            for order in orders:
+                render_receipt(order)
+            self.report("single process", len(orders), time.perf_counter() - start)
+
+            with ProcessPoolExecutor(
+                max_workers=options['workers'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            ) as pool:
+                # Warm up: worker start-up and imports are paid once per process, not per receipt
+                list(pool.map(render_receipt, orders[:options['workers']]))
+                start = time.perf_counter()
+                list(pool.map(render_receipt, orders, chunksize=4))
+                self.report(f"pool of {options['workers']}", len(orders), time.perf_counter() - start)
+        finally:
+            user.delete()
+
+    def report(self, label, count, elapsed):
+        self.stdout.write(f"{label:>16}: {count} receipts in {elapsed:.2f}s ({count / elapsed:.1f} receipts/s)")
@@ -0,0 +1,36 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from logistics.routing import distance_matrix, plan_route
+
+
+class Command(BaseCommand):
+    help = "Time logistics.routing.plan_route on random pickup/drop pairs around Delhi (cold distance cache)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=50, help="Each order adds a pickup and a drop stop")
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        timings = []
+        for _ in range(options['runs']):
+            stops, partners = [], {}
+            for _ in range(options['orders']):
+                stops.append((28.6139 + rng.uniform(-0.2, 0.2), 77.2090 + rng.uniform(-0.2, 0.2)))
+                stops.append((28.6139 + rng.uniform(-0.2, 0.2), 77.2090 + rng.uniform(-0.2, 0.2)))
+                partners[len(stops) - 1] = len(stops) - 2
+
+            distance_matrix.cache_clear()
+            start = time.perf_counter()
+            _, legs = plan_route((28.6139, 77.2090), stops, partners)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        self.stdout.write(
+            f"{len(stops)} stops: median {timings[len(timings) // 2]:.1f} ms, "
+            f"max {timings[-1]:.1f} ms, last route {sum(legs):.1f} km"
+        )
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from logistics.dispatch import dispatch_pending_orders
+from logistics.utils import COURIER_RADIUS_KM
+
+
+class Command(BaseCommand):
+    help = "Batch-assign unassigned orders to couriers (min-cost with per-courier capacity)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--radius-km', type=float, default=COURIER_RADIUS_KM)
+        parser.add_argument('--capacity', type=int, default=None, help="Defaults to settings.COURIER_CAPACITY")
+        parser.add_argument('--loop', action='store_true', help="Keep dispatching every --interval seconds")
+        parser.add_argument('--interval', type=float, default=60)
+
+    def handle(self, *args, **options):
+        while True:
+            summary = dispatch_pending_orders(radius_km=options['radius_km'], capacity=options['capacity'])
+            self.stdout.write(
+                f"Assigned {summary['assigned']}/{summary['orders']} orders to {summary['couriers']} couriers "
+                f"({summary['total_distance_km']} km total)"
+            )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
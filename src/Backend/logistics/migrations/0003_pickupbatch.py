@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logistics", "0002_courierassignment"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PickupBatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cell", models.CharField(db_index=True, max_length=32)),
+                ("latitude", models.FloatField()),
+                ("longitude", models.FloatField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "courier",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pickup_batches",
+                        to="logistics.logisticspartner",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="courierassignment",
+            name="batch",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="assignments",
+                to="logistics.pickupbatch",
+            ),
+        ),
+    ]
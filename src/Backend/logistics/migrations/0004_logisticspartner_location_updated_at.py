@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logistics", "0003_pickupbatch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="logisticspartner",
+            name="location_updated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
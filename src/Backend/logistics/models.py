@@ -10,14 +10,29 @@ class LogisticsPartner(models.Model):
     address = models.TextField()
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    # Time of the GPS fix behind latitude/longitude, written by logistics.tracking
+    location_updated_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.name
 
 
+class PickupBatch(models.Model):
+    """Orders whose farmers share a pickup grid cell, collected by one courier in one stop (see logistics.batching)."""
+    courier = models.ForeignKey(LogisticsPartner, related_name='pickup_batches', on_delete=models.CASCADE)
+    cell = models.CharField(max_length=32, db_index=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Batch {self.id} @ {self.cell} -> {self.courier.name}"
+
+
 class CourierAssignment(models.Model):
     courier = models.ForeignKey(LogisticsPartner, on_delete=models.CASCADE)
     order = models.OneToOneField(Order, on_delete=models.CASCADE)
+    batch = models.ForeignKey(PickupBatch, related_name='assignments', null=True, blank=True, on_delete=models.SET_NULL)
     distance_km = models.FloatField()
     assigned_at = models.DateTimeField(auto_now_add=True)
 
@@ -0,0 +1,232 @@
+# logistics/receipts.py
+
+import hashlib
+import io
+import json
+import multiprocessing
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from buyer.models import Order
+from logistics.utils import generate_order_pdf
+
+# Bump when generate_order_pdf's layout changes so cached receipts are not reused
+RECEIPT_TEMPLATE_VERSION = 2
+# How long a request waits for an in-flight background render before rendering itself
+PENDING_WAIT_SECONDS = 5
+
+
+def receipt_cache():
+    return caches['receipts']
+
+
+def snapshot_hash(order):
+    """Hash of everything printed on the receipt: status, buyer details, lines and total."""
+    buyer = order.buyer
+    snapshot = {
+        'status': order.status,
+        'created_at': order.created_at.isoformat(),
+        'buyer': [buyer.user.username, buyer.user.phone_number, buyer.address],
+        'lines': [[line.name, line.quantity, str(line.unit_price), str(line.line_total)] for line in order.all_lines()],
+        'total': str(order.total),
+    }
+    return hashlib.sha256(json.dumps(snapshot, sort_keys=True).encode()).hexdigest()
+
+
+def receipt_key(order):
+    return f"receipt:v{RECEIPT_TEMPLATE_VERSION}:{order.id}:{order.status}:{snapshot_hash(order)}"
+
+
+def render_receipt(order):
+    return generate_order_pdf(order).getvalue()
+
+
+class ReceiptRenderer:
+    """
+    Renders receipts on a process pool (RECEIPT_RENDER_WORKERS processes) and stores them
+    in the receipts cache, so most downloads find the PDF already rendered.
+    """
+
+    def __init__(self):
+        self._pool = None
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn: the web process runs threads (geocoder, courier assignment) that fork would copy mid-flight
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.RECEIPT_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return self._pool
+
+    def submit(self, order, key):
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            try:
+                future = self._get_pool().submit(render_receipt, order)
+            except BrokenProcessPool:
+                self._pool = None
+                future = self._get_pool().submit(render_receipt, order)
+            self._pending[key] = future
+        future.add_done_callback(lambda done: self._store(key, done))
+        return future
+
+    def _store(self, key, future):
+        try:
+            receipt_cache().set(key, (future.result(), int(time.time())))
+        except Exception as e:
+            print(f" Background receipt render failed for {key}: {e}")
+        finally:
+            # Only after the cache is filled, so a concurrent get_receipt sees one or the other
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def pending(self, key):
+        with self._lock:
+            return self._pending.get(key)
+
+
+receipt_renderer = ReceiptRenderer()
+
+
+def prerender_receipts(order_ids):
+    """Queue background renders for orders whose current receipt is not cached yet."""
+    cache = receipt_cache()
+    for order in Order.objects.for_receipt().filter(id__in=order_ids):
+        key = receipt_key(order)
+        if cache.get(key) is None:
+            receipt_renderer.submit(order, key)
+
+
+def schedule_receipts(order_ids):
+    """Pre-render after the current transaction commits; a no-op when RECEIPT_RENDER_WORKERS is 0."""
+    if not settings.RECEIPT_RENDER_WORKERS:
+        return
+    order_ids = list(order_ids)
+    transaction.on_commit(lambda: prerender_receipts(order_ids))
+
+
+def get_receipt(order, key=None):
+    """(pdf bytes, rendered_at timestamp). A miss waits for an in-flight background render, else renders here."""
+    key = key or receipt_key(order)
+    cached = receipt_cache().get(key)
+    if cached is not None:
+        return cached
+
+    future = receipt_renderer.pending(key)
+    if future is not None:
+        try:
+            cached = (future.result(timeout=PENDING_WAIT_SECONDS), int(time.time()))
+        except (TimeoutError, BrokenProcessPool):
+            cached = None
+    if cached is None:
+        cached = (render_receipt(order), int(time.time()))
+    receipt_cache().set(key, cached)
+    return cached
+
+
+def iter_receipts(orders):
+    """
+    Yield (order, pdf bytes) in the given order. Cached receipts are reused and the rest are
+    rendered in parallel on the receipt pool, at most 2 x RECEIPT_RENDER_WORKERS ahead of the
+    one being yielded; without a pool they render here one by one.
+    """
+    keys = [receipt_key(order) for order in orders]
+    cached = receipt_cache().get_many(keys)
+    misses = deque((order, key) for order, key in zip(orders, keys) if key not in cached)
+    window = 2 * settings.RECEIPT_RENDER_WORKERS
+    futures = {}
+
+    for order, key in zip(orders, keys):
+        if key in cached:
+            yield order, cached[key][0]
+            continue
+        while misses and len(futures) < window:
+            ahead, ahead_key = misses.popleft()
+            futures[ahead_key] = receipt_renderer.submit(ahead, ahead_key)
+        future = futures.pop(key, None)
+        if misses and misses[0][1] == key:
+            misses.popleft()
+        try:
+            pdf = future.result() if future is not None else None
+        except Exception as e:
+            print(f" Pooled receipt render failed for order {order.id}, rendering inline: {e}")
+            pdf = None
+        yield order, pdf if pdf is not None else get_receipt(order, key)[0]
+
+
+class _ZipSink:
+    """Write-only file object; zipfile falls back to streaming mode since it cannot seek or tell."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_receipts_zip(orders):
+    """Generate a ZIP of the orders' receipts chunk by chunk, one receipt in memory at a time."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for order, pdf in iter_receipts(orders):
+            archive.writestr(f"Order_{order.id}_receipt.pdf", pdf)
+            yield sink.drain()
+    yield sink.drain()
+
+
+async def astream_receipts_zip(orders):
+    """
+    stream_receipts_zip for ASGI: pulls one chunk at a time on the sync thread, where
+    StreamingHttpResponse would otherwise read a sync iterator into a list before sending it.
+    """
+    chunks = stream_receipts_zip(orders)
+    done = object()
+    while (chunk := await sync_to_async(next)(chunks, done)) is not done:
+        yield chunk
+
+
+def receipt_response(request, order, as_attachment=False, filename=None):
+    """
+    Serve an order's receipt from the cache with ETag/Last-Modified, answering
+    If-None-Match / If-Modified-Since with 304 before anything is rendered.
+    """
+    key = receipt_key(order)
+    etag = f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+    cached = receipt_cache().get(key)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=cached[1] if cached else None)
+    if not_modified is not None:
+        return not_modified
+
+    pdf, rendered_at = cached or get_receipt(order, key)
+    response = FileResponse(io.BytesIO(pdf), as_attachment=as_attachment, filename=filename or "", content_type='application/pdf')
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(rendered_at)
+    return response
@@ -0,0 +1,79 @@
+# logistics/routing.py
+
+from functools import lru_cache
+
+import numpy as np
+
+from logistics.spatial import haversine_np
+
+
+@lru_cache(maxsize=256)
+def distance_matrix(points):
+    """Pairwise haversine distances for a tuple of (lat, lon) points, as nested lists."""
+    coords = np.array(points, dtype=float)
+    lats, lons = coords[:, 0], coords[:, 1]
+    return haversine_np(lons[:, None], lats[:, None], lons[None, :], lats[None, :]).tolist()
+
+
+def plan_route(start, stops, partners):
+    """
+    Order `stops` into a short open path from `start`.
+
+    `start` and every stop are (lat, lon); pass start=None to begin at whichever stop
+    is chosen first. `partners` maps a drop's stop index to its pickup's stop index;
+    a drop is never visited before its pickup. Nearest-neighbour construction is
+    followed by 2-opt moves that keep every pickup ahead of its drop.
+    Returns (stop indexes in visiting order, km of the leg arriving at each of them).
+    """
+    if not stops:
+        return [], []
+
+    n = len(stops)
+    # Node 0 is the start; stop i is node i + 1. A missing start is at distance 0 from everything.
+    dist = distance_matrix(((start or stops[0]),) + tuple(stops))
+    if start is None:
+        dist = [list(row) for row in dist]
+        dist[0] = [0.0] * (n + 1)
+        for row in dist:
+            row[0] = 0.0
+
+    pickup_of = {drop + 1: pickup + 1 for drop, pickup in partners.items()}
+    pair_of = {**pickup_of, **{pickup: drop for drop, pickup in pickup_of.items()}}
+
+    # Nearest neighbour over feasible stops
+    route = [0]
+    visited = {0}
+    while len(route) <= n:
+        here = dist[route[-1]]
+        best = min(
+            (node for node in range(1, n + 1)
+             if node not in visited and pickup_of.get(node, 0) in visited),
+            key=here.__getitem__,
+        )
+        route.append(best)
+        visited.add(best)
+
+    # 2-opt: reversing route[i..j] is only allowed when the segment holds no complete pickup/drop pair
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n):
+            in_segment = {route[i]}
+            for j in range(i + 1, n + 1):
+                node = route[j]
+                if pair_of.get(node) in in_segment:
+                    break
+                in_segment.add(node)
+
+                a, b, c = route[i - 1], route[i], route[j]
+                delta = dist[a][c] - dist[a][b]
+                if j < n:
+                    e = route[j + 1]
+                    delta += dist[b][e] - dist[c][e]
+                if delta < -1e-9:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    improved = True
+                    in_segment = set(route[i:j + 1])
+
+    legs = [dist[a][b] for a, b in zip(route, route[1:])]
+    return [node - 1 for node in route[1:]], legs
@@ -0,0 +1,39 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from api.geocoding import enqueue_geocoding
+from buyer.models import Order
+from buyer.transitions import order_status_changed
+from .models import LogisticsPartner
+from .receipts import schedule_receipts
+from .spatial import courier_index
+from .tracking import location_store
+
+
+@receiver(post_save, sender=LogisticsPartner)
+def index_courier_location(sender, instance, **kwargs):
+    # A live ping outranks coordinates saved from a stale instance
+    lat, lon = location_store.get(instance.id) or (instance.latitude, instance.longitude)
+    courier_index.insert(instance.id, lat, lon)
+
+
+@receiver(post_save, sender=LogisticsPartner)
+def geocode_courier_address(sender, instance, **kwargs):
+    enqueue_geocoding(instance)
+
+
+@receiver(post_delete, sender=LogisticsPartner)
+def unindex_courier(sender, instance, **kwargs):
+    courier_index.remove(instance.id)
+    location_store.forget(instance.id)
+
+
+@receiver(post_save, sender=Order)
+def prerender_receipt(sender, instance, created, **kwargs):
+    # Bulk-created checkout orders are scheduled by the view, status changes by the receiver below
+    if created:
+        schedule_receipts([instance.id])
+
+
+@receiver(order_status_changed)
+def prerender_receipt_on_status_change(sender, order_id, **kwargs):
+    schedule_receipts([order_id])
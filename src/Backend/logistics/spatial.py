@@ -0,0 +1,187 @@
+# logistics/spatial.py
+
+import math
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE = 111.32
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    """
+    Calculate the distance in kilometers between two points on the Earth using the haversine formula.
+    """
+    # Convert decimal degrees to radians
+    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
+
+    # Haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+    return c * EARTH_RADIUS_KM
+
+
+def haversine_np(lon1, lat1, lon2, lat2):
+    """
+    Vectorized haversine in kilometers. Arguments broadcast, so pass scalars for one
+    point against arrays, or column/row vectors for a full distance matrix.
+    """
+    lon1, lat1, lon2, lat2 = map(np.radians, [lon1, lat1, lon2, lat2])
+
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    return 2 * np.arcsin(np.sqrt(a)) * EARTH_RADIUS_KM
+
+
+def bounding_box(lat, lon, radius_km):
+    """Return (min_lat, max_lat, min_lon, max_lon) enclosing a circle of radius_km around a point."""
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def grid_cell(lat, lon, cell_km):
+    """(row, col) of the fixed-size lat/lon cell containing a point."""
+    cell_deg = cell_km / KM_PER_DEGREE
+    return math.floor(lat / cell_deg), math.floor(lon / cell_deg)
+
+
+class GridIndex:
+    """
+    In-memory spatial index that buckets points into fixed-size lat/lon cells.
+
+    A radius query only visits the cells overlapping the query's bounding box,
+    so its cost depends on local density instead of the total number of points.
+    """
+
+    def __init__(self, cell_km=5):
+        self.cell_km = cell_km
+        self._cells = defaultdict(dict)  # (row, col) -> {key: (lat, lon)}
+        self._points = {}                # key -> (lat, lon, (row, col))
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key):
+        return key in self._points
+
+    def _cell(self, lat, lon):
+        return grid_cell(lat, lon, self.cell_km)
+
+    def get(self, key):
+        """(lat, lon) stored for key, or None."""
+        point = self._points.get(key)
+        return point[:2] if point else None
+
+    def insert(self, key, lat, lon):
+        if lat is None or lon is None:
+            self.remove(key)
+            return
+        cell = self._cell(lat, lon)
+        with self._lock:
+            previous = self._points.get(key)
+            if previous and previous[2] != cell:
+                self._drop_from_cell(key, previous[2])
+            self._cells[cell][key] = (lat, lon)
+            self._points[key] = (lat, lon, cell)
+
+    def remove(self, key):
+        with self._lock:
+            previous = self._points.pop(key, None)
+            if previous:
+                self._drop_from_cell(key, previous[2])
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._points.clear()
+
+    def _drop_from_cell(self, key, cell):
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def within(self, lat, lon, radius_km):
+        """Return [(key, distance_km), ...] for every point within radius_km, closest first."""
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+        row_lo, col_lo = self._cell(min_lat, min_lon)
+        row_hi, col_hi = self._cell(max_lat, max_lon)
+
+        matches = []
+        with self._lock:
+            for row in range(row_lo, row_hi + 1):
+                for col in range(col_lo, col_hi + 1):
+                    bucket = self._cells.get((row, col))
+                    if not bucket:
+                        continue
+                    for key, (p_lat, p_lon) in bucket.items():
+                        distance = haversine(lon, lat, p_lon, p_lat)
+                        if distance <= radius_km:
+                            matches.append((key, distance))
+
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    def nearest(self, lat, lon, radius_km):
+        """Return (key, distance_km) of the closest point within radius_km, or None."""
+        matches = self.within(lat, lon, radius_km)
+        return matches[0] if matches else None
+
+
+class CourierIndex(GridIndex):
+    """
+    Process-wide index of LogisticsPartner coordinates keyed by partner id.
+
+    Loaded lazily from the database, kept current by the post_save/post_delete
+    signals in logistics.signals and by GPS pings (logistics.tracking), and reloaded
+    after `refresh_seconds` so that changes made by other worker processes are
+    eventually picked up.
+    """
+
+    def __init__(self, cell_km=5, refresh_seconds=60):
+        super().__init__(cell_km=cell_km)
+        self.refresh_seconds = refresh_seconds
+        self._loaded_at = None
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def ensure_loaded(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        from logistics.models import LogisticsPartner
+        from logistics.tracking import location_store
+
+        rows = LogisticsPartner.objects.filter(
+            latitude__isnull=False, longitude__isnull=False
+        ).values_list('id', 'latitude', 'longitude')
+
+        with self._lock:
+            self.clear()
+            for courier_id, lat, lon in rows:
+                self.insert(courier_id, lat, lon)
+            # Pings received here but not flushed yet are newer than the database
+            for courier_id, lat, lon in location_store.unflushed():
+                self.insert(courier_id, lat, lon)
+            self._loaded_at = time.monotonic()
+
+    def within(self, lat, lon, radius_km):
+        self.ensure_loaded()
+        return super().within(lat, lon, radius_km)
+
+    def get(self, key):
+        self.ensure_loaded()
+        return super().get(key)
+
+
+courier_index = CourierIndex()
@@ -1,3 +1,499 @@
-from django.test import TestCase
+import io
+import threading
+import time
+import zipfile
+from concurrent.futures import Future
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient, force_authenticate
+
+from api.models import User
+from buyer.models import Buyer, CartItem, Order
+from farmer.models import Farmer, Produce
+import numpy as np
+
+from logistics import receipts
+from logistics.dispatch import dispatch_pending_orders, solve_assignment
+from logistics.models import CourierAssignment, LogisticsPartner, PickupBatch
+from logistics.routing import plan_route
+from logistics.spatial import GridIndex, courier_index
+from logistics.tracking import location_store
+from logistics.utils import assign_order_to_courier, assign_orders_to_couriers
+from logistics.views import ReceiptExportView
+
+
+def make_courier(username, lat, lon):
+    user = User.objects.create_user(username=username, password='pass', phone_number=username, is_logistics=True)
+    return LogisticsPartner.objects.create(user=user, name=username, address='Depot', latitude=lat, longitude=lon)
+
+
+class GridIndexTests(TestCase):
+    def test_nearest_returns_closest_point_within_radius(self):
+        index = GridIndex(cell_km=2)
+        index.insert('far', 28.70, 77.20)     # ~10 km north
+        index.insert('near', 28.62, 77.21)    # ~1 km away
+        index.insert('outside', 29.50, 77.20)  # ~100 km away
+
+        key, distance = index.nearest(28.6139, 77.2090, 15)
+        self.assertEqual(key, 'near')
+        self.assertLess(distance, 2)
+        self.assertEqual([k for k, _ in index.within(28.6139, 77.2090, 15)], ['near', 'far'])
+
+    def test_moving_and_removing_points(self):
+        index = GridIndex()
+        index.insert(1, 28.61, 77.20)
+        index.insert(1, 19.07, 72.87)  # moved to Mumbai
+        self.assertIsNone(index.nearest(28.61, 77.20, 15))
+        self.assertEqual(index.nearest(19.07, 72.87, 15)[0], 1)
+
+        index.remove(1)
+        self.assertEqual(len(index), 0)
+        self.assertIsNone(index.nearest(19.07, 72.87, 15))
+
+
+class AssignOrderToCourierTests(TestCase):
+    def setUp(self):
+        courier_index.invalidate()
+        buyer_user = User.objects.create_user(username='buyer', password='pass', phone_number='1000', is_buyer=True)
+        self.buyer = Buyer.objects.create(user=buyer_user, address='Delhi')
+
+    def test_assigns_closest_courier_not_first(self):
+        make_courier('c-far', 28.70, 77.20)
+        near = make_courier('c-near', 28.62, 77.21)
+        # buyer.signals assigns a courier as soon as an order is created with farmer coordinates
+        order = Order.objects.create(buyer=self.buyer, farmer_lat=28.6139, farmer_lon=77.2090)
+
+        self.assertEqual(CourierAssignment.objects.get(order=order).courier, near)
+
+    def test_index_follows_partner_saves(self):
+        courier = make_courier('c-moving', 19.07, 72.87)
+        order = Order.objects.create(buyer=self.buyer, farmer_lat=28.6139, farmer_lon=77.2090)
+        self.assertFalse(CourierAssignment.objects.filter(order=order).exists())
+
+        courier.latitude, courier.longitude = 28.62, 77.21
+        courier.save()
+        self.assertEqual(assign_order_to_courier(order).courier, courier)
+
+
+@override_settings(CHECKOUT_ASSIGNMENT_WORKERS=4)
+class AssignOrdersConcurrentlyTests(TestCase):
+    def test_each_pickup_cell_is_assigned_on_one_thread(self):
+        calls = []
+
+        def assign(order):
+            calls.append((order.id, threading.current_thread().name))
+            time.sleep(0.01)  # let the other cell's thread run meanwhile
+            return order.id
+
+        orders = [
+            Order(id=1, farmer_lat=28.6139, farmer_lon=77.2090),
+            Order(id=2, farmer_lat=19.0760, farmer_lon=72.8777),
+            Order(id=3, farmer_lat=28.6140, farmer_lon=77.2091),  # same cell as order 1
+            Order(id=4),  # no coordinates
+        ]
+        with mock.patch('logistics.utils.assign_order_to_courier', side_effect=assign):
+            self.assertEqual(assign_orders_to_couriers(orders), [1, 2, 3, 4])
+
+        thread_of = dict(calls)
+        self.assertEqual(thread_of[1], thread_of[3])
+        self.assertLess([order_id for order_id, _ in calls].index(1), [order_id for order_id, _ in calls].index(3))
+        self.assertTrue(all(name.startswith('courier-assign') for name in thread_of.values()))
+
+    @override_settings(CHECKOUT_ASSIGNMENT_WORKERS=1)
+    def test_sequential_path_keeps_the_callers_connection(self):
+        with mock.patch('logistics.utils.assign_order_to_courier', return_value=None), \
+                mock.patch.object(connection, 'close') as close:
+            assign_orders_to_couriers([Order(id=1, farmer_lat=28.6139, farmer_lon=77.2090), Order(id=2)])
+        close.assert_not_called()
+
+
+@override_settings(CHECKOUT_ASSIGNMENT_WORKERS=2)
+class AssignOrdersOnPoolTests(TransactionTestCase):
+    def test_pool_threads_assign_committed_orders(self):
+        courier_index.invalidate()
+        delhi = make_courier('c-delhi', 28.6139, 77.2090)
+        mumbai = make_courier('c-mumbai', 19.0760, 72.8777)
+        buyer_user = User.objects.create_user(username='buyer', password='pass', phone_number='1000', is_buyer=True)
+        buyer = Buyer.objects.create(user=buyer_user, address='Delhi')
+        # bulk_create skips Order.post_save, which would assign them one by one
+        orders = Order.objects.bulk_create([
+            Order(buyer=buyer, farmer_lat=28.6140, farmer_lon=77.2091),
+            Order(buyer=buyer, farmer_lat=19.0761, farmer_lon=72.8778),
+            Order(buyer=buyer, farmer_lat=28.6141, farmer_lon=77.2092),
+        ])
+
+        assignments = assign_orders_to_couriers(orders)
+
+        self.assertEqual([assignment.order_id for assignment in assignments], [order.id for order in orders])
+        self.assertEqual(
+            [assignment.courier_id for assignment in assignments], [delhi.id, mumbai.id, delhi.id]
+        )
+        self.assertEqual(assignments[0].batch_id, assignments[2].batch_id)
+        self.assertEqual(CourierAssignment.objects.count(), 3)
+        self.assertEqual(PickupBatch.objects.count(), 2)
+
+
+@override_settings(LOCATION_FLUSH_SECONDS=0)
+class LocationPingsTests(TestCase):
+    def setUp(self):
+        courier_index.invalidate()
+        location_store.clear()
+        self.addCleanup(location_store.clear)
+        buyer_user = User.objects.create_user(username='buyer', password='pass', phone_number='1000', is_buyer=True)
+        self.buyer = Buyer.objects.create(user=buyer_user, address='Delhi')
+        self.courier = make_courier('c-live', 19.07, 72.87)  # saved in Mumbai
+        self.client = APIClient()
+        self.client.force_authenticate(self.courier.user)
+
+    def test_pings_feed_assignment_and_are_flushed_in_bulk(self):
+        now = timezone.now().timestamp()
+        response = self.client.post('/api/v1/logistics/locations/', {'pings': [
+            {'lat': 28.60, 'lon': 77.20, 'recorded_at': now - 20},
+            {'lat': 28.62, 'lon': 77.21, 'recorded_at': now - 10},
+            {'lat': 12.97, 'lon': 77.59, 'recorded_at': now - 30},  # arrived late, older than the others
+        ]}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data, {'accepted': 2, 'ignored': 1})
+
+        self.courier.refresh_from_db()
+        self.assertEqual((self.courier.latitude, self.courier.longitude), (19.07, 72.87))
+        order = Order.objects.create(buyer=self.buyer, farmer_lat=28.6139, farmer_lon=77.2090)
+        self.assertEqual(CourierAssignment.objects.get(order=order).courier, self.courier)
+
+        courier_index.invalidate()  # a reload keeps positions that are not flushed yet
+        self.assertEqual(courier_index.get(self.courier.id), (28.62, 77.21))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(location_store.flush(), 1)
+        self.courier.refresh_from_db()
+        self.assertEqual((self.courier.latitude, self.courier.longitude), (28.62, 77.21))
+        self.assertAlmostEqual(self.courier.location_updated_at.timestamp(), now - 10, places=3)
+        self.assertEqual(location_store.flush(), 0)
+
+    def test_invalid_pings_are_rejected(self):
+        response = self.client.post('/api/v1/logistics/locations/', {'pings': [
+            {'lat': 28.6, 'lon': 77.2}, {'lat': 128.6, 'lon': 77.2}, {'lon': 77.2},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['errors']), {1, 2})
+        self.assertEqual(len(location_store), 0)
+
+
+class NearbyOrdersViewTests(TestCase):
+    def setUp(self):
+        courier_index.invalidate()
+        self.courier = make_courier('courier', 28.6139, 77.2090)
+        buyer_user = User.objects.create_user(username='buyer', password='pass', phone_number='1000', is_buyer=True)
+        self.buyer = Buyer.objects.create(user=buyer_user, address='Delhi')
+        farmer_user = User.objects.create_user(username='farmer', password='pass', phone_number='2000', is_farmer=True)
+        self.farmer = Farmer.objects.create(user=farmer_user, name='Ravi', address='Farm')
+        self.client = APIClient()
+        self.client.force_authenticate(self.courier.user)
+
+    def make_order(self, farmer_lat, farmer_lon, status='PENDING'):
+        produce = Produce.objects.create(farmer=self.farmer, name='Tomato', price=20, quantity=10)
+        item = CartItem.objects.create(buyer=self.buyer, produce=produce, quantity=1)
+        order = Order.objects.create(buyer=self.buyer, status=status, farmer_lat=farmer_lat, farmer_lon=farmer_lon)
+        order.items.set([item])
+        return order
+
+    def test_orders_sorted_by_distance_within_radius(self):
+        far = self.make_order(28.70, 77.20)
+        near = self.make_order(28.62, 77.21)
+        self.make_order(29.50, 77.20)                   # outside the radius
+        self.make_order(28.62, 77.21, status='DELIVERED')
+
+        response = self.client.get('/api/v1/logistics/orders/nearby/', {'radius_km': 20})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([o['order_id'] for o in response.data], [near.id, far.id])
+        self.assertEqual(response.data[0]['farmer_name'], 'Ravi')
+        self.assertNotIn('X-Next-Cursor', response)
+
+    def test_keyset_pagination(self):
+        expected = [self.make_order(28.6139 + 0.01 * i, 77.2090).id for i in range(5)]
+
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get('/api/v1/logistics/orders/nearby/', params)
+            seen += [o['order_id'] for o in response.data]
+            cursor = response.get('X-Next-Cursor')
+            if not cursor:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_invalid_params_rejected(self):
+        response = self.client.get('/api/v1/logistics/orders/nearby/', {'radius_km': 'far'})
+        self.assertEqual(response.status_code, 400)
+
+
+class DispatchTests(TestCase):
+    def setUp(self):
+        courier_index.invalidate()
+        buyer_user = User.objects.create_user(username='buyer', password='pass', phone_number='1000', is_buyer=True)
+        self.buyer = Buyer.objects.create(user=buyer_user, address='Delhi')
+
+    def make_unassigned_order(self, lat, lon):
+        # Set coordinates with update() so buyer.signals does not assign a courier on create
+        order = Order.objects.create(buyer=self.buyer)
+        Order.objects.filter(pk=order.pk).update(farmer_lat=lat, farmer_lon=lon)
+        return order
+
+    def test_solve_assignment_respects_capacity_and_minimises_distance(self):
+        # Two single-slot couriers, three orders: order 2 sits on courier 0, so order 0 must go unassigned
+        rows, cols = np.array([0, 0, 1, 1, 2]), np.array([0, 1, 0, 1, 0])
+        dists = np.array([1.0, 5.0, 2.0, 3.0, 0.0])
+
+        orders, couriers, distances = solve_assignment(3, [1, 1], rows, cols, dists)
+        self.assertEqual(dict(zip(orders.tolist(), couriers.tolist())), {1: 1, 2: 0})
+        self.assertEqual(distances.sum(), 3.0)
+
+    def test_dispatch_spreads_orders_across_couriers(self):
+        busy = make_courier('c-busy', 28.6139, 77.2090)
+        spare = make_courier('c-spare', 28.65, 77.21)
+        # Three farms ~2 km apart, i.e. three pickup stops; capacity is counted in stops
+        for i in range(3):
+            self.make_unassigned_order(28.6139 + 0.02 * i, 77.2090)
+
+        summary = dispatch_pending_orders(capacity=2)
+        self.assertEqual((summary['assigned'], summary['batches']), (3, 3))
+        loads = [CourierAssignment.objects.filter(courier=c).count() for c in (busy, spare)]
+        self.assertEqual(sorted(loads), [1, 2])
+
+        # Already-assigned orders are not dispatched again
+        self.assertEqual(dispatch_pending_orders(capacity=2)['orders'], 0)
+
+    def test_dispatch_endpoint_is_staff_only(self):
+        make_courier('c1', 28.6139, 77.2090)
+        self.make_unassigned_order(28.6139, 77.2090)
+        client = APIClient()
+        client.force_authenticate(self.buyer.user)
+        self.assertEqual(client.post('/api/v1/logistics/dispatch/').status_code, 403)
+
+        staff = User.objects.create_user(username='ops', password='pass', phone_number='9999', is_staff=True)
+        client.force_authenticate(staff)
+        response = client.post('/api/v1/logistics/dispatch/', {'capacity': 5}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['assigned'], 1)
+
+
+class RouteTests(TestCase):
+    def test_plan_route_keeps_pickups_before_drops(self):
+        # Drops sit right next to the start, pickups far away: a naive nearest-first tour would drop first
+        stops = [(28.70, 77.20), (28.6140, 77.2091), (28.71, 77.21), (28.6141, 77.2092)]
+        partners = {1: 0, 3: 2}
+
+        sequence, legs = plan_route((28.6139, 77.2090), stops, partners)
+        position = {stop: i for i, stop in enumerate(sequence)}
+        self.assertEqual(sorted(sequence), [0, 1, 2, 3])
+        self.assertTrue(all(position[pickup] < position[drop] for drop, pickup in partners.items()))
+        self.assertEqual(len(legs), 4)
+
+    def test_route_endpoint(self):
+        courier_index.invalidate()
+        courier = make_courier('courier', 28.6139, 77.2090)
+        buyer_user = User.objects.create_user(username='buyer', password='pass', phone_number='1000', is_buyer=True)
+        buyer = Buyer.objects.create(user=buyer_user, address='Delhi')
+        waiting = Order.objects.create(buyer=buyer, buyer_lat=28.65, buyer_lon=77.25, farmer_lat=28.62, farmer_lon=77.21)
+        on_board = Order.objects.create(buyer=buyer, status='IN_TRANSIT', buyer_lat=28.60, buyer_lon=77.20,
+                                        farmer_lat=28.62, farmer_lon=77.21)
+        Order.objects.create(buyer=buyer, status='DELIVERED', buyer_lat=28.6, buyer_lon=77.2, farmer_lat=28.62, farmer_lon=77.21)
+        self.assertEqual(CourierAssignment.objects.filter(courier=courier).count(), 3)
+
+        client = APIClient()
+        client.force_authenticate(courier.user)
+        response = client.get('/api/v1/logistics/assigned-orders/route/')
+        self.assertEqual(response.status_code, 200)
+        stops = [(s['order_id'], s['type']) for s in response.data['stops']]
+        self.assertEqual(sorted(stops), sorted([(waiting.id, 'pickup'), (waiting.id, 'drop'), (on_board.id, 'drop')]))
+        self.assertLess(stops.index((waiting.id, 'pickup')), stops.index((waiting.id, 'drop')))
+        self.assertAlmostEqual(response.data['total_distance_km'], sum(s['leg_km'] for s in response.data['stops']), places=1)
+
+
+class PickupBatchTests(TestCase):
+    def setUp(self):
+        courier_index.invalidate()
+        buyer_user = User.objects.create_user(username='buyer', password='pass', phone_number='1000', is_buyer=True)
+        self.buyer = Buyer.objects.create(user=buyer_user, address='Delhi')
+
+    def make_unassigned_order(self, lat, lon):
+        order = Order.objects.create(buyer=self.buyer)
+        Order.objects.filter(pk=order.pk).update(farmer_lat=lat, farmer_lon=lon)
+        return order
+
+    def test_dispatch_assigns_a_farm_once_and_new_orders_join_it(self):
+        make_courier('c1', 28.6139, 77.2090)
+        make_courier('c2', 28.6140, 77.2091)
+        orders = [self.make_unassigned_order(28.62, 77.21) for _ in range(3)]
+
+        summary = dispatch_pending_orders(capacity=1)
+        self.assertEqual((summary['assigned'], summary['batches']), (3, 1))
+        batch = PickupBatch.objects.get()
+        self.assertEqual(set(batch.assignments.values_list('order_id', flat=True)), {o.id for o in orders})
+
+        # Checkout-time assignment rides along with the open batch instead of picking a new courier
+        late = Order.objects.create(buyer=self.buyer, farmer_lat=28.62, farmer_lon=77.21)
+        self.assertEqual(CourierAssignment.objects.get(order=late).batch, batch)
+
+    def test_joining_an_open_batch_respects_capacity(self):
+        first = make_courier('c1', 28.6139, 77.2090)
+        self.make_unassigned_order(28.62, 77.21)
+        dispatch_pending_orders(capacity=1)
+        batch = PickupBatch.objects.get()
+        second = make_courier('c2', 28.63, 77.22)
+
+        # c1 is full: the new order in the same cell is matched to c2 instead
+        full = self.make_unassigned_order(28.62, 77.21)
+        summary = dispatch_pending_orders(capacity=1)
+        assignment = CourierAssignment.objects.get(order=full)
+        self.assertEqual((summary['assigned'], assignment.courier), (1, second))
+        self.assertNotEqual(assignment.batch, batch)
+
+        # With room left it rides along, at the courier's real distance from the farm
+        joined = self.make_unassigned_order(28.62, 77.21)
+        summary = dispatch_pending_orders(capacity=3)
+        assignment = CourierAssignment.objects.get(order=joined)
+        self.assertIn(assignment.batch.courier, (first, second))
+        self.assertGreater(assignment.distance_km, 0.5)
+        self.assertEqual(summary['total_distance_km'], round(assignment.distance_km, 2))
+
+    def test_list_and_claim_batches(self):
+        courier = make_courier('c1', 48.85, 2.35)  # far away, so nothing is auto-assigned
+        self.make_unassigned_order(48.86, 2.36)
+        self.make_unassigned_order(48.86, 2.36)
+        self.make_unassigned_order(48.90, 2.40)
+
+        client = APIClient()
+        client.force_authenticate(courier.user)
+        batches = client.get('/api/v1/logistics/pickup-batches/').data
+        self.assertEqual([b['order_count'] for b in batches], [2, 1])
+
+        response = client.post('/api/v1/logistics/pickup-batches/claim/', {'cell': batches[0]['cell']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.data['order_ids']), sorted(batches[0]['order_ids']))
+        self.assertEqual(len(client.get('/api/v1/logistics/pickup-batches/').data), 1)
+
+        other = make_courier('c2', 48.85, 2.35)
+        client.force_authenticate(other.user)
+        self.make_unassigned_order(48.86, 2.36)
+        response = client.post('/api/v1/logistics/pickup-batches/claim/', {'cell': batches[0]['cell']}, format='json')
+        self.assertEqual(response.status_code, 409)
+
+
+@override_settings(RECEIPT_RENDER_WORKERS=0)
+class ReceiptExportTests(TestCase):
+    def setUp(self):
+        courier_index.invalidate()
+        buyer_user = User.objects.create_user(username='buyer', password='pass', phone_number='1000', is_buyer=True)
+        buyer = Buyer.objects.create(user=buyer_user, address='Delhi')
+        self.courier = make_courier('c1', 28.6139, 77.2090)
+        self.orders = [Order.objects.create(buyer=buyer, farmer_lat=28.62, farmer_lon=77.21) for _ in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.courier.user)
+
+    def export(self, query=''):
+        return self.client.get(f'/api/v1/logistics/receipts/export/{query}')
+
+    def test_zip_of_all_assigned_orders(self):
+        response = self.export()
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), [f'Order_{order.id}_receipt.pdf' for order in self.orders])
+        self.assertTrue(archive.read(archive.namelist()[0]).startswith(b'%PDF'))
+
+    def test_selected_orders_must_be_assigned_to_the_courier(self):
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(self.export(f'?order_ids={self.orders[1].id}').streaming_content)))
+        self.assertEqual(len(archive.namelist()), 1)
+
+        CourierAssignment.objects.filter(order=self.orders[2]).delete()
+        response = self.export(f'?order_ids={self.orders[1].id},{self.orders[2].id}')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['order_ids'], [self.orders[2].id])
+
+    def test_default_export_skips_finished_orders(self):
+        Order.objects.filter(id=self.orders[0].id).update(status='DELIVERED')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(self.export().streaming_content)))
+        self.assertEqual(archive.namelist(), [f'Order_{order.id}_receipt.pdf' for order in self.orders[1:]])
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(self.export(f'?order_ids={self.orders[0].id}').streaming_content)))
+        self.assertEqual(len(archive.namelist()), 1)
+
+    @override_settings(RECEIPT_RENDER_WORKERS=1)
+    def test_renders_are_submitted_a_window_ahead(self):
+        caches['receipts'].clear()
+        orders = list(Order.objects.for_receipt().filter(id__in=[order.id for order in self.orders]).order_by('id'))
+        submitted = []
+
+        def submit(order, key):
+            submitted.append(order.id)
+            future = Future()
+            future.set_result(b'%PDF')
+            return future
+
+        with mock.patch.object(receipts.receipt_renderer, 'submit', side_effect=submit):
+            rows = receipts.iter_receipts(orders)
+            next(rows)
+            self.assertEqual(submitted, [order.id for order in orders[:2]])
+            self.assertEqual(len(list(rows)), 2)
+        self.assertEqual(submitted, [order.id for order in orders])
+
+    @override_settings(RECEIPT_RENDER_WORKERS=0)
+    def test_asgi_export_streams_one_receipt_at_a_time(self):
+        caches['receipts'].clear()
+        request = AsyncRequestFactory().get('/api/v1/logistics/receipts/export/')
+        force_authenticate(request, user=self.courier.user)
+        response = ReceiptExportView.as_view()(request)
+        self.assertTrue(response.is_async)
+
+        async def read(stream, rendered):
+            chunks = [await anext(stream)]
+            rendered.append(render.call_count)
+            return chunks + [chunk async for chunk in stream]
+
+        rendered = []
+        with mock.patch('logistics.receipts.render_receipt', wraps=receipts.render_receipt) as render:
+            chunks = async_to_sync(read)(response.streaming_content, rendered)
+        self.assertEqual(rendered, [1])
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(len(archive.namelist()), 3)
+
+
+class OrderStatusTransitionTests(TestCase):
+    def setUp(self):
+        courier_index.invalidate()
+        buyer_user = User.objects.create_user(username='buyer', password='pass', phone_number='1000', is_buyer=True)
+        self.order = Order.objects.create(buyer=Buyer.objects.create(user=buyer_user, address='Delhi'))
+        self.courier = make_courier('c1', 28.6139, 77.2090)
+        self.client = APIClient()
+        self.client.force_authenticate(self.courier.user)
+
+    def set_status(self, status):
+        return self.client.patch(f'/api/v1/logistics/orders/{self.order.id}/status/', {'status': status}, format='json')
+
+    def test_transitions_are_validated_and_logged(self):
+        self.assertEqual(self.set_status('DELIVERED').status_code, 409)
+        for status in ('CONFIRMED', 'PICKED_UP', 'DELIVERED'):
+            self.assertEqual(self.set_status(status).status_code, 200)
+        self.assertEqual(self.set_status('PENDING').status_code, 409)
+
+        events = list(self.order.events.order_by('created_at').values_list('from_status', 'to_status'))
+        self.assertEqual(events, [('PENDING', 'CONFIRMED'), ('CONFIRMED', 'PICKED_UP'), ('PICKED_UP', 'DELIVERED')])
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'DELIVERED')
+        with self.assertRaises(ValueError):
+            self.order.events.first().save()
+
+    def test_timings_rollup(self):
+        Order.objects.filter(pk=self.order.pk).update(created_at=timezone.now() - timedelta(minutes=10))
+        self.set_status('CONFIRMED')
+
+        staff = User.objects.create_user(username='ops', password='pass', phone_number='9000', is_staff=True)
+        self.client.force_authenticate(staff)
+        rows = self.client.get('/api/v1/logistics/status-timings/').data
+        self.assertEqual([(row['status'], row['exits']) for row in rows], [('PENDING', 1)])
+        self.assertAlmostEqual(rows[0]['avg_seconds'], 600, delta=5)
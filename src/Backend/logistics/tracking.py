@@ -0,0 +1,167 @@
+# logistics/tracking.py
+
+import atexit
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+
+from .spatial import courier_index
+
+# Rows allocated up front; the arrays double when more couriers report in
+INITIAL_CAPACITY = 1024
+FLUSH_BATCH_SIZE = 500
+
+
+class LocationStore:
+    """
+    Latest GPS fix per courier, kept in memory and written to LogisticsPartner in bulk.
+
+    Each courier gets one row in three preallocated numpy arrays (latitude, longitude,
+    fix time as epoch seconds), so a position costs 24 bytes plus its dict slot instead
+    of a model instance. Pings only ever move a courier forward in time: a fix older than
+    the stored one is ignored, so out-of-order batches from a device are harmless.
+
+    Changed rows are remembered and flushed with one bulk_update every
+    LOCATION_FLUSH_SECONDS by a daemon thread, and at exit (0 leaves flushing to the caller). bulk_update sends no
+    post_save, so flushing does not disturb courier_index, which ingest() already updated.
+    The store is per process: other workers see a ping once it is flushed and their
+    courier index reloads.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self._rows = {}  # courier_id -> row
+        self._size = 0   # rows handed out
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._lats = np.zeros(capacity)
+        self._lons = np.zeros(capacity)
+        self._times = np.zeros(capacity)
+        self._dirty = set()  # rows changed since the last flush
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _row_for(self, courier_id):
+        row = self._rows.get(courier_id)
+        if row is None:
+            row = self._size
+            self._size += 1
+            if row == len(self._ids):
+                size = len(self._ids) * 2
+                self._ids, self._lats, self._lons, self._times = (
+                    np.resize(array, size) for array in (self._ids, self._lats, self._lons, self._times)
+                )
+            self._rows[courier_id] = row
+            self._ids[row] = courier_id
+            self._times[row] = -np.inf
+        return row
+
+    def ingest(self, pings):
+        """
+        Apply [(courier_id, lat, lon, recorded_at_epoch), ...] and update courier_index with
+        each courier's newest position. Returns the number of pings that moved a courier.
+        """
+        moved = {}
+        with self._lock:
+            for courier_id, lat, lon, recorded_at in pings:
+                row = self._row_for(courier_id)
+                if recorded_at < self._times[row]:
+                    continue
+                self._lats[row], self._lons[row], self._times[row] = lat, lon, recorded_at
+                self._dirty.add(row)
+                moved[courier_id] = moved.get(courier_id, 0) + 1
+            positions = [(courier_id, self._lats[self._rows[courier_id]], self._lons[self._rows[courier_id]])
+                         for courier_id in moved]
+
+        for courier_id, lat, lon in positions:
+            courier_index.insert(courier_id, float(lat), float(lon))
+        self.start()
+        return sum(moved.values())
+
+    def get(self, courier_id):
+        """(lat, lon) of the courier's latest ping in this process, or None."""
+        with self._lock:
+            row = self._rows.get(courier_id)
+            if row is None:
+                return None
+            return float(self._lats[row]), float(self._lons[row])
+
+    def unflushed(self):
+        """[(courier_id, lat, lon), ...] for positions the database does not have yet."""
+        with self._lock:
+            return [(int(self._ids[row]), float(self._lats[row]), float(self._lons[row])) for row in self._dirty]
+
+    def forget(self, courier_id):
+        # Rows are not reused; a deleted courier's row just stops being flushed or returned
+        with self._lock:
+            row = self._rows.pop(courier_id, None)
+            if row is not None:
+                self._dirty.discard(row)
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+            self._dirty.clear()
+            self._size = 0
+
+    def flush(self):
+        """Write every changed position with bulk_update. Returns the number of couriers written."""
+        from .models import LogisticsPartner
+
+        with self._lock:
+            rows = [row for row in self._dirty if self._rows.get(int(self._ids[row])) == row]
+            self._dirty.clear()
+            partners = [
+                LogisticsPartner(
+                    id=int(self._ids[row]),
+                    latitude=float(self._lats[row]),
+                    longitude=float(self._lons[row]),
+                    location_updated_at=datetime.fromtimestamp(self._times[row], tz=dt_timezone.utc),
+                )
+                for row in rows
+            ]
+        if not partners:
+            return 0
+        try:
+            LogisticsPartner.objects.bulk_update(
+                partners, ['latitude', 'longitude', 'location_updated_at'], batch_size=FLUSH_BATCH_SIZE
+            )
+        except Exception:
+            with self._lock:
+                self._dirty.update(rows)  # retried on the next flush
+            raise
+        return len(partners)
+
+    def start(self):
+        if settings.LOCATION_FLUSH_SECONDS <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="location-flusher", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(settings.LOCATION_FLUSH_SECONDS)
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception as e:
+                print(f" Flushing courier locations failed: {e}")
+
+
+location_store = LocationStore()
+
+
+def current_position(courier):
+    """Latest known (lat, lon) of a LogisticsPartner: live pings first, then its saved coordinates."""
+    position = location_store.get(courier.id)
+    if position is None and courier.latitude is not None and courier.longitude is not None:
+        position = (courier.latitude, courier.longitude)
+    return position
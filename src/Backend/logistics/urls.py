@@ -3,9 +3,11 @@ from .views import NearbyOrdersView
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import CourierAssignmentViewSet
-from .views import AssignedOrdersView
-from .views import UpdateOrderStatusView
-from .views import OrderReceiptPDFView
+from .views import AssignedOrdersView, AssignedOrderRouteView
+from .views import UpdateOrderStatusView, LocationPingsView
+from .views import OrderReceiptPDFView, ReceiptExportView
+from .views import DispatchOrdersView, StatusTimingsView
+from .views import PickupBatchesView, ClaimPickupBatchView
 
 
 router = DefaultRouter()
@@ -16,6 +18,13 @@ urlpatterns = [
     path('orders/nearby/', NearbyOrdersView.as_view(), name='nearby-orders'),
     path('', include(router.urls)),
     path('assigned-orders/', AssignedOrdersView.as_view(), name='assigned-orders'),
+    path('assigned-orders/route/', AssignedOrderRouteView.as_view(), name='assigned-orders-route'),
     path('orders/<int:order_id>/status/', UpdateOrderStatusView.as_view(), name='update-order-status'),
     path('orders/<int:order_id>/receipt/', OrderReceiptPDFView.as_view(), name='order-receipt-pdf'),
+    path('locations/', LocationPingsView.as_view(), name='location-pings'),
+    path('receipts/export/', ReceiptExportView.as_view(), name='receipt-export'),
+    path('dispatch/', DispatchOrdersView.as_view(), name='dispatch-orders'),
+    path('status-timings/', StatusTimingsView.as_view(), name='status-timings'),
+    path('pickup-batches/', PickupBatchesView.as_view(), name='pickup-batches'),
+    path('pickup-batches/claim/', ClaimPickupBatchView.as_view(), name='claim-pickup-batch'),
 ]
@@ -1,8 +1,12 @@
 # logistics/utils.py
 
-from geopy.distance import geodesic
-from logistics.models import CourierAssignment, LogisticsPartner
+from logistics.models import CourierAssignment, PickupBatch
+from logistics.batching import cell_key, open_batches
+from logistics.spatial import courier_index, haversine
 import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection
 import io
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
@@ -18,49 +22,110 @@ from reportlab.pdfgen import canvas
 from reportlab.lib import colors
 from django.conf import settings
 
+COURIER_RADIUS_KM = 15
+
+
 def assign_order_to_courier(order):
     if not (order.farmer_lat and order.farmer_lon):
         print(" Order missing farmer coordinates")
         return
 
-    courier_candidates = LogisticsPartner.objects.all()
-    farmer_location = (order.farmer_lat, order.farmer_lon)
+    # Another order from the same pickup cell is already on someone's route: ride along
+    cell = cell_key(order.farmer_lat, order.farmer_lon)
+    batch = open_batches([cell]).get(cell)
+    if batch:
+        courier_location = courier_index.get(batch.courier_id)
+        distance = haversine(courier_location[1], courier_location[0], order.farmer_lon, order.farmer_lat) \
+            if courier_location else 0.0
+        assignment = CourierAssignment.objects.create(
+            courier_id=batch.courier_id,
+            order=order,
+            batch=batch,
+            distance_km=distance
+        )
+        print(f" Added order {order.id} to pickup batch #{batch.id} (courier #{batch.courier_id})")
+        return assignment
+
+    match = courier_index.nearest(order.farmer_lat, order.farmer_lon, COURIER_RADIUS_KM)
+    if match is None:
+        print("🚫 No suitable courier found within 15km")
+        return
+
+    courier_id, distance = match
+    batch = PickupBatch.objects.create(
+        courier_id=courier_id,
+        cell=cell,
+        latitude=order.farmer_lat,
+        longitude=order.farmer_lon
+    )
+    assignment = CourierAssignment.objects.create(
+        courier_id=courier_id,
+        order=order,
+        batch=batch,
+        distance_km=distance
+    )
+    print(f" Assigned courier #{courier_id} to order {order.id} ({distance:.2f} km)")
+    return assignment
+
+
+_assignment_pool = None
+_assignment_pool_lock = threading.Lock()
+
 
-    for courier in courier_candidates:
-        courier_location = (courier.latitude, courier.longitude)
-        distance = geodesic(farmer_location, courier_location).km
+def _assign_safely(order):
+    try:
+        return assign_order_to_courier(order)
+    except Exception as e:
+        # Left unassigned; `manage.py dispatch_orders` picks it up on its next run
+        print(f" Courier assignment for order {order.id} failed: {e}")
 
-        if distance <= 15:
-            CourierAssignment.objects.create(
-                courier=courier,
-                order=order,
-                distance_km=distance
-            )
-            print(f" Assigned courier {courier.name} to order {order.id}")
-            return
 
-    print("🚫 No suitable courier found within 15km")
+def _assign_group(orders):
+    """Assign orders of one pickup cell one after another, so the first opens the batch the rest join."""
+    return [_assign_safely(order) for order in orders]
 
 
+def _assign_group_in_pool(orders):
+    # Pool threads outlive the request, so they give back the connection they opened
+    try:
+        return _assign_group(orders)
+    finally:
+        connection.close()
 
 
-def haversine(lon1, lat1, lon2, lat2):
+def assign_orders_to_couriers(orders):
     """
-    Calculate the distance in kilometers between two points on the Earth using the haversine formula.
+    Assign several committed orders (e.g. the per-farmer orders of one checkout) at once.
+    Orders are grouped by pickup cell and each cell is handled by one thread, on up to
+    CHECKOUT_ASSIGNMENT_WORKERS threads, so two threads never both open a batch for the
+    same cell. Returns the assignments in the order of `orders`, None where no courier fit.
     """
-    # Convert decimal degrees to radians
-    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
-
-    # Haversine formula
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    radius = 6371  # Radius of earth in kilometers
-    return c * radius
+    global _assignment_pool
+    groups = {}
+    for index, order in enumerate(orders):
+        cell = cell_key(order.farmer_lat, order.farmer_lon) if order.farmer_lat and order.farmer_lon else None
+        groups.setdefault(cell, []).append((index, order))
+    groups = list(groups.values())
+
+    workers = min(settings.CHECKOUT_ASSIGNMENT_WORKERS, len(groups))
+    if workers <= 1:
+        results = [_assign_group([order for _, order in group]) for group in groups]
+    else:
+        with _assignment_pool_lock:
+            if _assignment_pool is None:
+                _assignment_pool = ThreadPoolExecutor(
+                    max_workers=settings.CHECKOUT_ASSIGNMENT_WORKERS, thread_name_prefix="courier-assign"
+                )
+        results = list(_assignment_pool.map(_assign_group_in_pool, [[order for _, order in group] for group in groups]))
 
+    assignments = [None] * len(orders)
+    for group, group_results in zip(groups, results):
+        for (index, _), assignment in zip(group, group_results):
+            assignments[index] = assignment
+    return assignments
 
 
+import copy
 import io
 import os
 from datetime import datetime
@@ -69,100 +134,175 @@ from decimal import Decimal
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import inch
 from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image, Flowable
+from reportlab.lib.utils import ImageReader
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont # For custom fonts if needed, otherwise Helvetica/Times are default
 
-# Assuming settings is available from Django context
-# from django.conf import settings 
+LOGO_PATH = os.path.join(settings.BASE_DIR, 'static', 'logo', 'agrikart-logo.png')
+
+GUIDELINES = [
+    "1. All sales are final for perishable goods unless physical damage is documented at delivery.",
+    "2. Cancellation requests must be submitted within 15 minutes of order placement.",
+    "3. Delivery shall be attempted twice; unavailability of the recipient may result in cancellation.",
+    "4. Refunds for canceled orders (if eligible) will be processed within 48 business hours.",
+    "5. AgriKart is not liable for delays due to unforeseen logistical or environmental conditions.",
+    "6. Buyers are responsible for ensuring correct address and contact details during checkout.",
+    "7. AgriKart reserves the right to modify pricing, availability, or delivery estimates at its discretion.",
+    "8. By placing an order, the buyer agrees to comply with these terms and acknowledges the nature of agricultural perishables.",
+]
+
+
+class LogoFlowable(Flowable):
+    """Draws an already decoded ImageReader, so the PNG is not re-read for every receipt."""
+
+    def __init__(self, reader, width, height):
+        super().__init__()
+        self.reader = reader
+        self.width = width
+        self.height = height
+        self.hAlign = 'LEFT'
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height, mask='auto')
+
+
+class ReceiptTemplate:
+    """
+    Everything on a receipt that does not depend on the order: paragraph styles, the
+    decoded logo and the parsed static sections. Built once per process (see
+    receipt_template()); generate_order_pdf only lays out the order-specific tables.
+    """
+
+    def __init__(self, logo_path=LOGO_PATH):
+        styles = getSampleStyleSheet()
+
+        # Define custom paragraph styles for better typography
+        styles.add(ParagraphStyle(name='HeadingAgriKart',
+                                   fontName='Helvetica-Bold',
+                                   fontSize=28,
+                                   leading=32,
+                                   alignment=1, # TA_CENTER
+                                   textColor=colors.HexColor('#2e7d32') # Primary Green
+                                   ))
+        styles.add(ParagraphStyle(name='SubHeading',
+                                   fontName='Helvetica-Bold',
+                                   fontSize=16,
+                                   leading=20,
+                                   alignment=1, # TA_CENTER
+                                   textColor=colors.HexColor('#333333')
+                                   ))
+        styles.add(ParagraphStyle(name='SectionTitle',
+                                   fontName='Helvetica-Bold',
+                                   fontSize=12,
+                                   leading=14,
+                                   textColor=colors.HexColor('#1b5e20'), # Secondary Green
+                                   spaceAfter=6
+                                   ))
+        styles.add(ParagraphStyle(name='NormalText',
+                                   fontName='Helvetica',
+                                   fontSize=10,
+                                   leading=14,
+                                   textColor=colors.HexColor('#333333')
+                                   ))
+        styles.add(ParagraphStyle(name='SmallText',
+                                   fontName='Helvetica',
+                                   fontSize=8,
+                                   leading=10,
+                                   textColor=colors.HexColor('#666666')
+                                   ))
+        styles.add(ParagraphStyle(name='BoldText',
+                                   fontName='Helvetica-Bold',
+                                   fontSize=10,
+                                   leading=14,
+                                   textColor=colors.HexColor('#333333')
+                                   ))
+        styles.add(ParagraphStyle(name='TotalAmount',
+                                   fontName='Helvetica-Bold',
+                                   fontSize=12,
+                                   leading=16,
+                                   textColor=colors.HexColor('#2e7d32')
+                                   ))
+        styles.add(ParagraphStyle(name='Guidelines',
+                                   fontName='Helvetica',
+                                   fontSize=8,
+                                   leading=11,
+                                   textColor=colors.HexColor('#333333')
+                                   ))
+        styles.add(ParagraphStyle(name='FooterText',
+                                   fontName='Helvetica-Oblique',
+                                   fontSize=7,
+                                   leading=9,
+                                   alignment=1, # TA_CENTER
+                                   textColor=colors.gray
+                                   ))
+        self.styles = styles
+
+        # Placeholder if logo not found (or remove if logo is mandatory)
+        self.logo = ImageReader(logo_path) if os.path.exists(logo_path) else None
+
+        self.brand = Paragraph("<b>AgriKart.ai</b>", styles['HeadingAgriKart'])
+        self.label = {
+            text: Paragraph(f"<b>{text}</b>", styles['BoldText'])
+            for text in ("Order Placed:", "Order ID:", "Payment Status:", "Overall Status:",
+                         "Buyer Name:", "Buyer Phone:", "Delivery Address:", "Shipping Speed:",
+                         "Product Name", "Quantity", "Unit Price", "Subtotal")
+        }
+        self.text = {
+            text: Paragraph(text, styles['NormalText'])
+            for text in ("Success", "Same-day Farm Pickup", "Item(s) Subtotal:", "Shipping Charges:", "Estimated Tax:", "")
+        }
+        self.grand_total_label = Paragraph("<b>Grand Total:</b>", styles['TotalAmount'])
+        self.section = {
+            text: Paragraph(text, styles['SectionTitle'])
+            for text in ("Shipping Details", "Items Ordered", "Payment Summary", "Buyer Policy and Guidelines")
+        }
+        self.guidelines = [Paragraph(rule, styles['Guidelines']) for rule in GUIDELINES]
+        self.footer = Paragraph("For full legal terms, refer to agrikart.com/legal or contact our support.", styles['FooterText'])
+
+    def static(self, flowable):
+        """
+        A private copy of a parsed paragraph for one receipt. Builds run concurrently on the
+        assignment and receipt pools, and line breaking writes to the paragraph and its
+        fragments, so the fragments are deep-copied; the style stays shared, it is only read.
+        """
+        clone = copy.copy(flowable)
+        clone.__dict__.pop('blPara', None)
+        clone.frags = copy.deepcopy(flowable.frags)
+        return clone
+
+
+_receipt_template = None
+
+
+def receipt_template():
+    global _receipt_template
+    if _receipt_template is None:
+        _receipt_template = ReceiptTemplate()
+    return _receipt_template
+
+
+def generate_order_pdf(order, template=None):
+    template = template or receipt_template()
+    styles = template.styles
+    static = template.static
+    label = lambda text: static(template.label[text])
+    text = lambda value: static(template.text[value])
 
-def generate_order_pdf(order):
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4,
                             rightMargin=40, leftMargin=40,
                             topMargin=40, bottomMargin=40)
 
-    styles = getSampleStyleSheet()
-
-    # Define custom paragraph styles for better typography
-    styles.add(ParagraphStyle(name='HeadingAgriKart',
-                               fontName='Helvetica-Bold',
-                               fontSize=28,
-                               leading=32,
-                               alignment=1, # TA_CENTER
-                               textColor=colors.HexColor('#2e7d32') # Primary Green
-                               ))
-    styles.add(ParagraphStyle(name='SubHeading',
-                               fontName='Helvetica-Bold',
-                               fontSize=16,
-                               leading=20,
-                               alignment=1, # TA_CENTER
-                               textColor=colors.HexColor('#333333')
-                               ))
-    styles.add(ParagraphStyle(name='SectionTitle',
-                               fontName='Helvetica-Bold',
-                               fontSize=12,
-                               leading=14,
-                               textColor=colors.HexColor('#1b5e20'), # Secondary Green
-                               spaceAfter=6
-                               ))
-    styles.add(ParagraphStyle(name='NormalText',
-                               fontName='Helvetica',
-                               fontSize=10,
-                               leading=14,
-                               textColor=colors.HexColor('#333333')
-                               ))
-    styles.add(ParagraphStyle(name='SmallText',
-                               fontName='Helvetica',
-                               fontSize=8,
-                               leading=10,
-                               textColor=colors.HexColor('#666666')
-                               ))
-    styles.add(ParagraphStyle(name='BoldText',
-                               fontName='Helvetica-Bold',
-                               fontSize=10,
-                               leading=14,
-                               textColor=colors.HexColor('#333333')
-                               ))
-    styles.add(ParagraphStyle(name='TotalAmount',
-                               fontName='Helvetica-Bold',
-                               fontSize=12,
-                               leading=16,
-                               textColor=colors.HexColor('#2e7d32')
-                               ))
-    styles.add(ParagraphStyle(name='Guidelines',
-                               fontName='Helvetica',
-                               fontSize=8,
-                               leading=11,
-                               textColor=colors.HexColor('#333333')
-                               ))
-    styles.add(ParagraphStyle(name='FooterText',
-                               fontName='Helvetica-Oblique',
-                               fontSize=7,
-                               leading=9,
-                               alignment=1, # TA_CENTER
-                               textColor=colors.gray
-                               ))
-
     Story = []
-    width, height = A4 # Get page dimensions for calculations if needed
-
 
     # --- Header Section ---
-    # Attempt to load logo dynamically (assuming settings.BASE_DIR points to project root)
-    # For a real deployment, make sure static files are collected and accessible.
-    logo_path = 'static/logo/agrikart-logo.png' # Example path, adjust as needed.
-                                              # You might need to pass settings.BASE_DIR explicitly
-                                              # or configure ReportLab's image search path.
-    # Placeholder if logo not found (or remove if logo is mandatory)
-    if os.path.exists(logo_path):
-        logo = Image(logo_path, width=0.95 * inch, height=0.8 * inch) # Adjust size
-        logo.hAlign = 'LEFT'
-    else:
-        logo = Paragraph("", styles['NormalText']) # Empty placeholder
-
-    header_data = [[logo, Paragraph("<b>AgriKart.ai</b>", styles['HeadingAgriKart'])]]
+    logo = LogoFlowable(template.logo, 0.95 * inch, 0.8 * inch) if template.logo else text("")
+    header_data = [[logo, static(template.brand)]]
     header_table = Table(header_data, colWidths=[1.5*inch, None])
     header_table.setStyle(TableStyle([
         ('ALIGN', (0,0), (0,0), 'LEFT'),
@@ -178,10 +318,10 @@ def generate_order_pdf(order):
 
     # --- Order Info Block ---
     order_info_data = [
-        [Paragraph("<b>Order Placed:</b>", styles['BoldText']), Paragraph(order.created_at.strftime('%B %d, %Y %I:%M %p'), styles['NormalText'])],
-        [Paragraph("<b>Order ID:</b>", styles['BoldText']), Paragraph(f"#{order.id}", styles['NormalText'])],
-        [Paragraph("<b>Payment Status:</b>", styles['BoldText']), Paragraph('Success' or 'N/A', styles['NormalText'])], # Assuming payment_status
-        [Paragraph("<b>Overall Status:</b>", styles['BoldText']), Paragraph(order.status or 'N/A', styles['NormalText'])], # Assuming order status
+        [label("Order Placed:"), Paragraph(order.created_at.strftime('%B %d, %Y %I:%M %p'), styles['NormalText'])],
+        [label("Order ID:"), Paragraph(f"#{order.id}", styles['NormalText'])],
+        [label("Payment Status:"), text("Success")], # Assuming payment_status
+        [label("Overall Status:"), Paragraph(order.status or 'N/A', styles['NormalText'])], # Assuming order status
     ]
     order_info_table = Table(order_info_data, colWidths=[1.5*inch, None])
     order_info_table.setStyle(TableStyle([
@@ -196,12 +336,12 @@ def generate_order_pdf(order):
     Story.append(Spacer(1, 0.2 * inch))
 
     # --- Shipping Details ---
-    Story.append(Paragraph("Shipping Details", styles['SectionTitle']))
+    Story.append(static(template.section["Shipping Details"]))
     shipping_details_data = [
-        [Paragraph("<b>Buyer Name:</b>", styles['BoldText']), Paragraph(order.buyer.user.username if order.buyer and order.buyer.user else 'N/A', styles['NormalText'])],
-        [Paragraph("<b>Buyer Phone:</b>", styles['BoldText']), Paragraph(order.buyer.user.phone_number if order.buyer and order.buyer.user else 'N/A', styles['NormalText'])],
-        [Paragraph("<b>Delivery Address:</b>", styles['BoldText']), Paragraph(order.buyer.address or 'N/A', styles['NormalText'])],
-        [Paragraph("<b>Shipping Speed:</b>", styles['BoldText']), Paragraph("Same-day Farm Pickup", styles['NormalText'])],
+        [label("Buyer Name:"), Paragraph(order.buyer.user.username if order.buyer and order.buyer.user else 'N/A', styles['NormalText'])],
+        [label("Buyer Phone:"), Paragraph(order.buyer.user.phone_number if order.buyer and order.buyer.user else 'N/A', styles['NormalText'])],
+        [label("Delivery Address:"), Paragraph(order.buyer.address or 'N/A', styles['NormalText'])],
+        [label("Shipping Speed:"), text("Same-day Farm Pickup")],
     ]
     shipping_details_table = Table(shipping_details_data, colWidths=[1.7*inch, None])
     shipping_details_table.setStyle(TableStyle([
@@ -215,27 +355,20 @@ def generate_order_pdf(order):
 
 
     # --- Items Ordered ---
-    Story.append(Paragraph("Items Ordered", styles['SectionTitle']))
-    
-    item_header_data = [
-        Paragraph("<b>Product Name</b>", styles['BoldText']),
-        Paragraph("<b>Quantity</b>", styles['BoldText']),
-        Paragraph("<b>Unit Price</b>", styles['BoldText']),
-        Paragraph("<b>Subtotal</b>", styles['BoldText'])
-    ]
+    Story.append(static(template.section["Items Ordered"]))
+
+    item_header_data = [label("Product Name"), label("Quantity"), label("Unit Price"), label("Subtotal")]
     items_data = [item_header_data]
 
+    # Lines are snapshots taken at checkout, so no lookups back to Produce are needed
     subtotal_items = Decimal("0.00")
-    for item in order.items.all():
-        item_price = Decimal(str(item.produce.price)) # Convert to Decimal for safe calculation
-        item_quantity = Decimal(str(item.quantity))
-        item_total = item_price * item_quantity
-        subtotal_items += item_total
+    for line in order.all_lines():
+        subtotal_items += line.line_total
         items_data.append([
-            Paragraph(item.produce.name, styles['NormalText']),
-            Paragraph(f"{item.quantity} {item.produce.unit if hasattr(item.produce, 'unit') and item.produce.unit else ''}", styles['NormalText']), # Assuming produce has a 'unit' attribute
-            Paragraph(f"₹{item_price:.2f}", styles['NormalText']),
-            Paragraph(f"₹{item_total:.2f}", styles['NormalText'])
+            Paragraph(line.name, styles['NormalText']),
+            Paragraph(f"{line.quantity}", styles['NormalText']),
+            Paragraph(f"₹{line.unit_price:.2f}", styles['NormalText']),
+            Paragraph(f"₹{line.line_total:.2f}", styles['NormalText'])
         ])
 
     item_table = Table(items_data, colWidths=[2.5*inch, 1*inch, 1*inch, 1.5*inch]) # Adjust column widths
@@ -257,21 +390,18 @@ def generate_order_pdf(order):
 
 
     # --- Payment Summary ---
-    Story.append(Paragraph("Payment Summary", styles['SectionTitle']))
+    Story.append(static(template.section["Payment Summary"]))
 
-    # Use actual order.total_amount if available, otherwise calculate
-    # It's better to trust the backend's calculated total_amount if present
-    # Assuming order.total_amount, order.shipping_cost, order.tax_amount are fields on the Order model
-    # If not, use the previous logic with fixed values or calculate.
+    # order.total is stored at checkout; shipping_cost/tax_amount are not Order fields yet
     shipping = Decimal(str(order.shipping_cost)) if hasattr(order, 'shipping_cost') and order.shipping_cost is not None else Decimal("0.00")
     tax = Decimal(str(order.tax_amount)) if hasattr(order, 'tax_amount') and order.tax_amount is not None else Decimal("0.00")
-    grand_total = Decimal(str(order.total_amount)) if hasattr(order, 'total_amount') and order.total_amount is not None else (subtotal_items + shipping + tax)
+    grand_total = order.total + shipping + tax
 
     payment_summary_data = [
-        [Paragraph("Item(s) Subtotal:", styles['NormalText']), Paragraph(f"₹{subtotal_items:.2f}", styles['NormalText'])],
-        [Paragraph("Shipping Charges:", styles['NormalText']), Paragraph(f"₹{shipping:.2f}", styles['NormalText'])],
-        [Paragraph("Estimated Tax:", styles['NormalText']), Paragraph(f"₹{tax:.2f}", styles['NormalText'])],
-        [Paragraph("<b>Grand Total:</b>", styles['TotalAmount']), Paragraph(f"<b>₹{grand_total:.2f}</b>", styles['TotalAmount'])],
+        [text("Item(s) Subtotal:"), Paragraph(f"₹{subtotal_items:.2f}", styles['NormalText'])],
+        [text("Shipping Charges:"), Paragraph(f"₹{shipping:.2f}", styles['NormalText'])],
+        [text("Estimated Tax:"), Paragraph(f"₹{tax:.2f}", styles['NormalText'])],
+        [static(template.grand_total_label), Paragraph(f"<b>₹{grand_total:.2f}</b>", styles['TotalAmount'])],
     ]
     payment_summary_table = Table(payment_summary_data, colWidths=[None, 1.5*inch]) # Right column fixed width
     payment_summary_table.setStyle(TableStyle([
@@ -287,29 +417,19 @@ def generate_order_pdf(order):
 
 
     # --- Buyer Guidelines ---
-    Story.append(Paragraph("Buyer Policy and Guidelines", styles['SectionTitle']))
+    Story.append(static(template.section["Buyer Policy and Guidelines"]))
     Story.append(Spacer(1, 0.1 * inch))
 
-    guidelines = [
-        "1. All sales are final for perishable goods unless physical damage is documented at delivery.",
-        "2. Cancellation requests must be submitted within 15 minutes of order placement.",
-        "3. Delivery shall be attempted twice; unavailability of the recipient may result in cancellation.",
-        "4. Refunds for canceled orders (if eligible) will be processed within 48 business hours.",
-        "5. AgriKart is not liable for delays due to unforeseen logistical or environmental conditions.",
-        "6. Buyers are responsible for ensuring correct address and contact details during checkout.",
-        "7. AgriKart reserves the right to modify pricing, availability, or delivery estimates at its discretion.",
-        "8. By placing an order, the buyer agrees to comply with these terms and acknowledges the nature of agricultural perishables.",
-    ]
-    for rule in guidelines:
-        Story.append(Paragraph(rule, styles['Guidelines']))
+    for rule in template.guidelines:
+        Story.append(static(rule))
         Story.append(Spacer(1, 0.05 * inch)) # Small space between rules
 
     Story.append(Spacer(1, 0.4 * inch))
 
-    Story.append(Paragraph("For full legal terms, refer to agrikart.com/legal or contact our support.", styles['FooterText']))
+    Story.append(static(template.footer))
 
 
     # Build the PDF
     doc.build(Story)
     buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer
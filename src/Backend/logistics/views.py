@@ -1,10 +1,17 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from buyer.models import Order
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from buyer.models import Order, OrderStatusTiming
+from buyer.transitions import InvalidTransition, transition
 from farmer.models import Farmer
 from .models import LogisticsPartner
-from .utils import haversine
+from .spatial import bounding_box, haversine, haversine_np
+from .batching import cell_bounds, cluster_orders, create_batches, join_batch, open_batches, unassigned_orders
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+import numpy as np
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework import status
@@ -13,65 +20,118 @@ from logistics.models import CourierAssignment
 from logistics.serializers import CourierAssignmentSerializer
 from rest_framework.permissions import IsAuthenticated
 from buyer.serializers import OrderSerializer
-from .utils import generate_order_pdf
-from django.http import FileResponse
+from .utils import COURIER_RADIUS_KM
+from .receipts import astream_receipts_zip, receipt_response, stream_receipts_zip
+from .dispatch import ACTIVE_STATUSES, dispatch_pending_orders
+from .routing import plan_route
+from .tracking import current_position, location_store
+from django.utils.dateparse import parse_datetime
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, StreamingHttpResponse
 from buyer.models import Order
 
 
 
 class NearbyOrdersView(APIView):
+    """
+    PENDING orders around the requesting courier, closest first.
+
+    Query params: `radius_km` (default 1000), `limit` (default 50, max 200) and
+    `cursor` (value of the previous page's `X-Next-Cursor` header).
+    """
     permission_classes = [IsAuthenticated]
 
+    DEFAULT_RADIUS_KM = 1000
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 200
+
     def get(self, request):
         user = request.user
         if not user.is_logistics:
             return Response({"detail": "Not authorized"}, status=403)
 
+        try:
+            radius_km = float(request.query_params.get('radius_km', self.DEFAULT_RADIUS_KM))
+            limit = min(int(request.query_params.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+            cursor = self.parse_cursor(request.query_params.get('cursor'))
+        except ValueError:
+            return Response({"error": "radius_km, limit and cursor must be numeric"}, status=400)
+        if radius_km <= 0 or limit <= 0:
+            return Response({"error": "radius_km and limit must be positive"}, status=400)
+
         logistics = LogisticsPartner.objects.get(user=user)
-        logistics_lat = logistics.latitude
-        logistics_lon = logistics.longitude
+        position = current_position(logistics)
+        if position is None:
+            return Response([], status=status.HTTP_200_OK)
+        courier_lat, courier_lon = position
 
-        confirmed_orders = Order.objects.filter(status='PENDING').prefetch_related('items__produce')
-        nearby_orders = []
+        # SQL prefilter: only orders whose farmer lies inside the radius' bounding box
+        min_lat, max_lat, min_lon, max_lon = bounding_box(courier_lat, courier_lon, radius_km)
+        candidates = list(
+            Order.objects.filter(
+                status='PENDING',
+                farmer_lat__range=(min_lat, max_lat),
+                farmer_lon__range=(min_lon, max_lon),
+            ).values_list('id', 'farmer_lat', 'farmer_lon')
+        )
+        if not candidates:
+            return Response([], status=status.HTTP_200_OK)
 
-        for order in confirmed_orders:
-            try:
-                cart_items = order.items.all()
-                first_item = cart_items[0] if cart_items else None
-                if not first_item:
-                    continue
-
-                farmer = first_item.produce.farmer
-                if farmer.latitude is None or farmer.longitude is None:
-                    continue
-
-                dist = haversine(logistics_lon, logistics_lat, farmer.longitude, farmer.latitude)
-
-                if dist <= 1000:
-                    nearby_orders.append({
-                        "order_id": order.id,
-                        "status": order.status,
-                        "buyer_address": order.buyer.address,
-                        "farmer_name": farmer.name,
-                        "farmer_address": farmer.address,
-                        "farmer_lat": farmer.latitude,
-                        "farmer_lon": farmer.longitude,
-                        "distance_km": round(dist, 2),
-                        "items": [
-                            {
-                                "produce": {
-                                    "name": item.produce.name
-                                },
-                                "quantity": item.quantity
-                            } for item in cart_items
-                        ]
-                    })
-
-            except Exception as e:
-                print(f" Error processing order {order.id}: {e}")
+        ids, lats, lons = (np.array(column) for column in zip(*candidates))
+        distances = haversine_np(courier_lon, courier_lat, lons, lats)
+
+        keep = distances <= radius_km
+        if cursor:
+            last_distance, last_id = cursor
+            keep &= (distances > last_distance) | ((distances == last_distance) & (ids > last_id))
+        ids, distances = ids[keep], distances[keep]
+
+        ranked = np.lexsort((ids, distances))[:limit + 1]
+        page = [(int(ids[i]), float(distances[i])) for i in ranked]
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        orders = Order.objects.filter(id__in=[order_id for order_id, _ in page]) \
+            .select_related('buyer').prefetch_related('items__produce__farmer').in_bulk()
+
+        nearby_orders = []
+        for order_id, dist in page:
+            order = orders[order_id]
+            cart_items = list(order.items.all())
+            if not cart_items:
                 continue
-        print(nearby_orders)
-        return Response(nearby_orders, status=status.HTTP_200_OK)
+            farmer = cart_items[0].produce.farmer
+            nearby_orders.append({
+                "order_id": order.id,
+                "status": order.status,
+                "buyer_address": order.buyer.address,
+                "farmer_name": farmer.name,
+                "farmer_address": farmer.address,
+                "farmer_lat": order.farmer_lat,
+                "farmer_lon": order.farmer_lon,
+                "distance_km": round(dist, 2),
+                "items": [
+                    {
+                        "produce": {
+                            "name": item.produce.name
+                        },
+                        "quantity": item.quantity
+                    } for item in cart_items
+                ]
+            })
+
+        response = Response(nearby_orders, status=status.HTTP_200_OK)
+        if has_more:
+            last_id, last_distance = page[-1]
+            response['X-Next-Cursor'] = f"{last_distance!r}:{last_id}"
+        return response
+
+    @staticmethod
+    def parse_cursor(raw):
+        if not raw:
+            return None
+        distance, order_id = raw.split(':')
+        return float(distance), int(order_id)
 
 
 
@@ -91,11 +151,67 @@ class AssignedOrdersView(APIView):
         if not user.is_logistics:
             return Response({"detail": "Not authorized"}, status=403)
 
-        assignments = CourierAssignment.objects.filter(courier__user=user).select_related('order')
+        assignments = CourierAssignment.objects.filter(courier__user=user) \
+            .select_related('order').prefetch_related('order__lines')
         orders = [assignment.order for assignment in assignments]
         return Response(OrderSerializer(orders, many=True).data)
 
 
+class AssignedOrderRouteView(APIView):
+    """
+    Suggested pickup-then-drop sequence for the courier's active orders.
+    Orders not yet picked up contribute a farmer pickup and a buyer drop;
+    PICKED_UP/IN_TRANSIT orders only the drop.
+    """
+    permission_classes = [IsAuthenticated]
+
+    AWAITING_PICKUP = ['PENDING', 'CONFIRMED']
+    ON_BOARD = ['PICKED_UP', 'IN_TRANSIT']
+
+    def get(self, request):
+        user = request.user
+        if not user.is_logistics:
+            return Response({"detail": "Not authorized"}, status=403)
+
+        courier = LogisticsPartner.objects.get(user=user)
+        orders = Order.objects.filter(
+            courierassignment__courier=courier, status__in=self.AWAITING_PICKUP + self.ON_BOARD
+        ).order_by('id').values('id', 'status', 'farmer_lat', 'farmer_lon', 'buyer_lat', 'buyer_lon')
+
+        stops, labels, partners, skipped = [], [], {}, []
+        for order in orders:
+            needs_pickup = order['status'] in self.AWAITING_PICKUP
+            if order['buyer_lat'] is None or order['buyer_lon'] is None or \
+                    (needs_pickup and (order['farmer_lat'] is None or order['farmer_lon'] is None)):
+                skipped.append(order['id'])
+                continue
+            if needs_pickup:
+                stops.append((order['farmer_lat'], order['farmer_lon']))
+                labels.append((order['id'], 'pickup'))
+                partners[len(stops)] = len(stops) - 1
+            stops.append((order['buyer_lat'], order['buyer_lon']))
+            labels.append((order['id'], 'drop'))
+
+        start = current_position(courier)
+        sequence, legs = plan_route(start, stops, partners)
+
+        return Response({
+            "start": {"lat": start[0], "lon": start[1]} if start else None,
+            "stops": [
+                {
+                    "order_id": labels[i][0],
+                    "type": labels[i][1],
+                    "lat": stops[i][0],
+                    "lon": stops[i][1],
+                    "leg_km": round(leg, 2),
+                }
+                for i, leg in zip(sequence, legs)
+            ],
+            "total_distance_km": round(sum(legs), 2),
+            "skipped_orders": skipped,
+        }, status=status.HTTP_200_OK)
+
+
 class UpdateOrderStatusView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -111,19 +227,263 @@ class UpdateOrderStatusView(APIView):
         if new_status not in valid_statuses:
             return Response({"error": f"Invalid status. Allowed: {list(valid_statuses)}"}, status=400)
 
-        order.status = new_status
-        order.save()
+        try:
+            transition(order, new_status, actor=request.user)
+        except InvalidTransition as e:
+            return Response({"error": str(e)}, status=409)
         return Response({"message": f"Order status updated to {new_status}"}, status=200)
-    
+
+
+class LocationPingsView(APIView):
+    """
+    Batched GPS ingestion. Body: {"pings": [{"lat", "lon", "recorded_at"}, ...]} where
+    recorded_at is epoch seconds or ISO 8601 (default: now). Couriers send their own pings;
+    staff gateways may send pings for any courier by adding "courier_id" to each one.
+
+    Pings only update the in-memory location store (logistics.tracking), which the
+    assignment index reads immediately and which is flushed to the database in bulk.
+    """
+    permission_classes = [IsAuthenticated]
+
+    MAX_PINGS = 1000
+
+    def post(self, request):
+        user = request.user
+        if not (user.is_logistics or user.is_staff):
+            return Response({"detail": "Not authorized"}, status=403)
+
+        pings = request.data.get('pings')
+        if not isinstance(pings, list) or not pings:
+            return Response({"error": "pings must be a non-empty list"}, status=400)
+        if len(pings) > self.MAX_PINGS:
+            return Response({"error": f"At most {self.MAX_PINGS} pings per request"}, status=400)
+
+        own_id = None
+        if user.is_logistics:
+            own_id = LogisticsPartner.objects.filter(user=user).values_list('id', flat=True).first()
+            if own_id is None:
+                return Response({"error": "No logistics profile for this user"}, status=404)
+
+        now = timezone.now().timestamp()
+        parsed, errors = [], {}
+        for i, ping in enumerate(pings):
+            try:
+                parsed.append(self.parse_ping(ping, own_id, now))
+            except KeyError as e:
+                errors[i] = f"{e.args[0]} is required"
+            except (TypeError, ValueError) as e:
+                errors[i] = str(e)
+        if errors:
+            return Response({"errors": errors}, status=400)
+
+        if own_id is None:
+            courier_ids = {courier_id for courier_id, _, _, _ in parsed}
+            known = set(LogisticsPartner.objects.filter(id__in=courier_ids).values_list('id', flat=True))
+            if courier_ids - known:
+                return Response({"error": f"Unknown courier ids: {sorted(courier_ids - known)}"}, status=400)
+
+        accepted = location_store.ingest(parsed)
+        return Response({"accepted": accepted, "ignored": len(parsed) - accepted}, status=status.HTTP_202_ACCEPTED)
+
+    @staticmethod
+    def parse_ping(ping, own_id, now):
+        lat, lon = float(ping['lat']), float(ping['lon'])
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError("lat/lon out of range")
+
+        recorded_at = ping.get('recorded_at')
+        if recorded_at is None:
+            recorded_at = now
+        elif isinstance(recorded_at, str):
+            moment = parse_datetime(recorded_at)
+            if moment is None or timezone.is_naive(moment):
+                raise ValueError("recorded_at must be epoch seconds or an ISO 8601 time with an offset")
+            recorded_at = moment.timestamp()
+        else:
+            recorded_at = float(recorded_at)
+        # A device clock running ahead must not pin the courier to a position in the future
+        recorded_at = min(recorded_at, now)
+
+        courier_id = own_id if own_id is not None else int(ping['courier_id'])
+        return courier_id, lat, lon, recorded_at
+
 
 
 class OrderReceiptPDFView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, order_id):
-        order = Order.objects.get(id=order_id)
+        order = Order.objects.for_receipt().get(id=order_id)
+        if not request.user.is_logistics:
+            return Response({"error": "Unauthorized"}, status=403)
+
+        return receipt_response(request, order, as_attachment=True, filename=f"Order_{order_id}_receipt.pdf")
+
+
+class ReceiptExportView(APIView):
+    """
+    ZIP of receipts for the courier's assigned orders, streamed as each one is ready.
+    Pass ?order_ids=1,2,3 to pick orders; without it every active assigned order is included.
+    """
+    permission_classes = [IsAuthenticated]
+
+    MAX_ORDERS = 200
+
+    def get(self, request):
         if not request.user.is_logistics:
             return Response({"error": "Unauthorized"}, status=403)
 
-        pdf_buffer = generate_order_pdf(order)
-        return FileResponse(pdf_buffer, as_attachment=True, filename=f"Order_{order_id}_receipt.pdf")
+        orders = Order.objects.for_receipt().filter(courierassignment__courier__user=request.user).order_by('id')
+        order_ids = request.query_params.get('order_ids')
+        if order_ids:
+            try:
+                order_ids = {int(order_id) for order_id in order_ids.split(',')}
+            except ValueError:
+                return Response({"error": "order_ids must be a comma-separated list of integers"}, status=400)
+            orders = orders.filter(id__in=order_ids)
+        else:
+            orders = orders.filter(status__in=ACTIVE_STATUSES)
+
+        orders = list(orders[:self.MAX_ORDERS + 1])
+        if len(orders) > self.MAX_ORDERS:
+            return Response({"error": f"At most {self.MAX_ORDERS} receipts per export"}, status=400)
+        if order_ids and len(orders) != len(order_ids):
+            missing = sorted(order_ids - {order.id for order in orders})
+            return Response({"error": "Orders not assigned to you", "order_ids": missing}, status=404)
+
+        # Under ASGI a sync iterator would be read whole before the first byte goes out
+        stream = astream_receipts_zip if isinstance(request._request, ASGIRequest) else stream_receipts_zip
+        response = StreamingHttpResponse(stream(orders), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="receipts.zip"'
+        return response
+
+
+class StatusTimingsView(APIView):
+    """
+    How long orders stayed in each status over the last `days` days (default 7), read from
+    the OrderStatusTiming rollup that buyer.transitions maintains.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            return Response({"error": "days must be an integer"}, status=400)
+        if days < 1:
+            return Response({"error": "days must be at least 1"}, status=400)
+
+        since = timezone.localdate() - timedelta(days=days - 1)
+        rows = (
+            OrderStatusTiming.objects.filter(day__gte=since)
+            .values('status')
+            .annotate(exits=Sum('exits'), total_seconds=Sum('total_seconds'), max_seconds=Max('max_seconds'))
+            .order_by('status')
+        )
+        return Response([
+            {
+                "status": row['status'],
+                "exits": row['exits'],
+                "avg_seconds": round(row['total_seconds'] / row['exits'], 1) if row['exits'] else None,
+                "max_seconds": round(row['max_seconds'], 1),
+            }
+            for row in rows
+        ])
+
+
+class DispatchOrdersView(APIView):
+    """Staff trigger for the batch dispatcher (same as `manage.py dispatch_orders`)."""
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        try:
+            radius_km = float(request.data.get('radius_km', COURIER_RADIUS_KM))
+            capacity = request.data.get('capacity')
+            capacity = int(capacity) if capacity is not None else None
+        except (TypeError, ValueError):
+            return Response({"error": "radius_km and capacity must be numeric"}, status=400)
+
+        summary = dispatch_pending_orders(radius_km=radius_km, capacity=capacity)
+        return Response(summary, status=status.HTTP_200_OK)
+
+
+class PickupBatchesView(APIView):
+    """Unassigned pending orders near the courier, grouped into pickup batches by farmer location."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        if not user.is_logistics:
+            return Response({"detail": "Not authorized"}, status=403)
+
+        try:
+            radius_km = float(request.query_params.get('radius_km', COURIER_RADIUS_KM))
+        except ValueError:
+            return Response({"error": "radius_km must be numeric"}, status=400)
+
+        courier = LogisticsPartner.objects.get(user=user)
+        position = current_position(courier)
+        if position is None:
+            return Response([], status=status.HTTP_200_OK)
+        courier_lat, courier_lon = position
+
+        min_lat, max_lat, min_lon, max_lon = bounding_box(courier_lat, courier_lon, radius_km)
+        clusters = cluster_orders(
+            unassigned_orders().filter(
+                farmer_lat__range=(min_lat, max_lat), farmer_lon__range=(min_lon, max_lon)
+            ).values_list('id', 'farmer_lat', 'farmer_lon')
+        )
+
+        batches = []
+        for cluster in clusters:
+            distance = haversine(courier_lon, courier_lat, cluster["longitude"], cluster["latitude"])
+            if distance <= radius_km:
+                batches.append({**cluster, "order_count": len(cluster["order_ids"]), "distance_km": round(distance, 2)})
+        batches.sort(key=lambda batch: batch["distance_km"])
+        return Response(batches, status=status.HTTP_200_OK)
+
+
+class ClaimPickupBatchView(APIView):
+    """Assign every unassigned pending order in a pickup cell to the requesting courier."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        if not user.is_logistics:
+            return Response({"detail": "Not authorized"}, status=403)
+
+        cell = request.data.get('cell')
+        try:
+            min_lat, max_lat, min_lon, max_lon = cell_bounds(cell)
+        except (AttributeError, ValueError):
+            return Response({"error": "cell must look like '<row>:<col>'"}, status=400)
+
+        courier = LogisticsPartner.objects.get(user=user)
+        with transaction.atomic():
+            open_batch = open_batches([cell]).get(cell)
+            if open_batch and open_batch.courier_id != courier.id:
+                return Response({"error": "Another courier is already collecting from this location"}, status=409)
+
+            clusters = cluster_orders(
+                unassigned_orders().filter(
+                    farmer_lat__gte=min_lat, farmer_lat__lt=max_lat,
+                    farmer_lon__gte=min_lon, farmer_lon__lt=max_lon,
+                ).values_list('id', 'farmer_lat', 'farmer_lon')
+            )
+            if not clusters:
+                return Response({"error": "No unassigned orders in this batch"}, status=404)
+            cluster = clusters[0]
+
+            distance = 0.0
+            position = current_position(courier)
+            if position is not None:
+                distance = haversine(position[1], position[0], cluster["longitude"], cluster["latitude"])
+
+            if open_batch:
+                join_batch(open_batch, cluster["order_ids"], distance)
+                batch = open_batch
+            else:
+                batch, = create_batches([(courier.id, cluster, distance)])
+
+        order_ids = list(CourierAssignment.objects.filter(batch=batch).values_list('order_id', flat=True))
+        return Response({"batch_id": batch.id, "cell": cell, "order_ids": order_ids}, status=status.HTTP_200_OK)